@@ -0,0 +1,310 @@
+"""Scaling benchmarks of every parse -> convert -> save path.
+
+For each size, a corpus is generated (see `generate.py`) and each source
+file is converted to each target format in a fresh process, recording the
+time of each phase and the peak memory of the conversion. The growth of the
+time and memory with the number of nodes is then checked against the
+expected complexity of the paths: the exponent `k` of `t ~ n**k`, fitted on
+the sizes of at least `FIT_MIN_NODES` nodes, must not exceed
+`BOUND + TOLERANCE`.
+
+Usage:
+    # sizes 1k, 10k, 100k and 1M, writing the results to a csv file and a plot
+    python benchmarks/bench_scaling.py --max-nodes 1000000 --csv scaling.csv \\
+        --plot scaling.png
+
+    # the same checks as pytest tests, up to BENCH_MAX_NODES (default 100k)
+    python -m pytest benchmarks/bench_scaling.py
+
+The file isn't collected by the default test run (its name doesn't match
+"test_*.py"), it has to be passed explicitly to pytest."""
+
+import argparse
+import csv
+import itertools
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from generate import generate_files
+
+# format of each generated source file.
+SOURCES = {"chrome_json": "json", "firefox_json": "json", "html": "html", "db": "db"}
+TARGETS = ("db", "html", "json")
+# every path is expected to be linear in the number of nodes, in time and memory.
+BOUND = 1.0
+TOLERANCE = 0.25
+# the smaller sizes are dominated by constant costs (imports, file headers).
+FIT_MIN_NODES = 10000
+# shape of the generated trees.
+CORPUS_OPTIONS = {"depth": 6, "fan_out": 20, "icon_size": 128, "unicode_ratio": 0.2}
+
+
+def sizes_up_to(max_nodes, min_nodes=1000):
+    """Sizes from min_nodes to max_nodes, multiplied by 10 at each step."""
+    sizes = []
+    size = min_nodes
+    while size <= max_nodes:
+        sizes.append(size)
+        size *= 10
+    return sizes
+
+
+def _read_memory_status(key):
+    """Value of a memory entry ("VmRSS", "VmHWM") of /proc/self/status in
+    bytes, None if unavailable."""
+    try:
+        with open("/proc/self/status") as file_:
+            for line in file_:
+                if line.startswith(key + ":"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _start_memory_measure():
+    """Start measuring the peak memory, returning a function giving the
+    growth of the peak in bytes since the start (None if unavailable).
+
+    On linux the peak resident memory (VmHWM) is reset to the current usage,
+    elsewhere the growth of `ru_maxrss` is used, which misses the peaks lower
+    than the ones reached before the start (the imports for example)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as file_:
+            file_.write("5")
+        before = _read_memory_status("VmRSS")
+    except OSError:
+        before = None
+    if before is not None:
+        return lambda: _read_memory_status("VmHWM") - before
+    try:
+        import resource
+    except ImportError:
+        return lambda: None
+
+    def peak():
+        # kilobytes on linux, bytes on macos.
+        value = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return value if sys.platform == "darwin" else value * 1024
+
+    before = peak()
+    return lambda: peak() - before
+
+
+def run_case(filepath, source_format, target_format, streaming=False):
+    """Convert a file, returning the time of each phase and the growth of the
+    peak memory of the process during the conversion. Meant to run in a fresh
+    process (see `measure`)."""
+    from bookmarks_converter import BookmarksConverter
+
+    output_file = Path(filepath).with_name(f"output_{Path(filepath).name}")
+    output_file = output_file.with_suffix(f".{target_format}")
+    if output_file.exists():
+        output_file.unlink()
+    peak_memory = _start_memory_measure()
+    start = time.perf_counter()
+    bookmarks = BookmarksConverter(filepath, streaming=streaming)
+    bookmarks.parse(source_format)
+    parsed = time.perf_counter()
+    bookmarks.convert(target_format)
+    converted = time.perf_counter()
+    bookmarks.save()
+    saved = time.perf_counter()
+    memory = peak_memory()
+    output_file.unlink()
+    return {
+        "parse": parsed - start,
+        "convert": converted - parsed,
+        "save": saved - converted,
+        "total": saved - start,
+        "peak_memory": memory,
+    }
+
+
+def measure(filepath, source_format, target_format, streaming=False):
+    """Run `run_case` in a new python process, so the memory peak and the
+    caches of the previous cases don't affect the measure."""
+    command = [
+        sys.executable,
+        __file__,
+        "--case",
+        str(filepath),
+        source_format,
+        target_format,
+    ]
+    if streaming:
+        command.append("--streaming")
+    output = subprocess.run(
+        command, stdout=subprocess.PIPE, check=True, cwd=str(Path(__file__).parent)
+    ).stdout
+    return json.loads(output.decode())
+
+
+def growth_exponent(sizes, values):
+    """Least squares fit of `k` in `value ~ size**k` on a log-log scale."""
+    points = [
+        (math.log(size), math.log(value))
+        for size, value in zip(sizes, values)
+        if value and value > 0
+    ]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    numerator = sum((x - mean_x) * (y - mean_y) for x, y in points)
+    denominator = sum((x - mean_x) ** 2 for x, _ in points)
+    return numerator / denominator if denominator else None
+
+
+def paths(streaming=False):
+    """(source, target) pairs to benchmark, only html/json in streaming mode."""
+    for source, target in itertools.product(SOURCES, TARGETS):
+        if streaming and (SOURCES[source] == "db" or target == "db"):
+            continue
+        yield source, target
+
+
+def generate_corpus(corpus_dir, sizes):
+    """Generate the source files of each size, returning {size: {source: path}}."""
+    return {
+        size: generate_files(
+            Path(corpus_dir).joinpath(str(size)), nodes=size, **CORPUS_OPTIONS
+        )
+        for size in sizes
+    }
+
+
+def check_bounds(sizes, results):
+    """Return the (source, target, measure, exponent) of the paths growing
+    faster than the bound, results being {(source, target): [case, ...]}."""
+    fit_sizes = [size for size in sizes if size >= FIT_MIN_NODES]
+    violations = []
+    for (source, target), cases in results.items():
+        fit_cases = [case for size, case in zip(sizes, cases) if size >= FIT_MIN_NODES]
+        for key in ("total", "peak_memory"):
+            exponent = growth_exponent(fit_sizes, [case[key] for case in fit_cases])
+            if exponent is not None and exponent > BOUND + TOLERANCE:
+                violations.append((source, target, key, exponent))
+    return violations
+
+
+def run(sizes, corpus_dir, streaming=False, csv_file=None, plot_file=None):
+    corpus = generate_corpus(corpus_dir, sizes)
+    results = {}
+    rows = []
+    for source, target in paths(streaming):
+        for size in sizes:
+            case = measure(corpus[size][source], SOURCES[source], target, streaming)
+            results.setdefault((source, target), []).append(case)
+            rows.append(dict(source=source, target=target, nodes=size, **case))
+            print(
+                f"{source:>12} -> {target:<4} {size:>8} nodes: "
+                f"{case['total']:8.3f}s, "
+                f"{(case['peak_memory'] or 0) / 2**20:8.1f} MiB",
+                flush=True,
+            )
+    if csv_file:
+        with open(csv_file, "w", newline="") as file_:
+            writer = csv.DictWriter(file_, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    if plot_file:
+        plot(sizes, results, plot_file)
+    return results
+
+
+def plot(sizes, results, plot_file):
+    """Plot the time and peak memory of each path (needs matplotlib)."""
+    try:
+        import matplotlib
+
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib isn't installed, skipping the plot.")
+        return
+    figure, (time_axis, memory_axis) = plt.subplots(1, 2, figsize=(14, 6))
+    for (source, target), cases in results.items():
+        label = f"{source} -> {target}"
+        time_axis.plot(
+            sizes, [case["total"] for case in cases], marker="o", label=label
+        )
+        memory = [(case["peak_memory"] or 0) / 2**20 for case in cases]
+        memory_axis.plot(sizes, memory, marker="o", label=label)
+    for axis, label in ((time_axis, "time (s)"), (memory_axis, "peak memory (MiB)")):
+        axis.set_xscale("log")
+        axis.set_yscale("log")
+        axis.set_xlabel("nodes")
+        axis.set_ylabel(label)
+    time_axis.legend(fontsize="small")
+    figure.tight_layout()
+    figure.savefig(plot_file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--max-nodes", type=int, default=100000)
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument("--corpus-dir", help="defaults to a temporary directory")
+    parser.add_argument("--csv", dest="csv_file")
+    parser.add_argument("--plot", dest="plot_file")
+    parser.add_argument(
+        "--case", nargs=3, metavar=("FILE", "SOURCE", "TARGET"), help=argparse.SUPPRESS
+    )
+    args = parser.parse_args(argv)
+    if args.case:
+        print(json.dumps(run_case(*args.case, streaming=args.streaming)))
+        return 0
+    sizes = sizes_up_to(args.max_nodes)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        results = run(
+            sizes,
+            args.corpus_dir or temp_dir,
+            args.streaming,
+            args.csv_file,
+            args.plot_file,
+        )
+    violations = check_bounds(sizes, results)
+    for source, target, key, exponent in violations:
+        print(
+            f"{source} -> {target}: {key} grows as n**{exponent:.2f}, "
+            f"bound n**{BOUND + TOLERANCE:.2f}"
+        )
+    return 1 if violations else 0
+
+
+# pytest entry point, checking the bounds of each path.
+try:
+    import pytest
+except ImportError:
+    pytest = None
+
+if pytest is not None:
+
+    @pytest.fixture(scope="module")
+    def corpus(tmp_path_factory):
+        sizes = sizes_up_to(int(os.environ.get("BENCH_MAX_NODES", 100000)))
+        return sizes, generate_corpus(tmp_path_factory.mktemp("corpus"), sizes)
+
+    @pytest.mark.parametrize(
+        "streaming, source, target",
+        [(False, *path) for path in paths()]
+        + [(True, *path) for path in paths(streaming=True)],
+    )
+    def test_scaling(corpus, streaming, source, target):
+        sizes, files = corpus
+        cases = [
+            measure(files[size][source], SOURCES[source], target, streaming)
+            for size in sizes
+        ]
+        assert check_bounds(sizes, {(source, target): cases}) == []
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,369 @@
+"""Generator of synthetic bookmarks files, used to benchmark the converter on
+large inputs.
+
+The same random tree of folders/urls can be written as a Chrome JSON file,
+a Firefox JSON file, a Netscape HTML file (Chrome flavor, as exported by
+the browsers) or a database file in the format of the package.
+
+Usage:
+    python benchmarks/generate.py --nodes 100000 --depth 6 --fan-out 20 \\
+        --icon-size 512 --unicode 0.3 --output-dir /tmp/corpus"""
+
+import argparse
+import base64
+import html
+import json
+import random
+import sqlite3
+from pathlib import Path
+
+# seconds between 1601-01-01 (Chrome epoch) and 1970-01-01 (unix epoch).
+CHROME_EPOCH_OFFSET = 11644473600
+# unix time of the oldest generated bookmark.
+START_DATE = 1500000000
+
+# ids up to FIRST_ID are left for the root folders of the browsers.
+FIRST_ID = 10
+
+# words used in the titles, the unicode ones are mixed in at the given ratio.
+ASCII_WORDS = ("news", "python", "recipes", "travel", "docs", "music", "maps")
+UNICODE_WORDS = ("café", "Москва", "東京", "서울", "العربية", "ελληνικά", "🔖", "naïve")
+
+FORMATS = {
+    "chrome_json": "bookmarks_chrome.json",
+    "firefox_json": "bookmarks_firefox.json",
+    "html": "bookmarks_netscape.html",
+    "db": "bookmarks_custom.db",
+}
+
+
+class Node:
+    """Folder (with children) or url of the generated tree."""
+
+    __slots__ = ("id", "title", "date_added", "url", "icon", "children")
+
+    def __init__(self, id_, title, date_added, url=None, icon=None):
+        self.id = id_
+        self.title = title
+        self.date_added = date_added
+        self.url = url
+        self.icon = icon
+        self.children = None if url else []
+
+
+def generate_tree(
+    nodes,
+    depth=5,
+    fan_out=10,
+    folder_ratio=0.1,
+    icon_size=0,
+    unicode_ratio=0.0,
+    seed=0,
+):
+    """Generate a random bookmarks tree of `nodes` folders/urls (root
+    excluded).
+
+    The folders are filled breadth first with `fan_out` children, each child
+    of a folder above `depth` being a folder with a probability of
+    `folder_ratio`. Once every folder is full, the remaining urls are spread
+    over the existing folders.
+
+    Parameters:
+    -----------
+    nodes : int
+        number of folders/urls in the tree
+    depth : int
+        maximum depth of the folders (the root being at depth 0)
+    fan_out : int
+        number of children of each folder
+    folder_ratio : float
+        probability for a child to be a folder
+    icon_size : int
+        size in bytes of the (random) icon of each url, 0 for no icon
+    unicode_ratio : float
+        probability for each word of a title to be a non ascii one
+    seed : int
+        seed of the random generator, the same arguments give the same tree
+
+    Returns:
+    --------
+    Node
+        the root folder"""
+    rng = random.Random(seed)
+    icons = (
+        [
+            "data:image/png;base64,"
+            + base64.b64encode(
+                rng.getrandbits(8 * icon_size).to_bytes(icon_size, "big")
+            ).decode()
+            for _ in range(16)
+        ]
+        if icon_size
+        else [None]
+    )
+
+    def title():
+        words = [
+            rng.choice(UNICODE_WORDS if rng.random() < unicode_ratio else ASCII_WORDS)
+            for _ in range(rng.randint(1, 4))
+        ]
+        return " ".join(words)
+
+    root = Node(1, "root", START_DATE)
+    queue = [(root, 0)]
+    folders = [root]
+    count = 0
+    position = 0
+    while count < nodes:
+        if position < len(queue):
+            folder, level = queue[position]
+            slots = fan_out
+            position += 1
+        else:
+            # every folder is full, add the remaining urls round-robin.
+            folder, level = folders[count % len(folders)], depth
+            slots = 1
+        for _ in range(min(slots, nodes - count)):
+            count += 1
+            id_ = count + FIRST_ID - 1
+            date_added = START_DATE + id_
+            if level + 1 < depth and rng.random() < folder_ratio:
+                child = Node(id_, title(), date_added)
+                queue.append((child, level + 1))
+                folders.append(child)
+            else:
+                url = (
+                    f"https://www.example{id_ % 1000}.com/{id_}?q={rng.getrandbits(32)}"
+                )
+                child = Node(id_, title(), date_added, url, rng.choice(icons))
+            folder.children.append(child)
+    return root
+
+
+def _split_roots(root):
+    """Split the children of the root between the first two root folders of
+    the browsers (bookmarks bar/menu and other bookmarks)."""
+    half = (len(root.children) + 1) // 2
+    return root.children[:half], root.children[half:]
+
+
+def write_chrome_json(root, filepath):
+    """Write the tree as a Chrome "Bookmarks" file."""
+
+    def convert(node):
+        item = {
+            "date_added": str((node.date_added + CHROME_EPOCH_OFFSET) * 10**6),
+            "id": str(node.id),
+            "name": node.title,
+        }
+        if node.url is None:
+            item["children"] = [convert(child) for child in node.children]
+            item["date_modified"] = item["date_added"]
+            item["type"] = "folder"
+        else:
+            item["type"] = "url"
+            item["url"] = node.url
+        return item
+
+    bar, other = _split_roots(root)
+    roots = {}
+    names = ("Bookmarks bar", "Other bookmarks", "Mobile bookmarks")
+    for id_, (key, name, children) in enumerate(
+        zip(("bookmark_bar", "other", "synced"), names, (bar, other, [])), 1
+    ):
+        folder = Node(id_, name, START_DATE)
+        folder.children = children
+        roots[key] = convert(folder)
+    tree = {"checksum": "%032x" % random.Random(0).getrandbits(128), "roots": roots}
+    tree["version"] = 1
+    with open(filepath, "w", encoding="utf-8") as file_:
+        json.dump(tree, file_, ensure_ascii=False, indent=3)
+
+
+def write_firefox_json(root, filepath):
+    """Write the tree as a Firefox bookmarks backup (.json) file."""
+    guids = random.Random(1)
+
+    def convert(node, index, guid=None):
+        item = {
+            "guid": guid or "%012x" % guids.getrandbits(48),
+            "title": node.title,
+            "index": index,
+            "dateAdded": node.date_added * 10**6,
+            "lastModified": node.date_added * 10**6,
+            "id": node.id,
+        }
+        if node.url is None:
+            item["typeCode"] = 2
+            item["type"] = "text/x-moz-place-container"
+            item["children"] = [
+                convert(child, i) for i, child in enumerate(node.children)
+            ]
+        else:
+            item["typeCode"] = 1
+            item["iconuri"] = f"fake-favicon-uri:{node.url}"
+            item["type"] = "text/x-moz-place"
+            item["uri"] = node.url
+        return item
+
+    menu, other = _split_roots(root)
+    tree = convert(Node(root.id, "", START_DATE), 0, "root________")
+    tree["root"] = "placesRoot"
+    roots = (
+        ("menu", "menu________", "bookmarksMenuFolder", menu),
+        ("toolbar", "toolbar_____", "toolbarFolder", []),
+        ("unfiled", "unfiled_____", "unfiledBookmarksFolder", other),
+        ("mobile", "mobile______", "mobileFolder", []),
+    )
+    for index, (title, guid, name, children) in enumerate(roots):
+        folder = Node(index + 2, title, START_DATE)
+        folder.children = children
+        item = convert(folder, index, guid)
+        item["root"] = name
+        tree["children"].append(item)
+    with open(filepath, "w", encoding="utf-8") as file_:
+        json.dump(tree, file_, ensure_ascii=False)
+
+
+def write_html(root, filepath):
+    """Write the tree as a Netscape bookmarks file, in the Chrome flavor
+    (the "Bookmarks bar" and the other bookmarks under a "Bookmarks" H1)."""
+    bar, other = _split_roots(root)
+    lines = [
+        "<!DOCTYPE NETSCAPE-Bookmark-file-1>\n",
+        "<!-- This is an automatically generated file.\n",
+        "     It will be read and overwritten.\n",
+        "     DO NOT EDIT! -->\n",
+        '<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">\n',
+        "<TITLE>Bookmarks</TITLE>\n",
+        "<H1>Bookmarks</H1>\n",
+        "<DL><p>\n",
+        f'    <DT><H3 ADD_DATE="{START_DATE}" LAST_MODIFIED="0" '
+        'PERSONAL_TOOLBAR_FOLDER="true">Bookmarks bar</H3>\n',
+        "    <DL><p>\n",
+    ]
+    # (node, level) pairs, None standing for the end of a folder.
+    stack = [(child, 1) for child in reversed(other)]
+    stack.append((None, 1))
+    stack.extend((child, 2) for child in reversed(bar))
+    with open(filepath, "w", encoding="utf-8") as file_:
+        file_.writelines(lines)
+        while stack:
+            node, level = stack.pop()
+            indent = "    " * level
+            if node is None:
+                # end of a folder.
+                file_.write(f"{indent}</DL><p>\n")
+            elif node.url is None:
+                file_.write(
+                    f'{indent}<DT><H3 ADD_DATE="{node.date_added}" '
+                    f'LAST_MODIFIED="0">{html.escape(node.title)}</H3>\n'
+                    f"{indent}<DL><p>\n"
+                )
+                stack.append((None, level))
+                stack.extend((child, level + 1) for child in reversed(node.children))
+            else:
+                icon = f' ICON="{node.icon}"' if node.icon else ""
+                file_.write(
+                    f'{indent}<DT><A HREF="{html.escape(node.url)}" '
+                    f'ADD_DATE="{node.date_added}"{icon}>{html.escape(node.title)}</A>\n'
+                )
+        file_.write("</DL><p>\n")
+
+
+def write_db(root, filepath):
+    """Write the tree as a database file in the format of the package, the
+    children of the root being split between a "Bookmarks Menu" and an
+    "Other Bookmarks" folder as in the converted browser files."""
+    filepath = Path(filepath)
+    if filepath.exists():
+        filepath.unlink()
+    connection = sqlite3.connect(str(filepath))
+    connection.execute(
+        'CREATE TABLE bookmark (id INTEGER NOT NULL, title VARCHAR, "index" INTEGER, '
+        "parent_id INTEGER, date_added INTEGER NOT NULL, type VARCHAR, "
+        "url VARCHAR, icon VARCHAR, icon_uri VARCHAR, tags VARCHAR, "
+        "PRIMARY KEY (id), FOREIGN KEY(parent_id) REFERENCES bookmark (id))"
+    )
+
+    menu, other = _split_roots(root)
+    tree = Node(root.id, root.title, root.date_added)
+    for id_, title, children in (
+        (2, "Bookmarks Menu", menu),
+        (3, "Other Bookmarks", other),
+    ):
+        folder = Node(id_, title, START_DATE)
+        folder.children = children
+        tree.children.append(folder)
+
+    def rows():
+        yield (tree.id, tree.title, 0, None, tree.date_added, "folder")
+        stack = [tree]
+        while stack:
+            folder = stack.pop()
+            for index, node in enumerate(folder.children):
+                type_ = "folder" if node.url is None else "url"
+                yield (
+                    node.id,
+                    node.title,
+                    index,
+                    folder.id,
+                    node.date_added,
+                    type_,
+                    node.url,
+                    node.icon,
+                )
+                if node.url is None:
+                    stack.append(node)
+
+    with connection:
+        connection.executemany(
+            'INSERT INTO bookmark (id, title, "index", parent_id, date_added, type, '
+            "url, icon) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (row + (None,) * (8 - len(row)) for row in rows()),
+        )
+    connection.close()
+
+
+WRITERS = {
+    "chrome_json": write_chrome_json,
+    "firefox_json": write_firefox_json,
+    "html": write_html,
+    "db": write_db,
+}
+
+
+def generate_files(output_dir, formats=tuple(FORMATS), **options):
+    """Generate a tree (see `generate_tree` for the options) and write it in
+    each of the formats, returning a dict of the filepaths by format."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    root = generate_tree(**options)
+    files = {}
+    for format_ in formats:
+        files[format_] = output_dir.joinpath(FORMATS[format_])
+        WRITERS[format_](root, files[format_])
+    return files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--nodes", type=int, default=10000)
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--fan-out", type=int, default=10)
+    parser.add_argument("--folder-ratio", type=float, default=0.1)
+    parser.add_argument("--icon-size", type=int, default=0)
+    parser.add_argument("--unicode", type=float, default=0.0, dest="unicode_ratio")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--formats", nargs="+", choices=list(FORMATS), default=list(FORMATS)
+    )
+    parser.add_argument("--output-dir", default=".")
+    args = vars(parser.parse_args(argv))
+    files = generate_files(args.pop("output_dir"), args.pop("formats"), **args)
+    for path in files.values():
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,38 @@
-from .core import BookmarksConverter
+import sys
+
+__version__ = "0.1.0"
+
+if sys.version_info >= (3, 7):
+    # import the converter (and its parsing backends) on first use, so the
+    # command line interface starts without loading them.
+    _lazy_attributes = {
+        "AsyncBookmarksConverter": ".aio",
+        "BookmarksConverter": ".core",
+        "FormatPlugin": ".formats",
+        "ParseCache": ".cache",
+        "ParseFilter": ".filters",
+        "convert_async": ".aio",
+        "convert_many": ".batch",
+        "register_format": ".formats",
+    }
+
+    def __getattr__(name):
+        module = _lazy_attributes.get(name)
+        if module is None:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+        from importlib import import_module
+
+        value = getattr(import_module(module, __name__), name)
+        globals()[name] = value
+        return value
+
+    def __dir__():
+        return sorted(list(globals()) + list(_lazy_attributes))
+
+else:
+    from .aio import AsyncBookmarksConverter, convert_async
+    from .batch import convert_many
+    from .cache import ParseCache
+    from .core import BookmarksConverter
+    from .filters import ParseFilter
+    from .formats import FormatPlugin, register_format
@@ -0,0 +1,120 @@
+"""asyncio interface of Bookmarks Converter, for use inside event loop based
+applications (aiohttp services for example).
+
+The parsing, converting and saving are blocking (CPU bound and file I/O),
+they are run in an executor so the event loop keeps serving other tasks
+while a file is converted, and a semaphore caps the number of conversion
+steps running at the same time.
+
+With a thread executor (the default) the event loop still shares the GIL
+with the conversion, it gets to run at least every
+`sys.getswitchinterval()` seconds. Using `convert_async` with a
+`ProcessPoolExecutor` takes the whole conversion out of the process."""
+
+import asyncio
+import functools
+
+from .batch import _convert_file
+from .core import BookmarksConverter
+
+
+class AsyncBookmarksConverter:
+    """Asynchronous wrapper of BookmarksConverter, `parse`, `convert` and
+    `save` are coroutines running the matching BookmarksConverter methods in
+    an executor.
+
+    Usage:
+        bookmarks = AsyncBookmarksConverter(filepath, semaphore=semaphore)
+        await bookmarks.parse("html")
+        await bookmarks.convert("json")
+        await bookmarks.save()
+
+    Parameters:
+    -----------
+    filepath : str or Path
+        path to the file to be converted
+    executor : concurrent.futures.Executor or None
+        executor running the blocking steps, the loop's default executor (a
+        thread pool) if None. It has to share the memory of the process
+        (threads), as the steps update the state of the converter.
+    semaphore : asyncio.Semaphore or None
+        limits the number of steps running at once, share the same
+        semaphore between the converters to cap the concurrency of a service
+    options :
+        keyword arguments passed to `BookmarksConverter` (wal, columnar,
+        streaming)
+
+    Attributes:
+    -----------
+    converter : BookmarksConverter
+        the wrapped converter, holding the `bookmarks`"""
+
+    def __init__(self, filepath, executor=None, semaphore=None, **options):
+        self.converter = BookmarksConverter(filepath, **options)
+        self.executor = executor
+        self.semaphore = semaphore
+
+    @property
+    def bookmarks(self):
+        return self.converter.bookmarks
+
+    @property
+    def output_filepath(self):
+        return self.converter.output_filepath
+
+    async def _run(self, function, *args):
+        loop = asyncio.get_event_loop()
+        if self.semaphore is None:
+            return await loop.run_in_executor(self.executor, function, *args)
+        async with self.semaphore:
+            return await loop.run_in_executor(self.executor, function, *args)
+
+    async def parse(self, format_):
+        await self._run(self.converter.parse, format_)
+
+    async def convert(self, format_):
+        await self._run(self.converter.convert, format_)
+
+    async def save(self):
+        await self._run(self.converter.save)
+
+
+async def convert_async(
+    filepath, source_format, target_formats, executor=None, semaphore=None, **options
+):
+    """Parse a file and save it in each of the target formats in a single
+    executor call, as done by `convert_many` for each file.
+
+    The converter lives in the executor for the whole conversion, so a
+    `ProcessPoolExecutor` can be used to keep the parsing and emitting of
+    large files from competing with the event loop for the GIL.
+
+    Parameters:
+    -----------
+    filepath : str or Path
+        path to the file to be converted
+    source_format : str or None
+        format of the source file, detected if None
+    target_formats : str or list of str
+        format(s) the file is converted and saved to
+    executor : concurrent.futures.Executor or None
+        executor running the conversion, the loop's default executor if None
+    semaphore : asyncio.Semaphore or None
+        held during the conversion, to cap the number of concurrent ones
+    options :
+        keyword arguments passed to `BookmarksConverter`
+
+    Returns:
+    --------
+    ConversionResult
+        the output files, timings or error of the conversion"""
+    if isinstance(target_formats, str):
+        target_formats = [target_formats]
+    function = functools.partial(
+        _convert_file, str(filepath), source_format, list(target_formats), options
+    )
+    loop = asyncio.get_event_loop()
+    if semaphore is None:
+        return await loop.run_in_executor(executor, function)
+    async with semaphore:
+        return await loop.run_in_executor(executor, function)
@@ -0,0 +1,195 @@
+"""Batch conversion of many bookmarks files using a pool of processes.
+
+Each file is parsed once by a worker process and converted/saved to every
+target format, the failures are recorded in the results instead of
+stopping the batch."""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .core import BookmarksConverter
+from .formats import detect_format
+
+
+class ConversionResult:
+    """Outcome of the conversion of a single file by `convert_many`.
+
+    Attributes:
+    -----------
+    filepath : str
+        path to the source file
+    size : int
+        size of the source file in bytes
+    output_filepaths : list
+        paths to the files written, one per target format
+    seconds : float
+        time spent converting the file
+    timings : dict
+        wall time spent in each phase ("parse", "convert", "save" and their
+        steps, see `BookmarksConverter.stats`), the convert/save times are
+        summed over the target formats
+    stats : dict or None
+        the stats of the conversion (see `ConversionStats.to_dict`), with
+        the memory profile if `profile_memory` was passed to `convert_many`
+    error : str or None
+        "ExceptionName: message" if the conversion failed, None otherwise"""
+
+    def __init__(
+        self, filepath, size=0, output_filepaths=None, seconds=0.0, error=None
+    ):
+        self.filepath = filepath
+        self.size = size
+        self.output_filepaths = output_filepaths or []
+        self.seconds = seconds
+        self.timings = {}
+        self.stats = None
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        status = "ok" if self.ok else self.error
+        return f"<ConversionResult '{self.filepath}' ({status})>"
+
+
+class BatchReport:
+    """Results of `convert_many`, in the order of the given paths, along with
+    the throughput of the batch.
+
+    Attributes:
+    -----------
+    results : list
+        ConversionResult of each file
+    seconds : float
+        wall clock time of the whole batch"""
+
+    def __init__(self, results, seconds):
+        self.results = results
+        self.seconds = seconds
+
+    @property
+    def errors(self):
+        """Results of the files that failed to convert."""
+        return [result for result in self.results if not result.ok]
+
+    @property
+    def size(self):
+        """Total size of the source files in bytes."""
+        return sum(result.size for result in self.results)
+
+    @property
+    def files_per_second(self):
+        return len(self.results) / self.seconds if self.seconds else 0.0
+
+    @property
+    def mb_per_second(self):
+        """Source megabytes (10**6 bytes) converted per second."""
+        return self.size / 10**6 / self.seconds if self.seconds else 0.0
+
+    def __repr__(self):
+        return (
+            f"<BatchReport {len(self.results)} files, {len(self.errors)} errors, "
+            f"{self.files_per_second:.1f} files/s, {self.mb_per_second:.2f} MB/s>"
+        )
+
+
+def _file_size(filepath):
+    try:
+        return os.path.getsize(filepath)
+    except OSError:
+        return 0
+
+
+def _convert_file(filepath, source_format, target_formats, options):
+    """Parse a file and save it in each of the target formats, returning a
+    ConversionResult. Runs in the worker processes."""
+    result = ConversionResult(str(filepath), _file_size(filepath))
+    start = time.perf_counter()
+    bookmarks = None
+    try:
+        if source_format is None:
+            source_format = detect_format(filepath)
+            if source_format is None:
+                raise TypeError("The format of the file couldn't be detected.")
+        bookmarks = BookmarksConverter(filepath, **dict(options, stats=True))
+        bookmarks.parse(source_format)
+        # several targets are converted in a single traversal of the tree.
+        if len(target_formats) == 1:
+            bookmarks.convert(target_formats[0])
+        else:
+            bookmarks.convert(target_formats)
+        bookmarks.save()
+        result.output_filepaths = [
+            str(bookmarks._output_file(target_format))
+            for target_format in dict.fromkeys(map(str.lower, target_formats))
+        ]
+    except Exception as error:
+        result.error = f"{type(error).__name__}: {error}"
+    result.seconds = time.perf_counter() - start
+    if bookmarks is not None:
+        totals = bookmarks.stats.totals()
+        result.timings = {name: phase.wall for name, phase in totals.items()}
+        result.stats = bookmarks.stats.to_dict()
+    return result
+
+
+def convert_many(paths, source_format, target_formats, workers=None, **options):
+    """Convert many bookmarks files, spreading them across a pool of processes.
+
+    The files are submitted largest first so the long conversions start
+    early and the workers finish at about the same time. A file that fails
+    to convert doesn't stop the batch, its error is recorded in its result.
+
+    Parameters:
+    -----------
+    paths : iterable of str or Path
+        paths to the files to be converted
+    source_format : str or None
+        format of the source files, "db", "html" or "json".
+        None to detect the format of each file (see `detect_format`)
+    target_formats : str or list of str
+        format(s) the files are converted and saved to
+    workers : int or None
+        number of worker processes, defaults to the number of CPUs.
+        With 1 worker the files are converted in the current process.
+    options :
+        keyword arguments passed to `BookmarksConverter` (wal, columnar,
+        streaming, pipelined, profile_memory, cache, compression,
+        compresslevel)
+
+    Returns:
+    --------
+    BatchReport
+        the ConversionResult of each file, in the order of `paths`, and the
+        throughput of the batch in files/s and MB/s"""
+    if isinstance(target_formats, str):
+        target_formats = [target_formats]
+    paths = [str(path) for path in paths]
+    order = sorted(range(len(paths)), key=lambda i: _file_size(paths[i]), reverse=True)
+    results = [None] * len(paths)
+    start = time.perf_counter()
+    if workers == 1:
+        for i in order:
+            results[i] = _convert_file(paths[i], source_format, target_formats, options)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    _convert_file, paths[i], source_format, target_formats, options
+                ): i
+                for i in order
+            }
+            for future, i in futures.items():
+                try:
+                    results[i] = future.result()
+                except Exception as error:
+                    # the worker process died, or the result couldn't be sent back.
+                    results[i] = ConversionResult(
+                        paths[i],
+                        _file_size(paths[i]),
+                        error=f"{type(error).__name__}: {error}",
+                    )
+    return BatchReport(results, time.perf_counter() - start)
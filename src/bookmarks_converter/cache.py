@@ -0,0 +1,164 @@
+"""On-disk cache of the parsed bookmarks trees.
+
+The parsed tree of a file is stored as a pickled ColumnarTree (a handful of
+arrays and string tables), keyed by the hash of the content of the file, its
+source format, the version of the converter and the version of the cache
+format. Parsing an unchanged file again loads the tree from the cache,
+skipping the HTML/JSON/DB parsing.
+
+The entries are plain files in the cache directory, so the cache can be
+shared by several processes:
+- an entry is written to a temporary file first, then moved in place with
+  `os.replace`, the readers see either the whole entry or no entry.
+- the modification time of an entry is its last use, it is updated on each
+  hit, and the least recently used entries are removed once the size of the
+  cache goes over `max_size`.
+- an entry removed (or being replaced) by another process while it is read
+  is a miss, an entry that can't be unpickled is removed.
+
+The entries are pickles, the cache directory must only be writable by the
+users running the conversions."""
+
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+from . import __version__
+from .columnar import ColumnarTree
+
+# bumped when the layout of the cached trees changes.
+CACHE_FORMAT = 1
+_SUFFIX = ".tree"
+_CHUNK_SIZE = 2**20
+
+
+class ParseCache:
+    """Cache of the parsed trees, used by `BookmarksConverter.parse`.
+
+    Usage:
+        cache = ParseCache("/path/to/cache_dir", max_size=500 * 2**20)
+        bookmarks = BookmarksConverter(filepath, cache=cache)
+        bookmarks.parse("html")  # loaded from the cache if already parsed
+
+    Parameters:
+    -----------
+    directory : str or Path
+        directory holding the entries, created if needed
+    max_size : int or None
+        total size of the entries in bytes above which the least recently
+        used entries are removed, no limit if None (default 256 MiB)
+
+    Attributes:
+    -----------
+    hits : int
+        number of trees loaded from the cache by this instance
+    misses : int
+        number of trees not found in the cache by this instance"""
+
+    def __init__(self, directory, max_size=256 * 2**20):
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        # the counters are per process.
+        return {"directory": self.directory, "max_size": self.max_size}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @staticmethod
+    def key(filepath, format_):
+        """Key of the parsed tree of a file: hash of its content, its source
+        format, the converter version and the cache format."""
+        hash_ = hashlib.sha256()
+        with open(filepath, "rb") as file_:
+            for chunk in iter(lambda: file_.read(_CHUNK_SIZE), b""):
+                hash_.update(chunk)
+        hash_.update(f"\0{format_.lower()}\0{__version__}\0{CACHE_FORMAT}".encode())
+        return hash_.hexdigest()
+
+    def path(self, key):
+        """Path of the entry of a key."""
+        return self.directory.joinpath(key + _SUFFIX)
+
+    def get(self, key):
+        """Return the ColumnarTree stored under key, None if not cached."""
+        path = self.path(key)
+        try:
+            with open(path, "rb") as file_:
+                tree = pickle.load(file_)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            # a truncated or outdated entry, it is parsed and stored again.
+            self._remove(path)
+            self.misses += 1
+            return None
+        if not isinstance(tree, ColumnarTree):
+            self._remove(path)
+            self.misses += 1
+            return None
+        self._touch(path)
+        self.hits += 1
+        return tree
+
+    def put(self, key, tree):
+        """Store a ColumnarTree under key, then evict the least recently used
+        entries if the cache is over its size limit."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(
+            prefix=f".{key}.", suffix=".tmp", dir=str(self.directory)
+        )
+        try:
+            with os.fdopen(descriptor, "wb") as file_:
+                pickle.dump(tree, file_, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, str(self.path(key)))
+        except BaseException:
+            self._remove(temp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the total size of the
+        cache is under `max_size`."""
+        if self.max_size is None:
+            return
+        entries = []
+        total = 0
+        for path in self.directory.glob("*" + _SUFFIX):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        """Remove all the entries."""
+        for path in self.directory.glob("*" + _SUFFIX):
+            self._remove(path)
+
+    @staticmethod
+    def _touch(path):
+        try:
+            os.utime(str(path))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(str(path))
+        except OSError:
+            pass
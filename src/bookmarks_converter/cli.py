@@ -0,0 +1,237 @@
+"""Command line interface of Bookmarks Converter.
+
+Usage:
+    bookmarks-converter [-f FORMAT] -t FORMAT [FORMAT ...] [-j N] [--stats]
+                        PATH [PATH ...]
+
+Each PATH can be a bookmarks file, a directory (its db/html/json files are
+converted, compressed or not) or a glob pattern. The converted files are
+saved next to the source files with an "output_" prefix, compressed as the
+source files unless `--compression` says otherwise.
+
+The converter (and its parsing backends) is only imported once the
+arguments are parsed, so `--help` and `--version` don't pay for it."""
+
+import argparse
+import glob
+import sys
+from pathlib import Path
+
+from . import __version__
+from .compression import COMPRESSIONS, strip_compression
+from .formats import FORMATS, SUFFIXES
+
+# files created by BookmarksConverter, skipped when scanning a directory.
+_GENERATED_PREFIXES = ("output_", "temp_")
+
+
+def _build_parser():
+    parser = argparse.ArgumentParser(
+        prog="bookmarks-converter",
+        description="Convert bookmarks files from/to db, html and json.",
+    )
+    parser.add_argument(
+        "paths", nargs="+", metavar="PATH", help="bookmarks file, directory or glob"
+    )
+    parser.add_argument(
+        "-f",
+        "--from",
+        dest="source_format",
+        choices=FORMATS,
+        help="format of the source files (detected for each file by default)",
+    )
+    parser.add_argument(
+        "-t",
+        "--to",
+        dest="target_formats",
+        nargs="+",
+        required=True,
+        choices=FORMATS,
+        metavar="FORMAT",
+        help="format(s) to convert the files to: db, html and/or json",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="number of worker processes (default 1)",
+    )
+    parser.add_argument(
+        "-r",
+        "--recursive",
+        action="store_true",
+        help="look for bookmarks files in the subdirectories too",
+    )
+    parser.add_argument(
+        "--stats", action="store_true", help="print the time spent in each phase"
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="print the peak/retained memory of each phase, the top allocation "
+        "sites and the memory by node type (slows down the conversion)",
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="convert html/json without building the bookmarks tree",
+    )
+    parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        help="streaming conversion reading and writing the files in separate "
+        "threads, to hide the disk latency",
+    )
+    parser.add_argument(
+        "--wal", action="store_true", help="write the db files in WAL journal mode"
+    )
+    parser.add_argument(
+        "--compression",
+        choices=("infer", "none") + COMPRESSIONS,
+        default="infer",
+        help="compression of the html/json output files (default infer, the "
+        "compression of the source files)",
+    )
+    parser.add_argument(
+        "--compresslevel",
+        type=int,
+        metavar="LEVEL",
+        help="compression level of the output files, from 1 (fastest) to 9 "
+        "(smallest)",
+    )
+    parser.add_argument(
+        "--cache",
+        metavar="DIR",
+        help="cache the parsed files in DIR, skipping the parsing of the files "
+        "already parsed",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=256,
+        metavar="MiB",
+        help="size of the cache above which the least recently used entries "
+        "are removed (default 256)",
+    )
+    parser.add_argument(
+        "--version", action="version", version=f"%(prog)s {__version__}"
+    )
+    return parser
+
+
+def _is_bookmarks_file(path):
+    suffix = strip_compression(path).suffix.lower()
+    return suffix in SUFFIXES and not path.name.startswith(_GENERATED_PREFIXES)
+
+
+def collect_files(paths, recursive=False):
+    """Expand the files, directories and glob patterns into a list of files,
+    without duplicates. A file given explicitly is kept whatever its
+    extension, the files found in the directories are filtered on theirs."""
+    files = []
+    for path in paths:
+        if Path(path).exists() or not glob.has_magic(path):
+            candidates = [path]
+        else:
+            candidates = sorted(glob.glob(path, recursive=True))
+        for candidate in map(Path, candidates):
+            if candidate.is_dir():
+                pattern = "**/*" if recursive else "*"
+                files.extend(
+                    file_
+                    for file_ in sorted(candidate.glob(pattern))
+                    if file_.is_file() and _is_bookmarks_file(file_)
+                )
+            else:
+                files.append(candidate)
+    return list(dict.fromkeys(files))
+
+
+def _print_stats(report):
+    for result in report.results:
+        if result.ok:
+            timings = ", ".join(
+                f"{phase} {seconds:.3f}s" for phase, seconds in result.timings.items()
+            )
+            print(f"{result.filepath}: {timings}")
+    print(
+        f"{len(report.results)} files ({report.size / 10**6:.2f} MB) in "
+        f"{report.seconds:.3f}s: {report.files_per_second:.1f} files/s, "
+        f"{report.mb_per_second:.2f} MB/s"
+    )
+
+
+def _format_size(size):
+    return f"{size / 2**20:.2f} MiB"
+
+
+def _print_memory_profile(report):
+    for result in report.results:
+        if not result.ok:
+            continue
+        stats = result.stats
+        print(f"{result.filepath}:")
+        for phase in stats["phases"]:
+            print(
+                f"  {phase['name']}: peak {_format_size(phase['peak_memory'])}, "
+                f"retained {_format_size(phase['retained_memory'])}"
+            )
+        for phase in stats["memory_sites"]:
+            print(f"  top allocation sites at the end of {phase['phase']}:")
+            for site, size, count in phase["sites"]:
+                print(f"    {site}: {_format_size(size)} in {count} blocks")
+        print("  memory by node type:")
+        for name, size in sorted(stats["memory_by_type"].items()):
+            print(f"    {name}: {_format_size(size)}")
+
+
+def main(argv=None):
+    """Entry point of the `bookmarks-converter` command, returns the exit
+    status: 0 on success, 1 if any file failed to convert, 2 if there are no
+    files to convert."""
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1.")
+    if args.cache_size < 0:
+        parser.error("--cache-size can't be negative.")
+    files = collect_files(args.paths, args.recursive)
+    if not files:
+        print("No bookmarks files found.", file=sys.stderr)
+        return 2
+
+    # the converter only imports the backends of the formats it reads and
+    # writes (see `formats.py`), SQLAlchemy isn't loaded for a json to html
+    # conversion for example.
+    from .batch import convert_many
+
+    cache = None
+    if args.cache is not None:
+        from .cache import ParseCache
+
+        cache = ParseCache(args.cache, max_size=args.cache_size * 2**20)
+    report = convert_many(
+        files,
+        args.source_format,
+        args.target_formats,
+        workers=args.jobs,
+        streaming=args.streaming,
+        pipelined=args.pipelined,
+        wal=args.wal,
+        compression=None if args.compression == "none" else args.compression,
+        compresslevel=args.compresslevel,
+        profile_memory=args.profile_memory,
+        cache=cache,
+    )
+    for result in report.results:
+        if result.ok:
+            print(f"{result.filepath} -> {', '.join(result.output_filepaths)}")
+        else:
+            print(f"{result.filepath}: {result.error}", file=sys.stderr)
+    if args.stats:
+        _print_stats(report)
+    if args.profile_memory:
+        _print_memory_profile(report)
+    return 1 if report.errors else 0
@@ -0,0 +1,350 @@
+"""Columnar representation of a bookmarks tree.
+
+The nodes of the tree are stored as rows in parallel arrays (id, parent_id,
+index, type, date_added and the position of the parent row), while the
+strings (title, url, icon, icon_uri and tags) are interned in string tables
+and referenced by their position in the table.
+
+Compared to a tree of objects, this gives a predictable memory usage per node,
+cheap pickling (a handful of arrays and lists) and allows bulk operations over
+a whole column. The NodeMixin behavior (iteration, equality, `_convert_*`
+methods) stays available through `NodeView`, a thin view over a single row."""
+
+from array import array
+
+from .models import NodeMixin
+from .streaming import END
+
+# value stored in the integer columns in place of None.
+NULL = -(2**63)
+
+FOLDER = 0
+URL = 1
+_types = ("folder", "url")
+
+
+class StringTable:
+    """Table of interned strings, each distinct string is stored once and
+    referenced by its position in the table (-1 for None)."""
+
+    def __init__(self, strings=()):
+        self.strings = []
+        self._positions = {}
+        for string in strings:
+            self.intern(string)
+
+    def intern(self, string):
+        """Add the string to the table if not present, and return its position."""
+        if string is None:
+            return -1
+        position = self._positions.get(string)
+        if position is None:
+            position = self._positions[string] = len(self.strings)
+            self.strings.append(string)
+        return position
+
+    def __getitem__(self, position):
+        if position < 0:
+            return None
+        return self.strings[position]
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __getstate__(self):
+        # the positions mapping is rebuilt from the strings when unpickling.
+        return self.strings
+
+    def __setstate__(self, strings):
+        self.strings = strings
+        self._positions = {string: i for i, string in enumerate(strings)}
+
+
+class _IntColumn:
+    """Descriptor giving a NodeView access to a row of an integer column."""
+
+    def __init__(self, column):
+        self.column = column
+
+    def __get__(self, view, owner):
+        if view is None:
+            return self
+        value = getattr(view._tree, self.column)[view._row]
+        return None if value == NULL else value
+
+    def __set__(self, view, value):
+        getattr(view._tree, self.column)[view._row] = NULL if value is None else value
+
+
+class _StringColumn:
+    """Descriptor giving a NodeView access to a row of a string column."""
+
+    def __init__(self, column, table):
+        self.column = column
+        self.table = table
+
+    def __get__(self, view, owner):
+        if view is None:
+            return self
+        position = getattr(view._tree, self.column)[view._row]
+        return getattr(view._tree, self.table)[position]
+
+    def __set__(self, view, value):
+        position = getattr(view._tree, self.table).intern(value)
+        getattr(view._tree, self.column)[view._row] = position
+
+
+class NodeView(NodeMixin):
+    """Thin view over a row of a ColumnarTree, exposing it as a folder/url
+    with the same attributes as the other bookmark classes.
+
+    The attributes are read from (and written to) the columns of the tree.
+    The `children` list is built once per folder and shared by all the views
+    of that folder, it should be treated as read-only since changes to it are
+    not reflected in the columns."""
+
+    id = _IntColumn("ids")
+    parent_id = _IntColumn("parent_ids")
+    index = _IntColumn("indices")
+    date_added = _IntColumn("dates_added")
+    title = _StringColumn("title_refs", "titles")
+    url = _StringColumn("url_refs", "urls")
+    icon = _StringColumn("icon_refs", "icons")
+    icon_uri = _StringColumn("icon_uri_refs", "icon_uris")
+    tags = _StringColumn("tag_refs", "tags")
+
+    def __init__(self, tree, row):
+        self._tree = tree
+        self._row = row
+
+    @property
+    def row(self):
+        """Position of the node in the columns of the tree."""
+        return self._row
+
+    @property
+    def type(self):
+        return _types[self._tree.types[self._row]]
+
+    @property
+    def children(self):
+        return self._tree.children_views(self._row)
+
+
+class ColumnarTree:
+    """Bookmarks tree stored as parallel arrays (one row per folder/url).
+
+    A parent is always added before its children, the first row being the
+    root of the tree. The rows of a parsed tree are in pre-order, those of a
+    merged tree (see `merge.py`) in the order the nodes were merged.
+
+    Attributes:
+    -----------
+    ids, parent_ids, indices, dates_added : array of int
+        the id, parent_id, index and date_added of each node,
+        `NULL` standing in for None.
+    types : array of int
+        the type of each node, `FOLDER` or `URL`.
+    parents : array of int
+        the row of the parent of each node (-1 for the root).
+    title_refs, url_refs, icon_refs, icon_uri_refs, tag_refs : array of int
+        position of the title, url, icon, icon_uri and tags of each node in
+        the string tables (-1 for None).
+    titles, urls, icons, icon_uris, tags : StringTable
+        interned strings referenced by the `*_refs` columns."""
+
+    _int_columns = ("ids", "parent_ids", "indices", "dates_added")
+    _ref_columns = ("title_refs", "url_refs", "icon_refs", "icon_uri_refs", "tag_refs")
+    _tables = ("titles", "urls", "icons", "icon_uris", "tags")
+
+    def __init__(self):
+        for column in self._int_columns:
+            setattr(self, column, array("q"))
+        for column in self._ref_columns:
+            setattr(self, column, array("q"))
+        for table in self._tables:
+            setattr(self, table, StringTable())
+        self.types = array("b")
+        self.parents = array("q")
+        self._children = None
+        self._child_views = {}
+
+    @classmethod
+    def from_tree(cls, root):
+        """Create a ColumnarTree out of a tree of NodeMixin objects
+        (Bookmark, HTMLBookmark, JSONBookmark or NodeView)."""
+        tree = cls()
+        visited = set()
+        stack = [(root, -1)]
+        while stack:
+            node, parent_row = stack.pop()
+            row = tree.append(node, parent_row)
+            if node.type == "folder":
+                if id(node) in visited:
+                    raise ValueError(f"The folder '{node.title}' is its own ancestor.")
+                visited.add(id(node))
+                for child in reversed(node.children):
+                    stack.append((child, row))
+        return tree
+
+    @classmethod
+    def from_events(cls, events):
+        """Create a ColumnarTree out of a stream of events (see
+        `streaming.py`), in a single pass."""
+        tree = cls()
+        # the rows of the open folders.
+        folders = [-1]
+        for event, node in events:
+            if event == END:
+                folders.pop()
+                continue
+            row = tree.append(node, folders[-1])
+            if node.type == "folder":
+                folders.append(row)
+        return tree
+
+    @classmethod
+    def from_rows(cls, rows, root_id=1):
+        """Create a ColumnarTree out of database rows, ordering the children
+        of each folder by their index.
+
+        rows: iterable of tuple
+            (id, parent_id, index, type, title, date_added, url, icon,
+            icon_uri, tags) of each folder/url.
+        root_id: int
+            id of the row at the root of the tree."""
+        root = None
+        children = {}
+        for row in rows:
+            if row[0] == root_id:
+                root = row
+            else:
+                children.setdefault(row[1], []).append(row)
+        for siblings in children.values():
+            siblings.sort(key=lambda row: (row[2] is None, row[2]))
+        tree = cls()
+        stack = [(root, -1)]
+        while stack:
+            row, parent_row = stack.pop()
+            id_, parent_id, index, type_, title, date_added, *url_fields = row
+            position = tree.append_row(
+                type_,
+                id_,
+                parent_id,
+                index,
+                title,
+                date_added,
+                *url_fields,
+                parent_row=parent_row,
+            )
+            for child in reversed(children.pop(id_, ())):
+                stack.append((child, position))
+        return tree
+
+    def append(self, node, parent_row=-1):
+        """Add a row to the tree out of a folder/url object, returning the
+        position of the new row."""
+        if node.type == "url":
+            url_fields = (node.url, node.icon, node.icon_uri, node.tags)
+        else:
+            url_fields = ()
+        return self.append_row(
+            node.type,
+            node.id,
+            node.parent_id,
+            node.index,
+            node.title,
+            node.date_added,
+            *url_fields,
+            parent_row=parent_row,
+        )
+
+    def append_row(
+        self,
+        type_,
+        id_,
+        parent_id,
+        index,
+        title,
+        date_added,
+        url=None,
+        icon=None,
+        icon_uri=None,
+        tags=None,
+        parent_row=-1,
+    ):
+        """Add a row to the tree out of the values of its fields, returning
+        the position of the new row."""
+        row = len(self.types)
+        self.types.append(URL if type_ == "url" else FOLDER)
+        self.parents.append(parent_row)
+        for column, value in zip(
+            self._int_columns, (id_, parent_id, index, date_added)
+        ):
+            getattr(self, column).append(NULL if value is None else value)
+        self.title_refs.append(self.titles.intern(title))
+        self.url_refs.append(self.urls.intern(url))
+        self.icon_refs.append(self.icons.intern(icon))
+        self.icon_uri_refs.append(self.icon_uris.intern(icon_uri))
+        self.tag_refs.append(self.tags.intern(tags))
+        if self._children is not None:
+            self._children.append([])
+            if parent_row >= 0:
+                self._children[parent_row].append(row)
+                self._child_views.pop(parent_row, None)
+        return row
+
+    def children_rows(self, row):
+        """Return the rows of the children of the node at row."""
+        if self._children is None:
+            children = [[] for _ in range(len(self.parents))]
+            for child_row, parent_row in enumerate(self.parents):
+                if parent_row >= 0:
+                    children[parent_row].append(child_row)
+            self._children = children
+        return self._children[row]
+
+    def detach(self, row):
+        """Remove the node at row (and its descendants) from the tree. The
+        rows stay in the columns, unreachable from the root, the views of
+        the children of its parent are rebuilt on the next access."""
+        parent_row = self.parents[row]
+        if parent_row < 0:
+            raise ValueError("The root of the tree can't be detached.")
+        if self._children is not None:
+            self._children[parent_row].remove(row)
+        self._child_views.pop(parent_row, None)
+        self.parents[row] = -1
+
+    def children_views(self, row):
+        """Return the NodeView of the children of the node at row, the list is
+        built on the first call and reused afterwards."""
+        views = self._child_views.get(row)
+        if views is None:
+            views = [NodeView(self, child) for child in self.children_rows(row)]
+            self._child_views[row] = views
+        return views
+
+    @property
+    def root(self):
+        """NodeView of the root of the tree."""
+        return NodeView(self, 0)
+
+    def __getitem__(self, row):
+        return NodeView(self, row)
+
+    def __len__(self):
+        return len(self.types)
+
+    def __iter__(self):
+        """Iterate over the nodes of the tree in the order of the rows, the
+        detached ones included."""
+        for row in range(len(self.types)):
+            yield NodeView(self, row)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # the children lists are rebuilt from the parents column when needed.
+        state["_children"] = None
+        state["_child_views"] = {}
+        return state
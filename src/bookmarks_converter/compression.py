@@ -0,0 +1,126 @@
+"""Transparent compression of the bookmarks files, with the stdlib gzip, bz2
+and lzma modules.
+
+A compressed file is read and written through the module of its compression,
+the uncompressed content never being written to the disk:
+- the compression of a path is the one of its suffix (".gz", ".bz2" or
+  ".xz"), "bookmarks.json.gz" being a gzip compressed json file,
+- the compression of a file object is detected out of its first bytes.
+
+The file objects given are left open, only the files opened (and the
+compressors/decompressors wrapping the file objects) being closed."""
+
+import bz2
+import gzip
+import io
+import lzma
+from contextlib import contextmanager
+from pathlib import Path
+
+COMPRESSIONS = ("gzip", "bz2", "xz")
+SUFFIXES = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}
+
+_MODULES = {"gzip": gzip, "bz2": bz2, "xz": lzma}
+_MAGIC = ((b"\x1f\x8b", "gzip"), (b"BZh", "bz2"), (b"\xfd7zXZ\x00", "xz"))
+
+
+def compression_of(filepath):
+    """Return the compression of a path out of its suffix, None if it isn't
+    compressed."""
+    return SUFFIXES.get(Path(filepath).suffix.lower())
+
+
+def strip_compression(filepath):
+    """Return the path without the suffix of its compression, as a Path."""
+    path = Path(filepath)
+    if compression_of(path) is not None:
+        return path.with_suffix("")
+    return path
+
+
+def check_compression(compression):
+    """Raise a ValueError if the compression isn't "gzip", "bz2", "xz" or
+    None."""
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ValueError(
+            f"Unknown compression '{compression}', make sure its 'gzip', 'bz2' or 'xz'."
+        )
+
+
+def compression_suffix(compression):
+    """Return the suffix of a compression ("gzip", "bz2" or "xz")."""
+    check_compression(compression)
+    for suffix, name in SUFFIXES.items():
+        if name == compression:
+            return suffix
+
+
+def detect_compression(head):
+    """Return the compression of the first bytes of a file, None if they
+    aren't compressed."""
+    for magic, compression in _MAGIC:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def peek_compression(file_):
+    """Return the binary file object, ready to be read from where it was,
+    and the compression detected out of its next bytes. A file object that
+    can neither peek nor seek is wrapped in a BufferedReader."""
+    if not hasattr(file_, "peek"):
+        if file_.seekable():
+            position = file_.tell()
+            head = file_.read(6)
+            file_.seek(position)
+            return file_, detect_compression(head)
+        file_ = io.BufferedReader(file_)
+    return file_, detect_compression(file_.peek(6)[:6])
+
+
+@contextmanager
+def open_file(file_, mode="rb", compression=None, compresslevel=None):
+    """Open a path or a binary file object for reading or writing, through
+    the module of the compression.
+
+    Parameters:
+    -----------
+    file_ : str or Path or file object
+        path to the file, or binary file object left open
+    mode : str
+        "rb"/"wb" for a binary file, "rt"/"wt" for a UTF-8 text file
+        (default "rb")
+    compression : str or None
+        "gzip", "bz2", "xz" or None for an uncompressed file (default None)
+    compresslevel : int or None
+        compression level when writing, from 1 (fastest) to 9 (smallest),
+        0 being allowed by xz. None for the default of the module
+        (default None)"""
+    check_compression(compression)
+    text = mode.endswith("t")
+    mode = mode[0] + "b"
+    # the files opened here, closed in reverse order.
+    opened = []
+    try:
+        if not hasattr(file_, "read" if mode == "rb" else "write"):
+            file_ = open(file_, mode)
+            opened.append(file_)
+        if compression is not None:
+            options = {}
+            if mode == "wb" and compresslevel is not None:
+                option = "preset" if compression == "xz" else "compresslevel"
+                options[option] = compresslevel
+            file_ = _MODULES[compression].open(file_, mode, **options)
+            opened.append(file_)
+        if not text:
+            yield file_
+            return
+        wrapper = io.TextIOWrapper(file_, encoding="utf-8")
+        try:
+            yield wrapper
+        finally:
+            # detached, the wrapper doesn't close the file it wraps.
+            wrapper.detach()
+    finally:
+        while opened:
+            opened.pop().close()
@@ -16,26 +16,54 @@ __license__ = "MIT"
 
 import json
 import re
-import time
 from pathlib import Path
 
-from bs4 import BeautifulSoup, Tag
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from .columnar import ColumnarTree, NodeView
+from .compression import (
+    check_compression,
+    compression_of,
+    compression_suffix,
+    open_file,
+    peek_compression,
+    strip_compression,
+)
+from .formats import available_formats, detect_format, get_format
+from .pipeline import prefetch, write_behind
+from .stats import NO_STATS, ConversionStats
+from .streaming import (
+    FOLDER,
+    URL,
+    HTMLEventWriter,
+    JSONEventWriter,
+    add_index,
+    build_tree,
+    iter_output,
+    iter_tree_events,
+    write_events,
+)
 
-from .models import Base, Bookmark, HTMLBookmark, JSONBookmark
+# the readers of the formats (see `formats.py`) and the features of the
+# converter (search, diff, merge, ...) are imported when they are first used,
+# so a conversion only loads the backends of its formats.
 
 
 class DBMixin:
-    """Mixing containing all the DB related functions."""
+    """Mixing containing all the DB related functions. The DB files are read
+    by `db_reader.py`, imported (with SQLAlchemy) on first use."""
+
+    @staticmethod
+    def _create_engine(filepath, wal=False):
+        """Create an engine for the SQLite DB at filepath, switching the
+        connections to WAL journal mode if `wal` is set (see
+        `db_reader.create_engine`)."""
+        from .db_reader import create_engine
+
+        return create_engine(filepath, wal)
 
     def _parse_db(self):
-        """Import the DB bookmarks file into self._tree as an object."""
-        database_path = "sqlite:///" + str(self.filepath)
-        engine = create_engine(database_path, encoding="utf-8")
-        Session = sessionmaker(bind=engine)
-        session = Session()
-        self._tree = session.query(Bookmark).get(1)
+        """Import the DB bookmarks file into self._tree as an object, or the
+        selection of `self._filter` out of it (see `db_reader.py`)."""
+        self._tree = self._plugin("db").reader.parse(self, self._filter)
 
     def _convert_to_db(self):
         """Convert the imported bookmarks to database objects."""
@@ -65,38 +93,43 @@ class DBMixin:
                 url = child._convert_url_to_db()
                 self.bookmarks.append(url)
 
-    def _save_to_db(self):
-        """Function to export the bookmarks as SQLite3 DB."""
-        database_path = "sqlite:///" + str(self.output_filepath.with_suffix(".db"))
-        engine = create_engine(database_path, encoding="utf-8")
+    def _save_to_db(self, bookmarks=None):
+        """Function to export the bookmarks (or the given database objects) as
+        SQLite3 DB. In WAL mode the log is checkpointed back into the database
+        file once the bulk load is committed."""
+        from sqlalchemy.orm import sessionmaker
+
+        from .db_models import Base
+
+        if bookmarks is None:
+            bookmarks = self.bookmarks
+        output_file = self._output_file("db")
+        if hasattr(output_file, "write") or compression_of(output_file) is not None:
+            raise TypeError(
+                "A DB file can't be written compressed or to a file object, SQLite writes it on the disk."
+            )
+        engine = self._create_engine(output_file, self.wal)
         Session = sessionmaker(bind=engine)
         session = Session()
         Base.metadata.create_all(engine)
         session.commit()
-        session.bulk_save_objects(self.bookmarks)
+        session.bulk_save_objects(bookmarks)
         session.commit()
+        session.close()
+        if self.wal:
+            with engine.connect() as connection:
+                connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        engine.dispose()
 
 
 class HTMLMixin:
-    """Mixing containing all the HTML related functions."""
+    """Mixing containing all the HTML related functions. The HTML files are
+    read by `html_reader.py`, imported (with BeautifulSoup) on first use."""
 
     def _parse_html(self):
-        """Imports the HTML Bookmarks file into self._tree as a modified soup
-        object using the TreeBuilder class HTMLBookmark, which adds property
-        access to the html attributes of the soup object."""
-        self.format_html_file(self.filepath, self.temp_filepath)
-        with open(self.temp_filepath, "r", encoding="utf-8") as file_:
-            soup = BeautifulSoup(
-                markup=file_,
-                features="html.parser",
-                from_encoding="Utf-8",
-                element_classes={Tag: HTMLBookmark},
-            )
-        self.temp_filepath.unlink()
-        HTMLBookmark.reset_id_counter()
-        tree = soup.find("h3")
-        self._restructure_root(tree)
-        self._add_index()
+        """Imports the HTML Bookmarks file into self._tree as a tree of
+        HTMLBookmark objects (see `html_reader.py`)."""
+        self._tree = self._plugin("html").reader.parse(self)
 
     @staticmethod
     def format_html_file(filepath, output_filepath):
@@ -116,136 +149,73 @@ class HTMLMixin:
         with open(filepath, "r", encoding="utf-8") as input_file, open(
             output_filepath, "w", encoding="utf-8"
         ) as output_file:
-            # regex to select an entire H1/H3/A HTML element
-            element = re.compile(r"(<(H1|H3|A))(.*?(?=>))>(.*)(<\/\2>)\n")
-
             for line in input_file:
-                if "<DL><p>" in line:
-                    continue
-                line = element.sub(r'\1\3 TITLE="\4">\5', line)
-                line = (
-                    line.replace("<DT>", "")
-                    .replace("<H1", "<H3")
-                    .replace("</H1>", "")
-                    .replace("</H3>", "")
-                    .replace("</DL><p>\n", "</H3>")
-                    .replace("\n", "")
-                    .strip()
-                )
-                output_file.write(line)
-
-    def _restructure_root(self, tree):
-        """Restructure the root of the HTML parsed tree to allow for an easier
-        processing.
-
-        If the tree title is 'Bookmarks Menu' we need to extract the two folders
-        'Bookmarks Toolbar' and 'Other Bookmarks', then insert them into the
-        root folders children.
-
-        If the tree title is 'Bookmarks' we need to extract the 'Bookmarks bar'
-        folder and insert it at the beginning of the root children. Then we need
-        to rename the 'Bookmarks' folder to 'Other Bookmarks'.
-
-        tree: :class: `bs4.element.Tag`
-            BeautifulSoup object containing the first <H3> tag found in the
-            html file."""
-        self._tree = HTMLBookmark(
-            name="h3",
-            attrs={
-                "id": 1,
-                "index": 0,
-                "parent_id": 0,
-                "title": "root",
-                "date_added": round(time.time() * 1000),
-            },
+                output_file.write(HTMLMixin._format_html_line(line))
+
+    # regex to select an entire H1/H3/A HTML element
+    _html_element = re.compile(r"(<(H1|H3|A))(.*?(?=>))>(.*)(<\/\2>)\n")
+
+    @staticmethod
+    def _format_html_line(line):
+        """Format a line of a HTML Bookmarks file, as described in
+        `format_html_file`."""
+        if "<DL><p>" in line:
+            return ""
+        line = HTMLMixin._html_element.sub(r'\1\3 TITLE="\4">\5', line)
+        return (
+            line.replace("<DT>", "")
+            .replace("<H1", "<H3")
+            .replace("</H1>", "")
+            .replace("</H3>", "")
+            .replace("</DL><p>\n", "</H3>")
+            .replace("\n", "")
+            .strip()
         )
-        self._tree.children.append(tree)
-        if tree.title == "Bookmarks Menu":
-            for i, child in enumerate(tree):
-                if child.title in ("Bookmarks Toolbar", "Other Bookmarks"):
-                    self._tree.children.append(tree.children.pop(i))
-        elif tree.title == "Bookmarks":
-            tree.title = "Other Bookmarks"
-            for i, child in enumerate(tree):
-                if child.title == "Bookmarks bar":
-                    self._tree.children.insert(0, tree.children.pop(i))
-                    break
 
-    def _convert_to_html(self):
-        """Convert the imported bookmarks to HTML."""
-        header = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
-<!-- This is an automatically generated file.
-     It will be read and overwritten.
-     DO NOT EDIT! -->
-<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
-<TITLE>Bookmarks</TITLE>
-<H1>Bookmarks Menu</H1>
-
-<DL><p>
-"""
-        footer = "</DL>"
-
-        self._stack = self._tree.children[::-1]
-        body = []
+    def _stream_html_events(self):
+        """Events of the HTML Bookmarks file, restructured and indexed."""
+        return self._plugin("html").reader.events(self)
 
-        while self._stack:
-            self._stack_item = self._stack.pop()
-            folder = self._iterate_folder_html()
-            if folder:
-                self._create_placeholder(body, folder)
-
-        self.bookmarks = "".join([header, *body, footer])
-
-    def _iterate_folder_html(self):
-        """Iterate through each item in the hierarchy tree and convert it to
-        HTML. If a folder has children, it is added to the stack and a
-        placeholder is left in its place so it can be inserted back to its
-        position after processing."""
-        folder = [self._stack_item._convert_folder_to_html(), "<DL><p>\n"]
-        list_end = "</DL><p>\n"
-        for child in self._stack_item:
-            if child.type == "folder":
-                item = f"<folder{child.id}>"
-                self._stack.append(child)
-            else:
-                item = child._convert_url_to_html()
-            folder.append(item)
-        folder.append(list_end)
-        result = "".join(folder)
-        return result
-
-    def _create_placeholder(self, body, folder):
-        placeholder = f"<folder{self._stack_item.id}>"
-        if body and (placeholder in body[-1]):
-            body[-1] = body[-1].replace(placeholder, folder)
-        else:
-            body.append(folder)
+    def _stream_to_html(self, events):
+        """Convert a stream of events to HTML, yielding the output in chunks.
+        The output is the same as `_convert_to_html`."""
+        return iter_output(HTMLEventWriter(), events)
+
+    def _convert_to_html(self):
+        """Convert the imported bookmarks to HTML, writing the folders and
+        urls in the order of a depth first traversal of the tree."""
+        if self.incremental:
+            self.bookmarks = self._render_incremental("html")
+            return
+        self.bookmarks = "".join(self._stream_to_html(iter_tree_events(self._tree)))
 
-    def _save_to_html(self):
-        """Export the bookmarks as HTML."""
-        output_file = self.output_filepath.with_suffix(".html")
-        with open(output_file, "w", encoding="utf-8") as file_:
-            file_.write(self.bookmarks)
+    def _save_to_html(self, bookmarks=None):
+        """Export the bookmarks (or the given output) as HTML."""
+        if bookmarks is None:
+            bookmarks = self.bookmarks
+        output_file = self._output_file("html")
+        if not isinstance(bookmarks, str):
+            self._write_stream(output_file, bookmarks)
+            return
+        with self._open_output(output_file) as file_:
+            file_.write(bookmarks)
 
 
 class JSONMixin:
-    """Mixing containing all the JSON related functions."""
+    """Mixing containing all the JSON related functions. The JSON files are
+    read by `json_reader.py`, imported on first use."""
 
     def _parse_json(self):
         """Imports the JSON Bookmarks file into self._tree as a
-        JSONBookmark object."""
-        self.format_json_file(self.filepath, self.temp_filepath)
-        # with object_hook the json tree is loaded as JSONBookmark object tree.
-        with open(self.temp_filepath, "r", encoding="utf-8") as file_:
-            self._tree = json.load(file_, object_hook=self._json_to_object)
-        self.temp_filepath.unlink()
-        if self._tree.source == "Chrome":
-            self._add_index()
+        JSONBookmark object (see `json_reader.py`)."""
+        self._tree = self._plugin("json").reader.parse(self)
 
     @staticmethod
     def _json_to_object(jdict):
         """Helper function used as object_hook for json load."""
-        return JSONBookmark(**jdict)
+        from .json_reader import json_to_object
+
+        return json_to_object(jdict)
 
     @staticmethod
     def format_json_file(filepath, output_filepath):
@@ -254,36 +224,24 @@ class JSONMixin:
         parsing/converting.
         Exporting the result to a new JSON file (output_filepath) with
         a prefix of 'output_'."""
-        with open(filepath, "r", encoding="utf-8") as file_:
-            tree = json.load(file_)
-
-        if tree.get("checksum"):
-            tree = {
-                "name": "root",
-                "id": 0,
-                "index": 0,
-                "parent_id": 0,
-                "type": "folder",
-                "date_added": 0,
-                "children": list(tree.get("roots").values()),
-            }
-            tree["children"][1]["name"] = "Other Bookmarks"
-        elif tree.get("root"):
-            tree["title"] = "root"
-            folders = {
-                "menu": "Bookmarks Menu",
-                "toolbar": "Bookmarks Toolbar",
-                "unfiled": "Other Bookmarks",
-                "mobile": "Mobile Bookmarks",
-            }
-            for child in tree.get("children"):
-                child["title"] = folders[child.get("title")]
-
-        with open(output_filepath, "w", encoding="utf-8") as file_:
-            json.dump(tree, file_, ensure_ascii=False)
+        from .json_reader import format_json_file
+
+        format_json_file(filepath, output_filepath)
+
+    def _stream_json_events(self):
+        """Events of the JSON Bookmarks file."""
+        return self._plugin("json").reader.events(self)
+
+    def _stream_to_json(self, events):
+        """Convert a stream of events to JSON, yielding the output in chunks.
+        The output is the same as `_convert_to_json` saved by `_save_to_json`."""
+        return iter_output(JSONEventWriter(), events)
 
     def _convert_to_json(self):
         """Convert the imported bookmarks to JSON."""
+        if self.incremental:
+            self.bookmarks = self._render_incremental("json")
+            return
         self._stack = []
         self.bookmarks = self._tree._convert_folder_to_json()
         self._stack.append((self.bookmarks, self._tree))
@@ -301,11 +259,20 @@ class JSONMixin:
                     item = child._convert_url_to_json()
                 children.append(item)
 
-    def _save_to_json(self):
-        """Function to export the bookmarks as JSON."""
-        output_file = self.output_filepath.with_suffix(".json")
-        with open(output_file, "w", encoding="utf-8") as file_:
-            json.dump(self.bookmarks, file_, ensure_ascii=False)
+    def _save_to_json(self, bookmarks=None):
+        """Function to export the bookmarks (or the given output) as JSON."""
+        if bookmarks is None:
+            bookmarks = self.bookmarks
+        output_file = self._output_file("json")
+        if isinstance(bookmarks, dict):
+            # json.dumps serializes in one go with the C encoder, json.dump
+            # encodes in chunks with the python one.
+            bookmarks = json.dumps(bookmarks, ensure_ascii=False)
+        elif not isinstance(bookmarks, str):
+            self._write_stream(output_file, bookmarks)
+            return
+        with self._open_output(output_file) as file_:
+            file_.write(bookmarks)
 
 
 class BookmarksConverter(DBMixin, HTMLMixin, JSONMixin):
@@ -313,62 +280,249 @@ class BookmarksConverter(DBMixin, HTMLMixin, JSONMixin):
     using Iteration and Stack.
 
     Usage:
-    1- Instantiate a class and pass in the filepath as string or `Path` object:
+    1- Instantiate a class and pass in the filepath as string or `Path` object
+    (or a binary file object), compressed or not:
         - `instance = BookmarksConverter(filepath)`.
     2- Import and Parse the bookmarks file passing the source format as a string in lower case:
         - `instance.parse("db")`, for a database file.
         - `instance.parse("html")`, for a html file.
         - `instance.parse("json")`, for a json file.
+        - `instance.merge([filepath_1, (filepath_2, "json")])`, to merge
+          several files into one tree, `filepath` only naming the output.
     3- Convert the data to the desired format passing the format as a lower
     case string:
         - `instance.convert("db")`, convert to database.
         - `instance.convert("html")`, convert to html.
         - `instance.convert("json")`, convert to json.
+        - `instance.convert(["db", "html", "json"])`, convert to several
+          formats in a single traversal of the bookmarks.
     4- At this point the bookmarks are stored in the `bookmarks` attribute
         accessible through `instance.bookmarks`.
-    5- Export the bookmarks to a file using the save method `instance.save()`.
+    5- Export the bookmarks to a file using the save method `instance.save()`,
+        one file per format for a multi-target conversion, or to a given
+        path or file object with `instance.save(output=...)`.
 
     Parameters:
     -----------
-    filepath : str or Path
-        path to the file to be converted using BookmarksConverter
+    filepath : str or Path or file object
+        path to the file to be converted using BookmarksConverter, compressed
+        if its suffix is ".gz", ".bz2" or ".xz", or a binary file object
+        (compressed or not, see `compression.py`) read once by `parse`, the
+        output files being named after its `name`
+    wal : bool
+        write the output DB file in WAL journal mode, allowing concurrent
+        readers while it is written (default False)
+    columnar : bool
+        store the parsed tree as a ColumnarTree, the nodes being accessed
+        through NodeView objects (default False)
+    streaming : bool
+        when both the source and target formats support it ("html" and
+        "json"), skip building the bookmarks tree: `parse` only records the
+        source format, and `convert` connects the reader of the source file
+        straight to the writer of the target format (default False)
+    pipelined : bool
+        streaming mode in which the source file is read into events by a
+        reader thread and the output written by a writer thread, while the
+        events are formatted in the calling thread, the threads being
+        connected by bounded queues (see `pipeline.py`). It hides the time
+        spent waiting for the disk, and turns on `streaming` (default False)
+    stats : bool
+        record the wall/CPU time and the bytes read/written of each phase
+        (parse, convert, save and their steps) and count the folders/urls,
+        in the `stats` attribute (default False)
+    stats_callback : callable
+        called with the PhaseStats of each phase as soon as it ends, turns
+        on the `stats` (default None)
+    profile_memory : bool
+        trace the allocations with tracemalloc, adding the peak and retained
+        memory of each phase, the top allocation sites and the memory by
+        node type to the `stats`, which it turns on (default False)
+    cache : ParseCache or str or Path
+        cache of the parsed trees (or the directory of one), when the file
+        was already parsed `parse` loads its tree from the cache instead.
+        The tree loaded from the cache is a ColumnarTree (default None)
+    transforms : iterable of Transform or TransformPipeline
+        stages applied to the bookmarks between parsing and converting, in a
+        single traversal of the parsed tree, or of the events of the source
+        file in streaming mode (see `transforms.py`) (default None)
+    incremental : bool
+        keep the html/json output of each folder by the hash of its subtree
+        (see `merkle.py`), converting the tree again only formats the
+        folders changed since, which have to be passed to `changed`. The
+        json output shares the dicts of the unchanged folders with the
+        previous one (default False)
+    compression : str or None
+        compression of the html/json/plugin output files: "gzip", "bz2",
+        "xz", None for no compression, or "infer" for the compression of the
+        source file. The suffix of the compression is appended to the name
+        of the output files. The DB files are never compressed, SQLite
+        writing them on the disk (default "infer")
+    compresslevel : int or None
+        compression level of the output files, from 1 (fastest) to 9
+        (smallest). None for the default of the compression (default None)
 
     Attributes:
     -----------
-    bookmarks : list or dict or str
+    bookmarks : list or dict or str or iterator
         list, dict or str containing the bookmarks converted using BookmarksConverter.
         - list of database objects if converted to database
         - dict tree with bookmarks if converted to json
         - str of the tree if converted to html
-    filepath : str or Path
-        path to the file to be converted using BookmarksConverter
+        - iterator of str chunks of the output if converted in streaming mode,
+          the source file is read while the iterator is consumed
+        - dict of the output of each format if converted to a list of
+          formats
+    filepath : Path
+        path to the file to be converted using BookmarksConverter (the name
+        of the file object)
+    fileobj : file object or None
+        binary file object of the source, None if read from `filepath`
+    source_compression : str or None
+        compression of the source file
     output_filepath : Path
-        path to the output file exported using `.save()` method"""
+        path to the output file exported using `.save()` method, without the
+        suffix of the format or compression
+    compression : str or None
+        compression of the output files
+    compresslevel : int or None
+        compression level of the output files
+    wal : bool
+        whether the output DB file is written in WAL journal mode
+    columnar : bool
+        whether the parsed tree is stored as a ColumnarTree
+    streaming : bool
+        whether the html/json conversions skip building the bookmarks tree
+    pipelined : bool
+        whether the streaming conversions read, format and write in
+        separate threads
+    stats : ConversionStats or None
+        the measures of the phases and the count of folders/urls, None
+        unless turned on. In streaming mode the source file is read while
+        saving, which is where the time is spent.
+    cache : ParseCache or None
+        cache of the parsed trees
+    transforms : TransformPipeline or None
+        stages applied to the bookmarks between parsing and converting
+    incremental : bool
+        whether the output of the unchanged folders is reused"""
 
+    # formats read and written by the mixins, the others by the reader and
+    # writer of their FormatPlugin (see `formats.py`).
     _formats = ("db", "html", "json")
 
-    def __init__(self, filepath):
+    def __init__(
+        self,
+        filepath,
+        wal=False,
+        columnar=False,
+        streaming=False,
+        pipelined=False,
+        stats=False,
+        stats_callback=None,
+        profile_memory=False,
+        cache=None,
+        incremental=False,
+        transforms=None,
+        compression="infer",
+        compresslevel=None,
+    ):
         self._export = None
+        self._filter = None
         self._format = None
+        self._fragments = {}
+        self._merkle = None
+        self._output = None
+        self._search_index = None
+        self._shards = None
+        self._source = None
         self._stack = None
         self._stack_item = None
         self._tree = None
+        self._tree_index = None
         self.bookmarks = None
+        self.fileobj = None
+        if hasattr(filepath, "read"):
+            self.fileobj, self.source_compression = peek_compression(filepath)
+            name = getattr(filepath, "name", None)
+            filepath = name if isinstance(name, str) else "bookmarks"
+        else:
+            self.source_compression = compression_of(filepath)
         self.filepath = Path(filepath)
+        if compression == "infer":
+            compression = self.source_compression
+        check_compression(compression)
+        self.compression = compression
+        self.compresslevel = compresslevel
+        self.wal = wal
+        self.columnar = columnar
+        self.streaming = streaming or pipelined
+        self.pipelined = pipelined
+        if stats or stats_callback is not None or profile_memory:
+            self.stats = ConversionStats(stats_callback, profile_memory)
+        else:
+            self.stats = None
+        # when turned off, the phases are "measured" by no-op context managers.
+        self._stats = self.stats or NO_STATS
+        if cache is not None:
+            from .cache import ParseCache
+
+            if not isinstance(cache, ParseCache):
+                cache = ParseCache(cache)
+        self.cache = cache
+        self.incremental = incremental
+        if transforms is not None:
+            from .transforms import TransformPipeline
+
+            if not isinstance(transforms, TransformPipeline):
+                transforms = TransformPipeline(transforms)
+        self.transforms = transforms
         self._prepare_filepaths()
 
     def _prepare_filepaths(self):
         """Takes in filepath, and creates the following filepaths:
-        -temp_filepath: filepath used for temporary file created by
-         format_html_file() and format_json_file() methods.
+        -temp_filepath: filepath used for the temporary file created by
+         format_json_file() while parsing an uncompressed JSON file.
         -output_filepath: output filepath used by the save_to_**(DB/HTML/JSON)
-         methods to save the converted data into a file."""
-        self.output_filepath = self.filepath.with_name("output_" + self.filepath.name)
-        self.temp_filepath = self.filepath.with_name("temp_" + self.filepath.name)
+         methods to save the converted data into a file.
+        The suffix of the compression of the source file is left out."""
+        name = strip_compression(self.filepath).name
+        self.output_filepath = self.filepath.with_name("output_" + name)
+        self.temp_filepath = self.filepath.with_name("temp_" + name)
+
+    def _plain_source(self):
+        """Whether the source is an uncompressed file read from its path."""
+        return self.fileobj is None and self.source_compression is None
+
+    def open_source(self, text=True):
+        """Open the source file (or file object) for reading, decompressed,
+        as a UTF-8 text or binary file. Used by the readers of the formats,
+        those of the plugin formats included.
+
+        text : bool
+            open the file in text mode (default True)"""
+        return open_file(
+            self.filepath if self.fileobj is None else self.fileobj,
+            "rt" if text else "rb",
+            self.source_compression,
+        )
+
+    def _open_output(self, output_file, text=True):
+        """Open an output file for writing, compressed with the compression
+        of its suffix, or an output file object with `compression`."""
+        if hasattr(output_file, "write"):
+            compression = self.compression
+        else:
+            compression = compression_of(output_file)
+        return open_file(
+            output_file, "wt" if text else "wb", compression, self.compresslevel
+        )
 
-    def _add_index(self):
-        """Add index to each element if tree source is HTML or JSON(Chrome)"""
-        stack = [self._tree]
+    def _add_index(self, tree=None):
+        """Add index to each element if tree source is HTML or JSON(Chrome)
+
+        tree : NodeMixin
+            root of the tree indexed (default `self._tree`)"""
+        stack = [self._tree if tree is None else tree]
         while stack:
             stack_item = stack.pop()
             for i, child in enumerate(stack_item, 0):
@@ -376,25 +530,554 @@ class BookmarksConverter(DBMixin, HTMLMixin, JSONMixin):
                 if child.type == "folder":
                     stack.append(child)
 
-    def _dispatcher(self, method):
+    def _write_stream(self, output_file, chunks):
+        """Write the str chunks of a streaming conversion to the output file.
+        The source file is read while the chunks are written, if reading it
+        fails the partially written file is removed. In pipelined mode the
+        chunks are written by a writer thread."""
+        try:
+            with self._open_output(output_file) as file_:
+                if self.pipelined:
+                    write_behind(file_, chunks)
+                else:
+                    file_.writelines(chunks)
+        except Exception:
+            if isinstance(output_file, Path) and output_file.exists():
+                output_file.unlink()
+            raise
+
+    def _dispatcher(self, method, *args):
         if self._format.lower() not in self._formats:
             raise TypeError(
                 "The format you specified does not exist, make sure its 'db', 'html' or 'json'."
             )
-        getattr(self, method)()
+        return getattr(self, method)(*args)
 
-    def parse(self, format_):
+    @staticmethod
+    def _plugin(format_):
+        """Return the FormatPlugin of a format, raising a TypeError if there
+        is no such format."""
+        plugin = get_format(format_)
+        if plugin is None:
+            formats = ", ".join(f"'{name}'" for name in available_formats())
+            raise TypeError(
+                f"The format you specified does not exist, make sure its one of {formats}."
+            )
+        return plugin
+
+    def _read(self, format_):
+        """Parse the file with the mixin of a builtin format, or the reader of
+        a plugin format."""
+        if format_.lower() in self._formats:
+            self._dispatcher(f"_parse_{format_}")
+        else:
+            self._tree = self._plugin(format_).reader.parse(self)
+
+    def _read_events(self, format_):
+        """Events of the file of a streaming format."""
+        if format_ in self._formats:
+            return getattr(self, f"_stream_{format_}_events")()
+        return self._plugin(format_).reader.events(self)
+
+    def _output_file(self, format_, shard=""):
+        """Path of the output file of a format (or of one of its shards),
+        with its first suffix and the suffix of the compression, or the
+        output given to `save`."""
+        if self._output is not None:
+            return self._output
+        path = self.output_filepath.with_suffix(self._plugin(format_).suffixes[0])
+        if shard:
+            path = path.with_name(f"{path.stem}_shard{shard}{path.suffix}")
+        if self.compression is not None and format_.lower() != "db":
+            path = path.with_name(path.name + compression_suffix(self.compression))
+        return path
+
+    def parse(self, format_, filter_=None):
+        """Parse the bookmarks file, passing the format of the source file as
+        a lower case string: "db", "html", "json" or the name of a plugin
+        format (see `formats.py`).
+
+        format_ : str
+            format of the source file
+        filter_ : ParseFilter
+            only build the folders/urls it selects, the rest of the file
+            being skipped while it is read (see `filters.py`). The cache
+            isn't used for a filtered parse, nor for a file object
+            (default None)"""
+        plugin = self._plugin(format_)
         self._format = format_
-        self._dispatcher(f"_parse_{format_}")
+        self._filter = filter_
+        self._source = None
+        if self.streaming and plugin.streaming:
+            # the file is read by `convert`, without building the tree if the
+            # target format supports streaming too.
+            self._source = format_.lower()
+            return
+        with self._stats.phase("parse", read=self.filepath):
+            if filter_ is not None:
+                self._parse_filtered(format_)
+            elif self.cache is None or self.fileobj is not None:
+                self._read(format_)
+            else:
+                self._parse_cached(format_)
+            # the html/json sources are normalized by their node classes while
+            # parsing, their tree is copied into columns once it is built.
+            if self.columnar and not isinstance(self._tree, NodeView):
+                with self._stats.phase("columnar"):
+                    self._tree = ColumnarTree.from_tree(self._tree).root
+            self._transform_tree()
+        self._stats.count_nodes(self._tree)
+        self._stats.measure_tree(self._tree)
+
+    def _parse_filtered(self, format_):
+        """Parse the selection of the filter out of the file: queried by a
+        random access reader, or read as a stream of events to skip the
+        folders/urls filtered out while reading. The tree of the other
+        formats is parsed whole, then filtered."""
+        plugin = self._plugin(format_)
+        if plugin.random_access:
+            if plugin.name in self._formats:
+                self._dispatcher(f"_parse_{format_}")
+            else:
+                self._tree = plugin.reader.parse(self, self._filter)
+            return
+        if plugin.streaming:
+            events = self._filtered_events(plugin.name)
+        else:
+            self._read(format_)
+            events = list(
+                add_index(self._filter.filter_events(iter_tree_events(self._tree)))
+            )
+            for event, node in events:
+                if event == FOLDER:
+                    node.children = []
+        with self._stats.phase("build_tree"):
+            if self.columnar:
+                self._tree = ColumnarTree.from_events(events).root
+            else:
+                self._tree = build_tree(events)
+
+    def _filtered_events(self, format_, transform=False):
+        """Events of the source file of a streaming format, passed through
+        the filter and the transforms (if `transform` is set) and indexed
+        anew."""
+        events = self._read_events(format_)
+        stages = []
+        if self._filter is not None:
+            stages.append(self._filter.filter_events)
+        if transform and self.transforms is not None:
+            stages.append(self.transforms.events)
+        for stage in stages:
+            events = stage(events)
+        if stages:
+            events = add_index(events)
+        return events
+
+    def _transform_tree(self):
+        """Apply the transforms to the parsed tree."""
+        if self.transforms is not None:
+            with self._stats.phase("transform"):
+                self.transforms.apply(self._tree)
+
+    def _parse_cached(self, format_):
+        """Load the tree of the file from the cache, or parse the file and
+        store its tree in the cache."""
+        with self._stats.phase("cache_load"):
+            key = self.cache.key(self.filepath, format_)
+            tree = self.cache.get(key)
+        if tree is not None:
+            self._tree = tree.root
+            return
+        self._read(format_)
+        with self._stats.phase("cache_store"):
+            if isinstance(self._tree, NodeView):
+                tree = self._tree._tree
+            else:
+                tree = ColumnarTree.from_tree(self._tree)
+            self.cache.put(key, tree)
+        if self.columnar:
+            self._tree = tree.root
+
+    def merge(self, sources, workers=1, dedup=True):
+        """Parse several bookmarks files and merge them into a single tree
+        (see `merge.py`), which is then converted and saved like a parsed
+        file. The output files are named after `filepath`, which doesn't
+        have to exist.
+
+        sources : iterable
+            the files to merge, in order of precedence, as paths or
+            (path, format) tuples. The format of a path alone is detected
+            out of its extension or content (see `detect_format`)
+        workers : int or None
+            number of processes parsing the files, None for the number of
+            CPUs. With 1 worker the files are parsed in the current process
+            (default 1)
+        dedup : bool
+            skip the urls already in the merged tree (default True)"""
+        from .merge import merge_trees
+
+        sources = [_source_with_format(source) for source in sources]
+        self._source = None
+        with self._stats.phase("merge"):
+            if workers == 1:
+                roots = []
+                for filepath, format_ in sources:
+                    with self._stats.phase("parse", read=filepath):
+                        bookmarks = type(self)(filepath, cache=self.cache)
+                        bookmarks.parse(format_)
+                        roots.append(bookmarks._tree)
+            else:
+                # the trees are sent back from the workers as columns.
+                from concurrent.futures import ProcessPoolExecutor
+
+                with self._stats.phase("parse"):
+                    with ProcessPoolExecutor(max_workers=workers) as executor:
+                        trees = list(
+                            executor.map(
+                                _parse_columnar,
+                                *zip(*sources),
+                                [self.cache] * len(sources),
+                            )
+                        )
+                roots = [tree.root for tree in trees]
+            self._tree = merge_trees(roots, dedup).root
+            self._transform_tree()
+        self._stats.count_nodes(self._tree)
+        self._stats.measure_tree(self._tree)
+
+    def _parsed_tree(self):
+        """Return the parsed tree, parsing the source file of a streaming
+        conversion into a tree if needed."""
+        if self._source is not None:
+            self._parse_source()
+        if self._tree is None:
+            raise RuntimeError("The bookmarks have to be parsed using 'parse' first.")
+        return self._tree
+
+    def find_duplicates(self, keep="first"):
+        """Return the duplicate urls of the parsed bookmarks: the url kept and
+        the urls removed by `remove_duplicates` for each normalized url, as
+        [(normalized url, kept id, [removed ids]), ...] (see `dedup.py`).
+
+        keep : str or callable
+            which url of a group of duplicates is kept: "first", "last",
+            "oldest", "newest" or a callable (see `DuplicateIndex.report`)"""
+        from .dedup import DuplicateIndex
+
+        return DuplicateIndex(self._parsed_tree()).report(keep)
+
+    def remove_duplicates(self, keep="first"):
+        """Remove the duplicate urls from the parsed bookmarks, keeping one
+        url for each normalized url, and return the removed nodes.
+
+        keep : str or callable
+            which url of a group of duplicates is kept: "first", "last",
+            "oldest", "newest" or a callable (see `DuplicateIndex.report`)"""
+        from .dedup import DuplicateIndex
+
+        tree = self._parsed_tree()
+        with self._stats.phase("dedup"):
+            removed = DuplicateIndex(tree).remove(keep)
+            # the siblings of the removed urls moved, the tree is hashed again.
+            self._merkle = None
+            if self._search_index is not None and self._search_index.root is tree:
+                for node in removed:
+                    self._search_index.remove(node)
+            if self._tree_index is not None and self._tree_index.root is tree:
+                for node in removed:
+                    self._tree_index.remove(node)
+        self._stats.count_nodes(tree)
+        return removed
+
+    def search(self, query, order="relevance", limit=None):
+        """Return the folders/urls of the parsed bookmarks matching every
+        word of the query, in their title, url (host and path) or tags. The
+        search index is built on the first query (see `search.py`).
+
+        query : str
+            words to search for, a word ending with "*" being a prefix
+        order : str
+            "relevance" or "date_added" (newest first) (default "relevance")
+        limit : int or None
+            maximum number of results (default None)"""
+        from .search import SearchIndex
+
+        tree = self._parsed_tree()
+        if self._search_index is None or self._search_index.root is not tree:
+            with self._stats.phase("search_index"):
+                self._search_index = SearchIndex(tree)
+        return self._search_index.search(query, order, limit)
+
+    def _merkle_index(self):
+        """Return the MerkleIndex of the parsed tree, hashing a new tree."""
+        from .merkle import MerkleIndex
+
+        tree = self._parsed_tree()
+        if self._merkle is None or self._merkle.root is not tree:
+            with self._stats.phase("hash"):
+                self._merkle = MerkleIndex(tree)
+        return self._merkle
+
+    def tree_hash(self):
+        """Return the hash of the parsed bookmarks as a hex string, the same
+        for two trees holding the same folders/urls (same fields and ids) in
+        the same order, whatever the format they were read from. The hash
+        is kept until a node is passed to `changed`."""
+        return self._merkle_index().hexdigest()
+
+    def changed(self, node):
+        """Mark a node of the parsed bookmarks as changed, so the hashes of
+        its folders are computed again by the next `tree_hash` or
+        incremental conversion, and the node is indexed again by the search
+        index. A node added, removed or moved changes the folders it was in
+        and was added to, the ones to pass, along with the siblings whose
+        index changed.
+
+        node : NodeMixin
+            the folder/url changed"""
+        if self._merkle is not None:
+            self._merkle.changed(node)
+        if self._search_index is not None and self._search_index.root is self._tree:
+            self._search_index.update(node)
+
+    def _render_incremental(self, format_):
+        """Return the html/json output of the parsed tree, reusing the output
+        of the folders whose hash didn't change since the last conversion."""
+        if format_ not in self._fragments:
+            self._fragments[format_] = self._plugin(format_).fragments()
+        return self._fragments[format_].render(self._merkle_index())
+
+    def tree_index(self):
+        """Return the lookup tables of the parsed bookmarks: the nodes by id,
+        their folder and their path, such as "Bookmarks bar/Work/Infra"
+        (see `lookup.py`). They are built on the first call, in a single
+        traversal of the tree, not while parsing: a conversion which never
+        looks a node up doesn't pay for them."""
+        from .lookup import TreeIndex
+
+        tree = self._parsed_tree()
+        if self._tree_index is None or self._tree_index.root is not tree:
+            with self._stats.phase("tree_index"):
+                self._tree_index = TreeIndex(tree)
+        return self._tree_index
+
+    def diff(self, other):
+        """Return the changes turning the parsed bookmarks into the parsed
+        bookmarks of another converter, of any format, as a list of dicts
+        that can be serialized and applied onto a database file with
+        `diff.apply_changes` (see `diff.py`).
+
+        other : BookmarksConverter
+            converter of the new snapshot of the bookmarks"""
+        from .diff import diff_trees
+
+        return diff_trees(self._parsed_tree(), other._parsed_tree())
 
     def convert(self, format_):
+        self._shards = None
+        if not isinstance(format_, str):
+            self._convert_to_targets(format_)
+            return
+        plugin = self._plugin(format_)
+        builtin = plugin.name in self._formats
+        if self._source is not None:
+            if plugin.streaming:
+                self._format = self._export = format_
+                events = self._source_events()
+                if builtin:
+                    self.bookmarks = self._dispatcher(
+                        f"_stream_to_{format_.lower()}", events
+                    )
+                else:
+                    self.bookmarks = iter_output(plugin.writer(), events)
+                return
+            # the target doesn't support streaming, parse the file as usual.
+            self._parse_source()
         self._format = format_
         self._export = format_
-        self._dispatcher(f"_convert_to_{format_}")
+        with self._stats.phase("convert"):
+            if builtin:
+                self._dispatcher(f"_convert_to_{format_}")
+            elif self.incremental and plugin.incremental:
+                self.bookmarks = self._render_incremental(plugin.name)
+            else:
+                events = iter_tree_events(self._tree)
+                self.bookmarks = write_events(events, [plugin.writer()])[0]
+        self._stats.measure_output(self.bookmarks)
+
+    def convert_sharded(self, format_, workers=None, depth=1):
+        """Convert the bookmarks to html or json, splitting the tree at the
+        folders at `depth` whose output (a shard) is rendered in worker
+        processes, then joined in order (see `shards.py`). The bookmarks are
+        the text of the output file, byte for byte the same as the one saved
+        after `convert`, and the shards can be saved to files of their own
+        with `save(shards=True)`.
+
+        format_ : str
+            "html" or "json"
+        workers : int or None
+            number of processes rendering the shards, None for the number of
+            CPUs (default None)
+        depth : int
+            depth of the folders of the shards, 1 for the top level folders
+            (default 1)"""
+        from .shards import join_shards, render_shards, split_tree
+
+        tree = self._parsed_tree()
+        format_ = format_.lower()
+        with self._stats.phase("convert"):
+            parts, folders = split_tree(tree, format_, depth)
+            outputs = render_shards(format_, folders, workers)
+            self.bookmarks = join_shards(parts, outputs)
+        self._format = self._export = format_
+        self._shards = outputs
+        self._stats.measure_output(self.bookmarks)
+
+    def _source_events(self):
+        """Events of the source file of a streaming conversion, read by a
+        reader thread in pipelined mode."""
+        events = self._filtered_events(self._source, transform=True)
+        if self.pipelined:
+            events = prefetch(events)
+        return self._stats.count_events(events, FOLDER, URL)
+
+    def _parse_source(self):
+        """Parse the source file of a streaming conversion into a tree, for
+        the target formats that don't support streaming."""
+        self.streaming, streaming = False, self.streaming
+        try:
+            self.parse(self._source, self._filter)
+        finally:
+            self.streaming = streaming
+
+    def _convert_to_targets(self, formats):
+        """Convert the bookmarks to several formats in a single traversal of
+        the tree (or of the source file in streaming mode, when all the
+        formats support it), each event being passed to the writer of every
+        format. The bookmarks are a dict of the output of each format, the
+        same as converting to each format alone."""
+        self._shards = None
+        formats = list(dict.fromkeys(format_.lower() for format_ in formats))
+        if not formats:
+            raise ValueError("No format to convert the bookmarks to.")
+        plugins = [self._plugin(format_) for format_ in formats]
+        if self._source is not None and all(plugin.streaming for plugin in plugins):
+            events = self._source_events()
+        else:
+            if self._source is not None:
+                self._parse_source()
+            events = iter_tree_events(self._tree)
+        self._export = formats
+        with self._stats.phase("convert"):
+            writers = [plugin.writer() for plugin in plugins]
+            outputs = write_events(events, writers)
+        self.bookmarks = dict(zip(formats, outputs))
+        self._stats.measure_output(self.bookmarks)
 
-    def save(self):
+    def save(self, shards=False, output=None):
+        """Export the bookmarks to a file named after the source file, with
+        an "output_" prefix and the suffix of the format (followed by the
+        one of the compression).
+
+        shards : bool
+            save the output of each shard of `convert_sharded` to a bookmarks
+            file of its own instead, "output_<name>_shard<i>.<suffix>" in the
+            order of the tree, the folders/urls above the shards being left
+            out. The paths of the files are returned (default False)
+        output : str or Path or file object
+            path to save the bookmarks to instead, compressed if its suffix
+            is ".gz", ".bz2" or ".xz", or binary file object (left open)
+            written with `compression`. Only for a conversion to a single
+            format (default None)"""
         if self._export is None:
             raise RuntimeError(
                 "The bookmarks attribute is empty, you have to 'convert' the bookmarks before exporting them using 'save'."
             )
-        self._dispatcher(f"_save_to_{self._export}")
+        if output is not None:
+            if shards or isinstance(self._export, list):
+                raise ValueError(
+                    "An output can only be given to save the conversion to a single format."
+                )
+            if not hasattr(output, "write"):
+                output = Path(output)
+            self._output = output
+            try:
+                self._save_single()
+            finally:
+                self._output = None
+            return
+        if shards:
+            return self._save_shards()
+        if isinstance(self._export, list):
+            # the output of each format of a multi-target conversion.
+            for format_ in self._export:
+                self._format = format_
+                output_file = self._output_file(format_)
+                with self._stats.phase("save", written=output_file):
+                    self._save_format(format_, self.bookmarks[format_])
+            return
+        self._save_single()
+
+    def _save_single(self):
+        """Save the output of a conversion to a single format."""
+        output_file = self._output_file(self._export)
+        # in streaming mode, the source file is read while the output is saved.
+        streamed = self._source is not None and self._plugin(self._export).streaming
+        with self._stats.phase(
+            "save", read=self.filepath if streamed else None, written=output_file
+        ):
+            self._save_format(self._export)
+
+    def _save_shards(self):
+        """Save each shard of `convert_sharded` to a file, returning the paths
+        of the files."""
+        if self._shards is None:
+            raise RuntimeError(
+                "The bookmarks have to be converted using 'convert_sharded' before saving their shards."
+            )
+        from .shards import shard_document
+
+        width = len(str(len(self._shards) - 1))
+        paths = []
+        with self._stats.phase("save"):
+            for position, output in enumerate(self._shards):
+                path = self._output_file(self._export, f"{position:0{width}d}")
+                with self._open_output(path) as file_:
+                    file_.write(shard_document(self._export, output))
+                paths.append(path)
+        return paths
+
+    def _save_format(self, format_, bookmarks=None):
+        """Save the bookmarks (or the given output) of a format, with the
+        mixin of a builtin format or as the str/bytes (or str chunks)
+        written by a plugin writer."""
+        if format_.lower() in self._formats:
+            args = () if bookmarks is None else (bookmarks,)
+            self._dispatcher(f"_save_to_{format_}", *args)
+            return
+        if bookmarks is None:
+            bookmarks = self.bookmarks
+        output_file = self._output_file(format_)
+        if isinstance(bookmarks, (bytes, str)):
+            with self._open_output(output_file, isinstance(bookmarks, str)) as file_:
+                file_.write(bookmarks)
+        else:
+            self._write_stream(output_file, bookmarks)
+
+
+def _source_with_format(source):
+    """Return the (path, format) of a source file of `merge`."""
+    if isinstance(source, (str, Path)):
+        format_ = detect_format(source)
+        if format_ is None:
+            raise TypeError(f"The format of the file '{source}' couldn't be detected.")
+        return source, format_
+    filepath, format_ = source
+    return filepath, format_
+
+
+def _parse_columnar(filepath, format_, cache):
+    """Parse a file into a ColumnarTree, in the worker processes of `merge`."""
+    bookmarks = BookmarksConverter(filepath, columnar=True, cache=cache)
+    bookmarks.parse(format_)
+    return bookmarks._tree._tree
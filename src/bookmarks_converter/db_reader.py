@@ -0,0 +1,193 @@
+"""Reader of the DB bookmarks files, the sqlite databases written by
+BookmarksConverter (see `db_models.py`).
+
+It is the reader of the builtin "db" FormatPlugin (see `formats.py`),
+imported the first time a DB file is read, so SQLAlchemy is only loaded
+once a DB file is parsed or written. The database is a random access
+reader: the selection of a ParseFilter is read by queries filtering the
+rows in their WHERE clause, the rest of the file is never read."""
+
+from sqlalchemy import create_engine as _create_engine
+from sqlalchemy import event, literal
+from sqlalchemy.orm import defer, sessionmaker
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .columnar import ColumnarTree
+from .db_models import Bookmark, Url
+
+# columns read when parsing a DB file in columnar mode.
+COLUMNS = (
+    "id",
+    "parent_id",
+    "index",
+    "type",
+    "title",
+    "date_added",
+    "url",
+    "icon",
+    "icon_uri",
+    "tags",
+)
+# number of values of the IN clauses of a filtered query, below the limit of
+# variables of the older SQLite versions.
+IN_CHUNK_SIZE = 900
+
+
+def create_engine(filepath, wal=False):
+    """Create an engine for the SQLite DB at filepath, switching the
+    connections to WAL journal mode if `wal` is set.
+
+    In WAL mode readers don't block (and aren't blocked by) a writer, so the
+    database can be queried while it is being written. The journal mode is
+    stored in the DB file, so it is only set on the output files, when
+    reading, the mode the file already has is used."""
+    database_path = "sqlite:///" + str(filepath)
+    engine = _create_engine(database_path, encoding="utf-8")
+    if wal:
+        event.listen(engine, "connect", _set_wal_journal_mode)
+    return engine
+
+
+def _set_wal_journal_mode(dbapi_connection, connection_record):
+    """Connect event listener enabling WAL journal mode on a connection."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def parse(converter, filter_=None):
+    """Return the root of the tree of the DB bookmarks file of the converter.
+    In columnar mode the rows are read as plain tuples straight into a
+    ColumnarTree, without creating the ORM objects.
+
+    All the rows are loaded in one query and the `children` of each folder
+    are filled in from them, so the session can be closed and the engine
+    disposed once the tree is built.
+
+    Parameters:
+    -----------
+    converter : BookmarksConverter
+        the converter parsing the file
+    filter_ : ParseFilter
+        only read the folders/urls it selects (default None)"""
+    if not converter._plain_source():
+        raise TypeError(
+            "A DB file can't be read compressed or from a file object, SQLite reads it from the disk."
+        )
+    if filter_ is not None:
+        return _parse_filtered(converter, filter_)
+    stats = converter._stats
+    engine = converter._create_engine(converter.filepath)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    if converter.columnar:
+        # the table columns are used as querying the Url columns through the
+        # model would filter out the folders.
+        table = Bookmark.__table__
+        with stats.phase("query", read=converter.filepath):
+            rows = session.query(*(table.c[column] for column in COLUMNS)).all()
+        with stats.phase("build_tree"):
+            tree = ColumnarTree.from_rows(rows).root
+    else:
+        with stats.phase("query", read=converter.filepath):
+            bookmarks = session.query(Bookmark).order_by(Bookmark.index).all()
+        with stats.phase("build_tree"):
+            children = {}
+            for bookmark in bookmarks:
+                children.setdefault(bookmark.parent_id, []).append(bookmark)
+            for bookmark in bookmarks:
+                # set as loaded from the DB, not as a change to flush.
+                set_committed_value(bookmark, "children", children.get(bookmark.id, []))
+            tree = session.query(Bookmark).get(1)
+    session.close()
+    engine.dispose()
+    return tree
+
+
+def _parse_filtered(converter, filter_):
+    """Return the root of the selection of the filter out of the DB bookmarks
+    file (see `filters.py`). The folders are selected out of their id,
+    parent_id and title, then the urls of the selected folders are read by a
+    query filtering them in its WHERE clause, and the folders kept by
+    another."""
+    columnar = converter.columnar
+    stats = converter._stats
+    table = Bookmark.__table__
+    engine = converter._create_engine(converter.filepath)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    tree = None
+    with stats.phase("query", read=converter.filepath):
+        folders = (
+            session.query(table.c.id, table.c.parent_id, table.c.title)
+            .filter(table.c.type == "folder")
+            .all()
+        )
+        selected, parents = filter_.select_folders(folders)
+        conditions = [table.c.type == "url"] + filter_.url_conditions(table)
+        if filter_.folders is None:
+            urls = _query(session, filter_, columnar, conditions)
+        else:
+            urls = _query(
+                session, filter_, columnar, conditions, table.c.parent_id, selected
+            )
+        # the parent_id is the second column of the rows.
+        url_parents = {url[1] if columnar else url.parent_id for url in urls}
+        kept = filter_.kept_folders(selected, parents, url_parents)
+        folders = _query(
+            session, filter_, columnar, [table.c.type == "folder"], table.c.id, kept
+        )
+    with stats.phase("build_tree"):
+        if columnar:
+            tree = ColumnarTree.from_rows(folders + urls).root
+        else:
+            children = {}
+            for bookmark in folders + urls:
+                children.setdefault(bookmark.parent_id, []).append(bookmark)
+            for siblings in children.values():
+                siblings.sort(
+                    key=lambda bookmark: (bookmark.index is None, bookmark.index)
+                )
+            for bookmark in folders:
+                set_committed_value(bookmark, "children", children.get(bookmark.id, []))
+                if bookmark.id == 1:
+                    tree = bookmark
+            for bookmark in urls:
+                set_committed_value(bookmark, "children", [])
+                if not filter_.icons:
+                    set_committed_value(bookmark, "icon", None)
+                    set_committed_value(bookmark, "icon_uri", None)
+        converter._add_index(tree)
+    session.close()
+    engine.dispose()
+    return tree
+
+
+def _query(session, filter_, columnar, conditions, column=None, values=None):
+    """Return the rows (in columnar mode) or the Bookmark objects matching
+    the conditions, and whose column is in the values if given, the values
+    being passed in chunks. The icons are left out if the filter drops
+    them."""
+    table = Bookmark.__table__
+    if columnar:
+        columns = [table.c[column] for column in COLUMNS]
+        if not filter_.icons:
+            columns = [
+                literal(None) if column.name in ("icon", "icon_uri") else column
+                for column in columns
+            ]
+        query = session.query(*columns)
+    else:
+        query = session.query(Bookmark)
+        if not filter_.icons:
+            query = query.options(defer(Url.icon), defer(Url.icon_uri))
+    query = query.filter(*conditions)
+    if column is None:
+        return query.all()
+    values = sorted(values)
+    results = []
+    for start in range(0, len(values), IN_CHUNK_SIZE):
+        chunk = values[start : start + IN_CHUNK_SIZE]
+        results.extend(query.filter(column.in_(chunk)).all())
+    return results
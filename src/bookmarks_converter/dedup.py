@@ -0,0 +1,205 @@
+"""Detection and removal of duplicate bookmarks.
+
+Bookmarks imported from several browsers often point to the same page with
+slightly different urls. The urls are compared once normalized by
+`normalize_url`:
+- the http and https schemes are considered the same,
+- the host is lower cased, without a leading "www." or a default port,
+- the trailing slashes of the path are removed,
+- the parameters of the query are sorted (empty ones dropped),
+- the fragment is removed.
+The urls with another scheme (ftp, file, javascript, place, ...) are only
+stripped of their surrounding whitespace.
+
+`DuplicateIndex` maps the normalized url of each url of a tree to the ids of
+the urls sharing it, in a single traversal of the tree, and reports or
+removes the duplicates, keeping one url of each group according to a keep
+policy."""
+
+import re
+from functools import lru_cache
+
+from .columnar import NodeView
+from .streaming import END, FOLDER, iter_tree_events
+
+# authority, path and query of a http(s) url, the fragment is dropped.
+_HTTP_URL = re.compile(r"(?i:https?)://([^/?#]*)([^?#]*)(?:\?([^#]*))?")
+_DEFAULT_PORTS = (":80", ":443", ":")
+# number of normalized urls memoized, the least recently used are dropped.
+CACHE_SIZE = 2**17
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_url(url):
+    """Return the normalized form of a url, used as the key of the urls
+    considered duplicates (see the module docstring)."""
+    url = url.strip()
+    match = _HTTP_URL.match(url)
+    if match is None:
+        return url
+    host, path, query = match.groups()
+    host = host.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if host.endswith(_DEFAULT_PORTS):
+        host = host.rpartition(":")[0]
+    normalized = host + path.rstrip("/")
+    if query:
+        parameters = query.split("&")
+        if len(parameters) > 1:
+            parameters.sort()
+            # the empty parameters are sorted first.
+            while parameters and not parameters[0]:
+                del parameters[0]
+            query = "&".join(parameters)
+        if query:
+            normalized += "?" + query
+    return normalized
+
+
+def _date_added(node):
+    date_added = node.date_added
+    return 0 if date_added is None else date_added
+
+
+# keep policies: index of the url kept, out of the urls of a group in the
+# order of a depth first traversal.
+_KEEP_POLICIES = {
+    "first": lambda nodes: 0,
+    "last": lambda nodes: len(nodes) - 1,
+    "oldest": lambda nodes: min(range(len(nodes)), key=lambda i: _date_added(nodes[i])),
+    "newest": lambda nodes: max(
+        range(len(nodes)), key=lambda i: (_date_added(nodes[i]), -i)
+    ),
+}
+
+
+class DuplicateIndex:
+    """Index of the urls of a bookmarks tree by normalized url.
+
+    Usage:
+        index = DuplicateIndex(bookmarks_tree)
+        index.report(keep="oldest")  # [(normalized url, kept id, [removed ids]), ...]
+        index.remove(keep="oldest")  # remove the duplicates from the tree
+
+    Parameters:
+    -----------
+    root : NodeMixin
+        root of the tree (Bookmark, HTMLBookmark, JSONBookmark or NodeView)
+
+    Attributes:
+    -----------
+    urls : dict
+        the ids of the urls of each normalized url, in the order of a depth
+        first traversal of the tree, as {normalized url: [id, ...]}"""
+
+    def __init__(self, root):
+        self.root = root
+        self.urls = {}
+        # node and parent of each url, by position in the traversal (the ids
+        # of the urls merged from several files can collide), and the
+        # positions of the urls of each normalized url.
+        self._nodes = []
+        self._positions = {}
+        self._build()
+
+    def _build(self):
+        urls = self.urls
+        nodes = self._nodes
+        positions = self._positions
+        folders = []
+        for event, node in iter_tree_events(self.root):
+            if event == FOLDER:
+                folders.append(node)
+            elif event == END:
+                folders.pop()
+            elif node.url is not None:
+                url = normalize_url(node.url)
+                urls.setdefault(url, []).append(node.id)
+                positions.setdefault(url, []).append(len(nodes))
+                nodes.append((node, folders[-1]))
+
+    def duplicates(self):
+        """Return the groups of duplicate urls, as {normalized url: [id, ...]}."""
+        return {url: ids for url, ids in self.urls.items() if len(ids) > 1}
+
+    def report(self, keep="first"):
+        """Return the url kept and the urls removed of each group of
+        duplicates, as [(normalized url, kept id, [removed ids]), ...].
+
+        keep : str or callable
+            which url of a group is kept: "first" or "last" in the order of a
+            depth first traversal, "oldest" or "newest" by `date_added` (the
+            first one of the oldest/newest), or a callable taking the list of
+            nodes of a group and returning the one to keep"""
+        report = []
+        for url, kept, removed in self._select(keep):
+            ids = self.urls[url]
+            report.append((url, ids[kept], ids[:kept] + ids[kept + 1 :]))
+        return report
+
+    def _select(self, keep):
+        """Return the groups of duplicates as [(normalized url, kept,
+        [removed, ...]), ...], kept being the index of the kept url in its
+        group and the removed urls given by their position in `_nodes`."""
+        choose = self._keep_policy(keep)
+        selection = []
+        for url, positions in self._positions.items():
+            if len(positions) < 2:
+                continue
+            kept = choose([self._nodes[position][0] for position in positions])
+            removed = positions[:kept] + positions[kept + 1 :]
+            selection.append((url, kept, removed))
+        return selection
+
+    def remove(self, keep="first"):
+        """Remove the duplicate urls from the tree, keeping one url of each
+        group (see `report` for the keep policies), and return the removed
+        nodes. The index of the urls following a removed one is updated."""
+        removed_positions = []
+        for url, kept, positions in self._select(keep):
+            self.urls[url] = [self.urls[url][kept]]
+            self._positions[url] = [self._positions[url][kept]]
+            removed_positions.extend(positions)
+        removed = {}
+        for position in sorted(removed_positions):
+            node, parent = self._nodes[position]
+            self._nodes[position] = None
+            removed.setdefault(id(parent), (parent, []))[1].append(node)
+        for parent, nodes in removed.values():
+            _remove_children(parent, nodes)
+        return [node for _, nodes in removed.values() for node in nodes]
+
+    @staticmethod
+    def _keep_policy(keep):
+        if callable(keep):
+
+            def choose(nodes):
+                kept = keep(nodes)
+                for i, node in enumerate(nodes):
+                    if node is kept:
+                        return i
+                raise ValueError("The keep callable must return a node of the group.")
+
+            return choose
+        try:
+            return _KEEP_POLICIES[keep]
+        except KeyError:
+            raise ValueError(
+                f"Unknown keep policy {keep!r}, use one of {', '.join(_KEEP_POLICIES)}"
+                " or a callable."
+            ) from None
+
+
+def _remove_children(parent, nodes):
+    """Remove some children of a folder and number the remaining ones."""
+    if isinstance(parent, NodeView):
+        for node in nodes:
+            parent._tree.detach(node.row)
+    else:
+        removed = set(map(id, nodes))
+        parent.children[:] = [
+            child for child in parent.children if id(child) not in removed
+        ]
+    for index, child in enumerate(parent.children):
+        child.index = index
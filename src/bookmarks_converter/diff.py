@@ -0,0 +1,361 @@
+"""Differences between two snapshots of a bookmarks tree.
+
+`diff_trees` compares an old and a new tree (of any formats) and returns the
+list of changes turning the old tree into the new one. The nodes of the new
+tree are matched with the nodes of the old tree in three passes over hash
+maps, without comparing the nodes pairwise:
+1. the nodes with the same id and the same title (folders) or url (urls),
+2. the folders with the same title in the same (matched) parent folder, and
+   the urls with the same url, whatever their id (the ids of the html files
+   are generated when they are read),
+3. the nodes left with the same id and type, which were renamed or edited.
+The new nodes left unmatched were added, the old ones removed.
+
+The changes are dicts of plain values, ready to be serialized (as json), the
+existing nodes being referred to by their id in the old tree and the added
+ones by a new id, above the ids of the old tree:
+- {"op": "add", "id", "parent_id", "index", "type", "title", "date_added"}
+  and the "url", "icon", "icon_uri" and "tags" of a url,
+- {"op": "move", "id", "parent_id", "index"}, a node moved to another folder,
+- {"op": "rename", "id", "title"},
+- {"op": "update", "id", "fields": {field: value}}, the url, icon, icon_uri
+  or tags of a url changed,
+- {"op": "reorder", "id", "children": [id, ...]}, the children of a folder
+  that stayed in it changed order, listed in their new order,
+- {"op": "remove", "id"}, a node removed along with its descendants (the
+  ones that were moved elsewhere excepted).
+The changes can be applied onto the database file of the old tree with
+`apply_changes`."""
+
+from .streaming import END, FOLDER, iter_tree_events
+
+# fields of the urls compared by `diff_trees`, the dates are left out as the
+# html files without dates get the time at which they are read.
+UPDATE_FIELDS = ("url", "icon", "icon_uri", "tags")
+
+
+class _Node:
+    """Position of a node in its tree."""
+
+    __slots__ = ("node", "parent", "position")
+
+    def __init__(self, node, parent, position):
+        self.node = node
+        self.parent = parent
+        self.position = position
+
+
+def _flatten(root):
+    """Return the _Node of each node of a tree in pre-order, the parent of
+    each _Node being the _Node of its parent folder."""
+    nodes = [_Node(root, None, 0)]
+    folders = [nodes[0]]
+    positions = [0]
+    for event, node in iter_tree_events(root):
+        if event == END:
+            folders.pop()
+            positions.pop()
+        elif folders[-1].node is not node:
+            entry = _Node(node, folders[-1], positions[-1])
+            positions[-1] += 1
+            nodes.append(entry)
+            if event == FOLDER:
+                folders.append(entry)
+                positions.append(0)
+    return nodes
+
+
+def _match(old_nodes, new_nodes):
+    """Return the old _Node matching each new _Node, as {id(new _Node): old
+    _Node}, see the module docstring."""
+    old_by_id = {}
+    for entry in old_nodes:
+        old_by_id[entry.node.id] = entry
+    matches = {id(new_nodes[0]): old_nodes[0]}
+    matched = {id(old_nodes[0])}
+
+    def pair(new, old):
+        matches[id(new)] = old
+        matched.add(id(old))
+
+    # 1. same id and same title/url.
+    for new in new_nodes[1:]:
+        node = new.node
+        old = old_by_id.get(node.id)
+        if old is None or old.node.type != node.type or id(old) in matched:
+            continue
+        if node.type == "folder":
+            if old.node.title == node.title:
+                pair(new, old)
+        elif old.node.url == node.url:
+            pair(new, old)
+
+    # 2. same title in the same folder, or same url.
+    folders = {}
+    urls = {}
+    for old in reversed(old_nodes[1:]):
+        if id(old) in matched:
+            continue
+        if old.node.type == "folder":
+            key = (id(old.parent), old.node.title)
+            folders.setdefault(key, []).append(old)
+        else:
+            urls.setdefault(old.node.url, []).append(old)
+    for new in new_nodes[1:]:
+        if id(new) in matches:
+            continue
+        if new.node.type == "folder":
+            parent = matches.get(id(new.parent))
+            if parent is None:
+                continue
+            candidates = folders.get((id(parent), new.node.title))
+        else:
+            candidates = urls.get(new.node.url)
+        # the candidates are in reverse order, the first one is popped.
+        while candidates:
+            old = candidates.pop()
+            if id(old) not in matched:
+                pair(new, old)
+                break
+
+    # 3. same id and type.
+    for new in new_nodes[1:]:
+        if id(new) in matches:
+            continue
+        old = old_by_id.get(new.node.id)
+        if old is not None and old.node.type == new.node.type:
+            if id(old) not in matched:
+                pair(new, old)
+    return matches
+
+
+def _url_fields(node):
+    return {field: getattr(node, field) for field in UPDATE_FIELDS}
+
+
+def diff_trees(old_root, new_root):
+    """Return the changes turning a bookmarks tree into another one (see the
+    module docstring). The roots of the trees are always matched.
+
+    Parameters:
+    -----------
+    old_root : NodeMixin
+        root of the old tree (Bookmark, HTMLBookmark, JSONBookmark or
+        NodeView), the ids of its nodes have to be unique
+    new_root : NodeMixin
+        root of the new tree
+
+    Returns:
+    --------
+    list of dict
+        the changes, the added/moved/edited nodes in the order of the new
+        tree followed by the reordered folders and the removed nodes"""
+    old_nodes = _flatten(old_root)
+    new_nodes = _flatten(new_root)
+    matches = _match(old_nodes, new_nodes)
+    next_id = max(entry.node.id for entry in old_nodes) + 1
+
+    changes = []
+    ids = {}
+    kept = set()
+    for new in new_nodes:
+        node = new.node
+        old = matches.get(id(new))
+        if old is None:
+            ids[id(new)] = next_id
+            change = {
+                "op": "add",
+                "id": next_id,
+                "parent_id": ids[id(new.parent)],
+                "index": new.position,
+                "type": node.type,
+                "title": node.title,
+                "date_added": node.date_added,
+            }
+            if node.type == "url":
+                change.update(_url_fields(node))
+            changes.append(change)
+            next_id += 1
+            continue
+        id_ = ids[id(new)] = old.node.id
+        kept.add(id(old))
+        if new.parent is not None:
+            parent_id = ids[id(new.parent)]
+            if old.parent.node.id != parent_id:
+                changes.append(
+                    {
+                        "op": "move",
+                        "id": id_,
+                        "parent_id": parent_id,
+                        "index": new.position,
+                    }
+                )
+        if old.node.title != node.title:
+            changes.append({"op": "rename", "id": id_, "title": node.title})
+        if node.type == "url":
+            old_fields = _url_fields(old.node)
+            fields = {
+                field: value
+                for field, value in _url_fields(node).items()
+                if old_fields[field] != value
+            }
+            if fields:
+                changes.append({"op": "update", "id": id_, "fields": fields})
+
+    # the children that stayed in a folder must keep their relative order,
+    # the children added or moved in are placed at their index around them.
+    stayed = {}
+    for new in new_nodes[1:]:
+        old = matches.get(id(new))
+        if old is not None and old.parent is matches.get(id(new.parent)):
+            stayed.setdefault(id(new.parent), (new.parent, []))[1].append(old)
+    for parent, children in stayed.values():
+        positions = [old.position for old in children]
+        if any(a > b for a, b in zip(positions, positions[1:])):
+            changes.append(
+                {
+                    "op": "reorder",
+                    "id": ids[id(parent)],
+                    "children": [old.node.id for old in children],
+                }
+            )
+
+    for old in old_nodes[1:]:
+        if id(old) not in kept and id(old.parent) in kept:
+            changes.append({"op": "remove", "id": old.node.id})
+    return changes
+
+
+def apply_changes(filepath, changes):
+    """Apply the changes returned by `diff_trees` onto a database file
+    holding the old tree, in a single transaction. The index of the children
+    of the folders changed is updated so the database holds the new tree.
+
+    Parameters:
+    -----------
+    filepath : str or Path
+        path to the database file of the old tree
+    changes : list of dict
+        changes turning the old tree into the new one"""
+    # imported here, the trees are compared without loading SQLAlchemy.
+    from sqlalchemy import create_engine
+
+    from .db_models import Bookmark
+
+    table = Bookmark.__table__
+    engine = create_engine("sqlite:///" + str(filepath), encoding="utf-8")
+    try:
+        with engine.begin() as connection:
+            rows = connection.execute(
+                table.select()
+                .with_only_columns([table.c.id, table.c.parent_id])
+                .order_by(table.c.index)
+            )
+            parents = {}
+            children = {}
+            for id_, parent_id in rows:
+                parents[id_] = parent_id
+                children.setdefault(parent_id, []).append(id_)
+            _apply(connection, table, changes, parents, children)
+    finally:
+        engine.dispose()
+
+
+def _apply(connection, table, changes, parents, children):
+    """Apply the changes onto the structure of the tree, as {id: parent id}
+    and {parent id: [children ids]}, then write it to the database."""
+    from sqlalchemy import bindparam
+
+    def check(id_):
+        if id_ not in parents:
+            raise ValueError(f"The bookmark {id_} isn't in the database.")
+
+    def detach(id_):
+        check(id_)
+        children[parents[id_]].remove(id_)
+        changed.add(parents[id_])
+
+    changed = set()
+    placed = []
+    inserted = []
+    removed = []
+    renamed = []
+    updated = []
+    for change in changes:
+        op = change["op"]
+        if op == "add":
+            parents[change["id"]] = change["parent_id"]
+            placed.append(change)
+            row = {column: change.get(column) for column in table.c.keys()}
+            if row["date_added"] is None:
+                row["date_added"] = 0
+            inserted.append(row)
+        elif op == "move":
+            detach(change["id"])
+            parents[change["id"]] = change["parent_id"]
+            placed.append(change)
+        elif op == "rename":
+            check(change["id"])
+            renamed.append({"_id": change["id"], "title": change["title"]})
+        elif op == "update":
+            check(change["id"])
+            updated.append(change)
+        elif op == "remove":
+            removed.append(change["id"])
+        elif op != "reorder":
+            raise ValueError(f"Unknown change {op!r}.")
+
+    # the nodes moved out of the removed folders were detached already.
+    deleted = []
+    for id_ in removed:
+        detach(id_)
+        stack = [id_]
+        while stack:
+            id_ = stack.pop()
+            deleted.append(id_)
+            stack.extend(children.pop(id_, ()))
+    for change in changes:
+        if change["op"] == "reorder":
+            id_ = change["id"]
+            if sorted(change["children"]) != sorted(children.get(id_, ())):
+                raise ValueError(
+                    f"The children of the folder {id_} don't match the database."
+                )
+            children[id_] = list(change["children"])
+            changed.add(id_)
+    # placed by increasing index, around the children that stayed.
+    placed.sort(key=lambda change: change["index"])
+    for change in placed:
+        siblings = children.setdefault(change["parent_id"], [])
+        siblings.insert(change["index"], change["id"])
+        changed.add(change["parent_id"])
+
+    id_ = bindparam("_id")
+    if deleted:
+        connection.execute(
+            table.delete().where(table.c.id == id_), [{"_id": i} for i in deleted]
+        )
+    if inserted:
+        connection.execute(table.insert(), inserted)
+    if renamed:
+        connection.execute(
+            table.update().where(table.c.id == id_).values(title=bindparam("title")),
+            renamed,
+        )
+    for change in updated:
+        connection.execute(
+            table.update().where(table.c.id == change["id"]).values(**change["fields"])
+        )
+    positions = [
+        {"_id": child, "parent_id": parent_id, "index": index}
+        for parent_id in changed
+        if parent_id in children
+        for index, child in enumerate(children[parent_id])
+    ]
+    if positions:
+        connection.execute(
+            table.update()
+            .where(table.c.id == id_)
+            .values(parent_id=bindparam("parent_id"), index=bindparam("index")),
+            positions,
+        )
@@ -0,0 +1,214 @@
+"""Filters applied while a bookmarks file is parsed, so only the selected part
+of the tree is built.
+
+A `ParseFilter` selects:
+- the folders whose path matches one of the `folders` globs, along with
+  their contents. The path of a folder is the titles of its folders and its
+  own title (the root left out), the globs are matched title by title
+  ("Bookmarks bar/Work*" selects the folders starting with "Work" in the
+  "Bookmarks bar"), with the wildcards of `fnmatch`, case sensitive,
+- among the urls of the selected folders, the urls matching one of the
+  `urls` globs and added in the `added_after`/`added_before` range.
+The folders leading to the selection are kept, without their other children.
+When urls are filtered (by glob or date), the folders holding no url left are
+dropped, otherwise the selected folders are kept whole, empty ones included.
+The root of the tree is always kept.
+
+The html and json files are read as a stream of events (see `streaming.py`)
+passed through `filter_events`: a folder is only created once something in
+it is kept, the subtrees out of the selection are skipped as they are read,
+so the tree built (and the memory used) scales with the selection. In a
+database file, the folders are selected out of their (id, parent_id, title)
+and the urls are filtered by the WHERE clause of the query reading them."""
+
+from fnmatch import fnmatchcase
+
+from .streaming import END, FOLDER, URL
+
+# state of a folder: in the selection, on the path to a selected folder, or
+# out of the selection.
+SELECTED = "selected"
+ANCESTOR = "ancestor"
+SKIPPED = "skipped"
+
+
+class ParseFilter:
+    """Selection of the folders/urls built by `BookmarksConverter.parse`
+    (see the module docstring).
+
+    Usage:
+        bookmarks.parse("json", ParseFilter(folders="Bookmarks bar"))
+        bookmarks.parse("db", ParseFilter(added_after=last_month, icons=False))
+
+    Parameters:
+    -----------
+    folders : str or iterable of str
+        globs of the paths of the selected folders, all the folders being
+        selected by default (default None)
+    urls : str or iterable of str
+        globs of the urls kept, all the urls by default (default None)
+    added_after : int
+        the urls added before are dropped, the date being compared with the
+        `date_added` of the nodes, in the unit of the source file
+        (default None)
+    added_before : int
+        the urls added at or after are dropped (default None)
+    icons : bool
+        keep the icon and icon_uri of the urls, often the largest part of a
+        bookmarks file (default True)"""
+
+    def __init__(
+        self, folders=None, urls=None, added_after=None, added_before=None, icons=True
+    ):
+        if isinstance(folders, str):
+            folders = [folders]
+        if isinstance(urls, str):
+            urls = [urls]
+        self.folders = list(folders) if folders is not None else None
+        self.urls = list(urls) if urls is not None else None
+        self.added_after = added_after
+        self.added_before = added_before
+        self.icons = icons
+        self._patterns = [
+            tuple(folder.strip("/").split("/")) for folder in self.folders or ()
+        ]
+
+    @property
+    def filters_urls(self):
+        """Whether the urls are filtered, the folders left empty being dropped."""
+        return (
+            self.urls is not None
+            or self.added_after is not None
+            or self.added_before is not None
+        )
+
+    def root_state(self):
+        """Return the state of the root of the tree, as passed to
+        `folder_state` for its children."""
+        if self.folders is None:
+            return SELECTED, 0, ()
+        return ANCESTOR, 0, self._patterns
+
+    def folder_state(self, parent, title):
+        """Return the state of a folder out of the state of its parent folder,
+        as a (state, depth, globs still matching its path) tuple."""
+        state, depth, patterns = parent
+        if state != ANCESTOR:
+            return parent
+        title = title or ""
+        patterns = [
+            pattern for pattern in patterns if fnmatchcase(title, pattern[depth])
+        ]
+        if not patterns:
+            return SKIPPED, 0, ()
+        if any(len(pattern) == depth + 1 for pattern in patterns):
+            return SELECTED, 0, ()
+        return ANCESTOR, depth + 1, patterns
+
+    def match_url(self, node):
+        """Whether a url of a selected folder is kept."""
+        if self.urls is not None:
+            url = node.url
+            if url is None or not any(fnmatchcase(url, glob) for glob in self.urls):
+                return False
+        if self.added_after is not None and node.date_added < self.added_after:
+            return False
+        if self.added_before is not None and node.date_added >= self.added_before:
+            return False
+        return True
+
+    def filter_events(self, events):
+        """Yield the events of the selection out of the events of a tree (see
+        `streaming.py`). The events of a folder are held back until something
+        in it is kept, the index of the nodes isn't updated."""
+        keep_empty = not self.filters_urls
+        # the open folders and their state, the first `emitted` were yielded.
+        folders = []
+        states = []
+        emitted = 0
+        for event, node in events:
+            if event == END:
+                folders.pop()
+                states.pop()
+                if emitted > len(folders):
+                    emitted -= 1
+                    yield END, node
+                continue
+            if event == FOLDER:
+                if not states:
+                    state = self.root_state()
+                else:
+                    state = self.folder_state(states[-1], node.title)
+                folders.append(node)
+                states.append(state)
+                if not emitted or (state[0] == SELECTED and keep_empty):
+                    for folder in folders[emitted:]:
+                        yield FOLDER, folder
+                    emitted = len(folders)
+            elif states[-1][0] == SELECTED and self.match_url(node):
+                for folder in folders[emitted:]:
+                    yield FOLDER, folder
+                emitted = len(folders)
+                if not self.icons:
+                    node.icon = node.icon_uri = None
+                yield URL, node
+
+    def select_folders(self, folders, root_id=1):
+        """Return the ids of the selected folders out of the folders of a
+        database, and the id of the parent of each folder.
+
+        folders : iterable of tuple
+            (id, parent_id, title) of each folder"""
+        parents = {}
+        children = {}
+        titles = {}
+        for id_, parent_id, title in folders:
+            parents[id_] = parent_id
+            titles[id_] = title
+            children.setdefault(parent_id, []).append(id_)
+        selected = set()
+        stack = [(root_id, self.root_state())]
+        while stack:
+            id_, state = stack.pop()
+            if state[0] == SELECTED:
+                selected.add(id_)
+            for child in children.get(id_, ()):
+                child_state = self.folder_state(state, titles[child])
+                if child_state[0] != SKIPPED:
+                    stack.append((child, child_state))
+        return selected, parents
+
+    def kept_folders(self, selected, parents, url_parents, root_id=1):
+        """Return the ids of the folders kept out of the selected folders, the
+        parent of each folder and the folders holding the urls kept."""
+        kept = {root_id}
+        if self.filters_urls:
+            folders = url_parents
+        else:
+            folders = selected
+        for id_ in folders:
+            while id_ is not None and id_ not in kept:
+                kept.add(id_)
+                id_ = parents.get(id_)
+        return kept
+
+    def url_conditions(self, table):
+        """Return the conditions of the WHERE clause selecting the urls kept
+        out of a bookmark table, the folders aside."""
+        from sqlalchemy import or_
+
+        conditions = []
+        if self.urls is not None:
+            conditions.append(
+                or_(*(table.c.url.op("GLOB")(_sql_glob(glob)) for glob in self.urls))
+            )
+        if self.added_after is not None:
+            conditions.append(table.c.date_added >= self.added_after)
+        if self.added_before is not None:
+            conditions.append(table.c.date_added < self.added_before)
+        return conditions
+
+
+def _sql_glob(glob):
+    """Translate a `fnmatch` glob to the GLOB operator of SQLite."""
+    return glob.replace("[!", "[^")
@@ -0,0 +1,313 @@
+"""Detection of the format of a bookmarks file, and registry of the formats
+read and written by BookmarksConverter.
+
+This module only relies on the standard library, so it can be used (by the
+command line interface for example) without loading the parsing backends.
+
+Each format is described by a `FormatPlugin`: its reader and writer, given as
+"module:attribute" strings imported the first time the format is used, and
+its capabilities, out of which the converter picks the fastest path:
+- `streaming`, the file is read as a stream of events (see `streaming.py`),
+  converted to the streaming formats without building the tree and
+  filtered while it is read,
+- `random_access`, the reader selects the part of the file passed by a
+  ParseFilter without reading it whole (a database queried with a WHERE
+  clause),
+- `incremental`, the output of the folders left unchanged since the last
+  conversion is reused (see `merkle.py`).
+
+The "db", "html" and "json" formats are built in, read by `db_reader.py`,
+`html_reader.py` and `json_reader.py` (so a JSON file is converted without
+loading SQLAlchemy or BeautifulSoup). Other formats are added with `register_format`, or by a
+package declaring a FormatPlugin under the "bookmarks_converter.formats"
+entry point group, e.g. in its pyproject.toml:
+
+    [tool.poetry.plugins."bookmarks_converter.formats"]
+    "txt" = "bookmarks_txt:plugin"
+
+The entry points are only looked up (and loaded) once a format that isn't
+registered is requested."""
+
+from importlib import import_module
+from pathlib import Path
+
+from .compression import (
+    compression_of,
+    detect_compression,
+    open_file,
+    strip_compression,
+)
+
+FORMATS = ("db", "html", "json")
+
+# file extensions of each format.
+SUFFIXES = {
+    ".db": "db",
+    ".sqlite": "db",
+    ".sqlite3": "db",
+    ".htm": "html",
+    ".html": "html",
+    ".json": "json",
+}
+
+_SQLITE_HEADER = b"SQLite format 3\x00"
+
+ENTRY_POINT_GROUP = "bookmarks_converter.formats"
+
+
+class FormatPlugin:
+    """A bookmarks format read and/or written by BookmarksConverter (see the
+    module docstring).
+
+    The reader has a `parse(converter)` method returning the root folder of
+    the tree of `converter.filepath`, its folders/urls indexed and holding
+    the attributes of the nodes of `models.py` (JSONBookmark for example).
+    A streaming reader has an `events(converter)` method yielding the
+    events of the file instead, a random access reader is passed the filter
+    as `parse(converter, filter_)` and returns its selection only.
+
+    The writer is an event writer class (with the `start`, `write`, `close`
+    and `join` methods of `HTMLEventWriter`), its output (str, bytes, or str
+    chunks in streaming mode) is saved to a file with the first suffix.
+
+    Usage:
+        register_format(FormatPlugin("txt", writer="bookmarks_txt:TextWriter"))
+
+    Parameters:
+    -----------
+    name : str
+        name of the format, passed to `parse` and `convert`
+    reader : str or object
+        "module:attribute" of the reader (or "module", the reader being the
+        module itself), None for a format that can't be read (default None)
+    writer : str or object
+        "module:attribute" of the writer class, None for a format that can't
+        be written (default None)
+    suffixes : iterable of str
+        extensions of the files of the format, the first one used by the
+        output file (default "." followed by the name)
+    streaming : bool
+        whether the format is read as, and written from, a stream of events
+        (default False)
+    random_access : bool
+        whether the reader builds the selection of a filter without reading
+        the whole file (default False)
+    fragments : str or object
+        "module:attribute" of the class rendering the output of a tree out
+        of its MerkleIndex (see `HTMLFragments`), None if the output can't
+        be reused (default None)
+
+    Attributes:
+    -----------
+    incremental : bool
+        whether the output of the unchanged folders is reused"""
+
+    def __init__(
+        self,
+        name,
+        reader=None,
+        writer=None,
+        suffixes=None,
+        streaming=False,
+        random_access=False,
+        fragments=None,
+    ):
+        self.name = name.lower()
+        self._reader = reader
+        self._writer = writer
+        self._fragments = fragments
+        if suffixes is None:
+            suffixes = [f".{self.name}"]
+        self.suffixes = tuple(suffix.lower() for suffix in suffixes)
+        self.streaming = streaming
+        self.random_access = random_access
+        self.incremental = fragments is not None
+
+    def __repr__(self):
+        return f"FormatPlugin({self.name!r})"
+
+    @property
+    def reader(self):
+        """The reader, imported on first use."""
+        self._reader = self._load(self._reader, "read")
+        return self._reader
+
+    @property
+    def writer(self):
+        """The writer class, imported on first use."""
+        self._writer = self._load(self._writer, "written")
+        return self._writer
+
+    @property
+    def fragments(self):
+        """The fragments class, imported on first use."""
+        self._fragments = self._load(self._fragments, "converted incrementally")
+        return self._fragments
+
+    def _load(self, target, action):
+        if target is None:
+            raise TypeError(f"The format '{self.name}' can't be {action}.")
+        if not isinstance(target, str):
+            return target
+        module, _, attributes = target.partition(":")
+        value = import_module(module)
+        for attribute in attributes.split(".") if attributes else ():
+            value = getattr(value, attribute)
+        return value
+
+
+# the builtin formats, saved by the mixins of BookmarksConverter.
+_BUILTIN_FORMATS = (
+    FormatPlugin(
+        "db",
+        reader=f"{__package__}.db_reader",
+        writer=f"{__package__}.streaming:DBEventWriter",
+        suffixes=(".db", ".sqlite", ".sqlite3"),
+        random_access=True,
+    ),
+    FormatPlugin(
+        "html",
+        reader=f"{__package__}.html_reader",
+        writer=f"{__package__}.streaming:HTMLEventWriter",
+        suffixes=(".html", ".htm"),
+        streaming=True,
+        fragments=f"{__package__}.merkle:HTMLFragments",
+    ),
+    FormatPlugin(
+        "json",
+        reader=f"{__package__}.json_reader",
+        # the json dict is serialized in one go, faster than per node chunks.
+        writer=f"{__package__}.streaming:JSONTreeWriter",
+        suffixes=(".json",),
+        streaming=True,
+        fragments=f"{__package__}.merkle:JSONFragments",
+    ),
+)
+
+_registry = {plugin.name: plugin for plugin in _BUILTIN_FORMATS}
+# the entry points of the installed plugins by name, not loaded yet.
+_entry_points = None
+
+
+def register_format(plugin, replace=False):
+    """Register a format, to be used by BookmarksConverter.
+
+    Parameters:
+    -----------
+    plugin : FormatPlugin
+        the format
+    replace : bool
+        replace the format already registered under the same name, a
+        ValueError being raised otherwise (default False)"""
+    if not replace and plugin.name in _registry:
+        raise ValueError(f"The format '{plugin.name}' is already registered.")
+    _registry[plugin.name] = plugin
+
+
+def get_format(name):
+    """Return the FormatPlugin of a format, loading it from its entry point
+    if it isn't registered, None if there is no such format.
+
+    Parameters:
+    -----------
+    name : str
+        name of the format"""
+    name = name.lower()
+    plugin = _registry.get(name)
+    if plugin is None:
+        entry_point = _plugin_entry_points().get(name)
+        if entry_point is not None:
+            plugin = entry_point.load()
+            if not isinstance(plugin, FormatPlugin):
+                raise TypeError(
+                    f"The entry point of the format '{name}' isn't a FormatPlugin."
+                )
+            _registry[name] = plugin
+    return plugin
+
+
+def available_formats():
+    """Return the names of the formats registered or provided by the
+    installed plugins, without loading the plugins."""
+    return tuple(dict.fromkeys(list(_registry) + list(_plugin_entry_points())))
+
+
+def _plugin_entry_points():
+    global _entry_points
+    if _entry_points is None:
+        _entry_points = {
+            entry_point.name.lower(): entry_point
+            for entry_point in _iter_entry_points(ENTRY_POINT_GROUP)
+        }
+    return _entry_points
+
+
+def _iter_entry_points(group):
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        # python < 3.8
+        try:
+            from pkg_resources import iter_entry_points
+        except ImportError:
+            return ()
+        return iter_entry_points(group)
+    entry_points = entry_points()
+    if hasattr(entry_points, "select"):
+        return entry_points.select(group=group)
+    return entry_points.get(group, ())
+
+
+def _format_of_suffix(suffix):
+    """Return the name of the plugin format with the suffix, None if there
+    is none. The plugins that aren't loaded yet are matched out of their
+    name (".txt" for the "txt" format), without loading them."""
+    for name, plugin in _registry.items():
+        if name not in FORMATS and suffix in plugin.suffixes:
+            return name
+    name = suffix[1:]
+    if name in _plugin_entry_points() and name not in _registry:
+        return name
+    return None
+
+
+def detect_format(filepath):
+    """Return the format ("db", "html" or "json") of a bookmarks file, out
+    of its extension (the ones of the plugin formats included) or, failing
+    that, out of its first bytes.
+
+    A compressed file (see `compression.py`) is detected out of the
+    extension before the one of its compression, or of its first bytes once
+    decompressed.
+
+    Parameters:
+    -----------
+    filepath : str or Path
+        path to the bookmarks file
+
+    Returns:
+    --------
+    str or None
+        the format of the file, None if it isn't recognized"""
+    suffix = strip_compression(filepath).suffix.lower()
+    format_ = SUFFIXES.get(suffix)
+    if format_ is None and suffix:
+        format_ = _format_of_suffix(suffix)
+    if format_ is not None:
+        return format_
+    compression = compression_of(filepath)
+    with open_file(filepath, "rb", compression) as file_:
+        head = file_.read(1024)
+    if compression is None:
+        compression = detect_compression(head)
+        if compression is not None:
+            with open_file(filepath, "rb", compression) as file_:
+                head = file_.read(1024)
+    if head.startswith(_SQLITE_HEADER):
+        return "db"
+    head = head.lstrip(b"\xef\xbb\xbf \t\r\n")
+    if head.startswith((b"{", b"[")):
+        return "json"
+    if head.startswith(b"<"):
+        return "html"
+    return None
@@ -0,0 +1,162 @@
+"""HTMLBookmark, the folders/urls of the HTML bookmarks files."""
+
+import itertools
+import time
+from html import unescape
+
+from bs4 import Tag
+
+from .models import NodeMixin
+
+
+class HTMLBookmark(Tag, NodeMixin):
+    """TreeBuilder class, used to add additional functionality to the
+    BeautifulSoup Tag class. The following functionality is added:
+
+    - add id to each folder("h3")/url("a") being imported
+    - add property access to the Tag class' attributes
+      (date_added, icon, icon_uri, id, index, title, type and url)
+      which are usually found at the 'self.attrs' dictionary.
+    - add a setter for (icon, icon_uri, id, index, parent_id, title and url)
+    - decode the attributes stored as UTF-8 bytes (by `HTMLEventScanner`)
+    on first access
+    - redirect the self.children from an iterator `iter(self.contents)`
+    to a list `self.contents` directly
+    - use the NodeMixin equality and hashing for folders/urls instead of the
+    Tag ones, which compare and hash the rendered markup of the whole subtree.
+    The other tags keep the Tag equality and hashing."""
+
+    id_counter = itertools.count(start=2)
+
+    # the stored date is compared, `date_added` falls back to the current time.
+    _folder_fields = ("type", "id", "title", "_add_date")
+    _url_fields = _folder_fields + ("url", "icon", "icon_uri", "tags")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.name in ("a", "h3"):
+            if not self.attrs.get("id"):
+                self.attrs["id"] = next(__class__.id_counter)
+
+    def __eq__(self, other):
+        if self.type is None:
+            return Tag.__eq__(self, other)
+        return NodeMixin.__eq__(self, other)
+
+    def __hash__(self):
+        if self.type is None:
+            return Tag.__hash__(self)
+        return NodeMixin.__hash__(self)
+
+    @property
+    def _add_date(self):
+        """The stored `add_date` attribute, None if it doesn't exist."""
+        date_added = self.attrs.get("add_date")
+        return int(date_added) if date_added else None
+
+    @property
+    def date_added(self):
+        """Redirect the `add_date` lookup to a `date_added` attribute.
+        add a `date_added` with current datetime if it doesn't exist"""
+        date_added = self.attrs.get("add_date")
+        if not date_added:
+            date_added = round(time.time() * 1000)
+        return int(date_added)
+
+    @property
+    def icon(self):
+        """Redirect the `icon` lookup to a `icon` attribute."""
+        return self._attribute("icon")
+
+    @icon.setter
+    def icon(self, new_icon):
+        self.attrs["icon"] = new_icon
+
+    @property
+    def icon_uri(self):
+        """Redirect the `iconuri` lookup to a `icon_uri` attribute."""
+        return self._attribute("iconuri")
+
+    @icon_uri.setter
+    def icon_uri(self, new_icon_uri):
+        self.attrs["iconuri"] = new_icon_uri
+
+    @property
+    def id(self):
+        """Redirect the `id` lookup to a `id` attribute."""
+        return self.attrs.get("id")
+
+    @id.setter
+    def id(self, new_id):
+        self.attrs["id"] = new_id
+
+    @property
+    def index(self):
+        """Redirect the `index` lookup to a `index` attribute."""
+        return self.attrs.get("index")
+
+    @index.setter
+    def index(self, new_index):
+        self.attrs["index"] = new_index
+
+    @property
+    def parent_id(self):
+        """Redirect the `parent_id` lookup to a `parent_id` attribute."""
+        return self.attrs.get("parent_id")
+
+    @parent_id.setter
+    def parent_id(self, new_parent_id):
+        self.attrs["parent_id"] = new_parent_id
+
+    @property
+    def tags(self):
+        """Redirect the `tags` lookup to a `tags` attribute."""
+        return self._attribute("tags")
+
+    @property
+    def title(self):
+        """Redirect the `title` lookup to a `title` attribute."""
+        return self._attribute("title")
+
+    @title.setter
+    def title(self, new_title):
+        self.attrs["title"] = new_title
+
+    @property
+    def type(self):
+        """Add a type attribute defining the type of object the instance is."""
+        if self.name == "h3":
+            return "folder"
+        elif self.name == "a":
+            return "url"
+
+    @property
+    def url(self):
+        """Redirect the `href` lookup to a `url` attribute."""
+        return self._attribute("href")
+
+    @url.setter
+    def url(self, new_url):
+        self.attrs["href"] = new_url
+
+    @property
+    def children(self):
+        """To standardize the access of children amongst the different
+        Bookmark classes."""
+        return self.contents
+
+    def _attribute(self, key):
+        """Return an attribute, decoding it (and its character references,
+        as the HTML parser does) if it is stored as UTF-8 bytes."""
+        value = self.attrs.get(key)
+        if value.__class__ is bytes:
+            value = value.decode("utf-8")
+            if "&" in value:
+                value = unescape(value)
+            self.attrs[key] = value
+        return value
+
+    @classmethod
+    def reset_id_counter(cls):
+        """Reset the id_counter."""
+        cls.id_counter = itertools.count(start=2)
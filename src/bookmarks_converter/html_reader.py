@@ -0,0 +1,171 @@
+"""Reader of the HTML bookmarks files, Netscape-Bookmark files exported by
+Chrome or Firefox.
+
+It is the reader of the builtin "html" FormatPlugin (see `formats.py`),
+imported the first time a HTML file is read, so BeautifulSoup (the Tag class
+of the HTMLBookmark nodes) is only loaded once a HTML file is parsed. The
+file is scanned as bytes by HTMLEventScanner, its events are either built
+into a tree (`parse`) or streamed (`events`)."""
+
+import time
+
+from .html_models import HTMLBookmark
+from .streaming import END, FOLDER, HTMLEventScanner, add_index, build_tree
+
+
+def parse(converter):
+    """Return the root of the tree of the HTML bookmarks file of the
+    converter, a tree of HTMLBookmark objects (soup tags), which add
+    property access to the html attributes. It is the same tree as
+    formatting the file with `format_html_file` and parsing it with
+    BeautifulSoup.
+
+    Parameters:
+    -----------
+    converter : BookmarksConverter
+        the converter parsing the file"""
+    stats = converter._stats
+    with stats.phase("scan_html", read=converter.filepath):
+        tree = build_tree(_iter_events(converter))
+    with stats.phase("restructure_root"):
+        root = restructure_root(tree)
+    with stats.phase("add_index"):
+        converter._add_index(root)
+    return root
+
+
+def events(converter):
+    """Return the events of the HTML bookmarks file of the converter (see
+    `streaming.py`), restructured as by `parse` and indexed.
+
+    Parameters:
+    -----------
+    converter : BookmarksConverter
+        the converter reading the file"""
+    return add_index(restructure_root_events(_iter_events(converter)))
+
+
+def _iter_events(converter):
+    """Read the events of the first folder of the HTML bookmarks file, the ids
+    of its folders/urls starting at 2. The ids are counted by the scan,
+    several files can be parsed at once in different threads."""
+    if converter._plain_source():
+        yield from HTMLEventScanner(converter.filepath)
+    else:
+        with converter.open_source(text=False) as file_:
+            yield from HTMLEventScanner(file_)
+
+
+def create_root():
+    """Create the root folder added on top of the HTML parsed tree."""
+    return HTMLBookmark(
+        name="h3",
+        attrs={
+            "id": 1,
+            "index": 0,
+            "title": "root",
+            "add_date": round(time.time() * 1000),
+        },
+    )
+
+
+def restructure_root(tree):
+    """Return the root of the HTML parsed tree, restructured to allow for an
+    easier processing.
+
+    If the tree title is 'Bookmarks Menu' we need to extract the two folders
+    'Bookmarks Toolbar' and 'Other Bookmarks', then insert them into the root
+    folders children.
+
+    If the tree title is 'Bookmarks' we need to extract the 'Bookmarks bar'
+    folder and insert it at the beginning of the root children. Then we need
+    to rename the 'Bookmarks' folder to 'Other Bookmarks'.
+
+    Parameters:
+    -----------
+    tree : HTMLBookmark
+        the first folder ("<H1>"/"<H3>") of the html file, as built out of
+        the events of HTMLEventScanner"""
+    root = create_root()
+    root.children.append(tree)
+    if tree.title == "Bookmarks Menu":
+        for i, child in enumerate(tree):
+            if child.title in ("Bookmarks Toolbar", "Other Bookmarks"):
+                root.children.append(tree.children.pop(i))
+    elif tree.title == "Bookmarks":
+        tree.title = "Other Bookmarks"
+        for i, child in enumerate(tree):
+            if child.title == "Bookmarks bar":
+                root.children.insert(0, tree.children.pop(i))
+                break
+    return root
+
+
+def restructure_root_events(events):
+    """Apply the changes of `restructure_root` to a stream of events.
+
+    Only the items moved to the root are held back: the 'Bookmarks Toolbar'
+    and 'Other Bookmarks' folders until the end of the 'Bookmarks Menu', or
+    the items preceding the 'Bookmarks bar' in 'Bookmarks'."""
+    root = create_root()
+    yield FOLDER, root
+    events = iter(events)
+    _, tree = next(events, (None, None))
+    if tree is None:
+        yield END, root
+        return
+    depth = 0
+    if tree.title == "Bookmarks Menu":
+        yield FOLDER, tree
+        moved = []
+        item = None
+        # restructure_root pops from the list it enumerates, so the item
+        # following a moved one is skipped.
+        skip = False
+        for event, node in events:
+            if depth == 0:
+                if event == END:
+                    break
+                move = not skip and node.title in (
+                    "Bookmarks Toolbar",
+                    "Other Bookmarks",
+                )
+                skip = move
+                item = [] if move else None
+                if move:
+                    moved.append(item)
+            depth += (event == FOLDER) - (event == END)
+            if item is None:
+                yield event, node
+            else:
+                item.append((event, node))
+        yield END, tree
+        for item in moved:
+            yield from item
+    elif tree.title == "Bookmarks":
+        tree.title = "Other Bookmarks"
+        held = [(FOLDER, tree)]
+        in_bar = False
+        for event, node in events:
+            if depth == 0:
+                if event == END:
+                    break
+                in_bar = held is not None and node.title == "Bookmarks bar"
+            depth += (event == FOLDER) - (event == END)
+            if in_bar:
+                yield event, node
+                if depth == 0:
+                    in_bar = False
+                    yield from held
+                    held = None
+            elif held is not None:
+                held.append((event, node))
+            else:
+                yield event, node
+        if held is not None:
+            yield from held
+        yield END, tree
+    else:
+        yield FOLDER, tree
+        yield from events
+    yield END, root
@@ -0,0 +1,170 @@
+"""Reader of the JSON bookmarks files: the Chrome bookmarks file, the Firefox
+.json bookmarks export file, and the custom json file created by this
+package.
+
+It is the reader of the builtin "json" FormatPlugin (see `formats.py`),
+imported the first time a JSON file is read. The file is either loaded
+whole as a tree of JSONBookmark objects (`parse`), or read as a stream of
+events (`events`)."""
+
+import json
+
+from .models import JSONBookmark
+from .streaming import END, FOLDER, JSONEventReader, add_index
+
+# titles of the firefox root folders.
+FIREFOX_ROOT_FOLDERS = {
+    "menu": "Bookmarks Menu",
+    "toolbar": "Bookmarks Toolbar",
+    "unfiled": "Other Bookmarks",
+    "mobile": "Mobile Bookmarks",
+}
+
+# root folder added on top of the Chrome roots.
+CHROME_ROOT = {
+    "name": "root",
+    "id": 0,
+    "index": 0,
+    "parent_id": 0,
+    "type": "folder",
+    "date_added": 0,
+}
+
+
+def parse(converter):
+    """Return the root of the tree of the JSON bookmarks file of the
+    converter, as a JSONBookmark object.
+
+    Parameters:
+    -----------
+    converter : BookmarksConverter
+        the converter parsing the file"""
+    stats = converter._stats
+    if converter._plain_source():
+        with stats.phase(
+            "format_json_file",
+            read=converter.filepath,
+            written=converter.temp_filepath,
+        ):
+            format_json_file(converter.filepath, converter.temp_filepath)
+        # with object_hook the json tree is loaded as JSONBookmark object tree.
+        with stats.phase("json_load", read=converter.temp_filepath):
+            with open(converter.temp_filepath, "r", encoding="utf-8") as file_:
+                tree = json.load(file_, object_hook=json_to_object)
+        converter.temp_filepath.unlink()
+    else:
+        # the formatted json of a compressed file (or a file object) is kept
+        # in memory, the uncompressed file never being written.
+        with stats.phase("format_json_file", read=converter.filepath):
+            with converter.open_source() as file_:
+                tree = format_json_tree(json.load(file_))
+            formatted = json.dumps(tree, ensure_ascii=False)
+        with stats.phase("json_load"):
+            tree = json.loads(formatted, object_hook=json_to_object)
+    if tree.source == "Chrome":
+        with stats.phase("add_index"):
+            converter._add_index(tree)
+    return tree
+
+
+def json_to_object(jdict):
+    """Helper function used as object_hook for json load."""
+    return JSONBookmark(**jdict)
+
+
+def format_json_file(filepath, output_filepath):
+    """Reads Chrome/Firefox/Bookmarkie JSON bookmarks file (at filepath), and
+    modifies it to a standard format to allow for easy parsing/converting.
+    Exporting the result to a new JSON file (output_filepath) with a prefix
+    of 'output_'."""
+    with open(filepath, "r", encoding="utf-8") as file_:
+        tree = format_json_tree(json.load(file_))
+
+    with open(output_filepath, "w", encoding="utf-8") as file_:
+        json.dump(tree, file_, ensure_ascii=False)
+
+
+def format_json_tree(tree):
+    """Return the tree of a Chrome/Firefox/Bookmarkie JSON file in the
+    standard format (see `format_json_file`)."""
+    if tree.get("checksum"):
+        tree = {
+            "name": "root",
+            "id": 0,
+            "index": 0,
+            "parent_id": 0,
+            "type": "folder",
+            "date_added": 0,
+            "children": list(tree.get("roots").values()),
+        }
+        tree["children"][1]["name"] = "Other Bookmarks"
+    elif tree.get("root"):
+        tree["title"] = "root"
+        for child in tree.get("children"):
+            child["title"] = FIREFOX_ROOT_FOLDERS[child.get("title")]
+    return tree
+
+
+def events(converter):
+    """Read the JSON bookmarks file of the converter as a stream of events
+    (see `streaming.py`), applying the same changes as `format_json_file`
+    and `parse` while reading.
+
+    Parameters:
+    -----------
+    converter : BookmarksConverter
+        the converter reading the file"""
+    with converter.open_source() as file_:
+        reader = JSONEventReader(file_)
+        fields = {}
+        streamed = False
+        for key in reader.iter_keys():
+            if streamed:
+                reader.read_value()
+            elif key == "roots" and fields.get("checksum"):
+                streamed = True
+                yield from add_index(_iter_chrome_roots(reader))
+            elif key == "children":
+                streamed = True
+                yield from _iter_json_root(reader, fields)
+            else:
+                fields[key] = reader.read_value()
+        if not streamed:
+            node = json_to_object(fields)
+            yield FOLDER, node
+            yield END, node
+
+
+def _iter_chrome_roots(reader):
+    """Events of the Chrome "roots" object, wrapped in a root folder."""
+    root = json_to_object(dict(CHROME_ROOT))
+    yield FOLDER, root
+    for position, _ in enumerate(reader.iter_keys()):
+        if position == 1:
+            prepare = lambda fields: fields.update(name="Other Bookmarks")
+        else:
+            prepare = None
+        yield from reader.iter_node(json_to_object, prepare)
+    yield END, root
+
+
+def _iter_json_root(reader, fields):
+    """Return the events of the root folder of a Firefox or custom JSON file,
+    reader being positioned at the "children" of the root."""
+    prepare = None
+    if fields.get("root"):
+        fields["title"] = "root"
+
+        def prepare(child, position):
+            child["title"] = FIREFOX_ROOT_FOLDERS[child.get("title")]
+
+    root = json_to_object(fields)
+
+    def events():
+        yield FOLDER, root
+        yield from reader.iter_children(json_to_object, prepare)
+        yield END, root
+
+    if root.source == "Chrome":
+        return add_index(events())
+    return events()
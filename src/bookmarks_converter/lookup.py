@@ -0,0 +1,132 @@
+"""Lookup tables of a bookmarks tree: the nodes by id, the folder of each
+node and the path of each node.
+
+The nodes only know their children, finding the folder or the path of a node
+means walking the tree. `TreeIndex` maps the id of each node to the node and
+to its folder in a single traversal, then each lookup by id is a dict
+lookup. The path of a node is the titles of its folders and its own title
+joined with "/" (the root left out), such as "Bookmarks bar/Work/Infra". It
+is computed from the path of its folder on the first lookup and cached, so
+looking up the paths of a whole tree costs one string per node. The nodes
+by path are only mapped on the first lookup by path."""
+
+from .streaming import END, iter_tree_events
+
+
+class TreeIndex:
+    """The nodes of a bookmarks tree by id, their folder and their path (see
+    the module docstring). The ids of the nodes have to be unique.
+
+    Usage:
+        index = TreeIndex(bookmarks_tree)
+        node = index.get(12)
+        index.parent(node)  # its folder
+        index.path(node)  # "Bookmarks bar/Work/Infra"
+        index.find("Bookmarks bar/Work")  # the node with this path
+
+    Parameters:
+    -----------
+    root : NodeMixin
+        root of the tree (Bookmark, HTMLBookmark, JSONBookmark or NodeView)
+
+    Attributes:
+    -----------
+    root : NodeMixin
+        root of the indexed tree"""
+
+    def __init__(self, root):
+        self.root = root
+        self._nodes = {root.id: root}
+        self._parents = {root.id: None}
+        # the paths looked up so far, by node id.
+        self._paths = {root.id: ""}
+        # the nodes by path, mapped on the first lookup by path.
+        self._by_path = None
+        self._index_children(root)
+
+    def _index_children(self, folder):
+        nodes = self._nodes
+        parents = self._parents
+        stack = [folder]
+        while stack:
+            folder = stack.pop()
+            for child in folder.children:
+                nodes[child.id] = child
+                parents[child.id] = folder
+                if child.type == "folder":
+                    stack.append(child)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, id_):
+        return id_ in self._nodes
+
+    def get(self, id_, default=None):
+        """Return the node with this id, or the default if there is none."""
+        return self._nodes.get(id_, default)
+
+    def parent(self, node):
+        """Return the folder of a node, None for the root. Raises a KeyError
+        for a node that isn't in the index."""
+        return self._parents[node.id]
+
+    def path(self, node):
+        """Return the path of a node, "" for the root. Raises a KeyError for a
+        node that isn't in the index."""
+        paths = self._paths
+        path = paths.get(node.id)
+        if path is not None:
+            return path
+        # the ancestors whose path isn't cached yet.
+        missing = []
+        while path is None:
+            missing.append(node)
+            node = self._parents[node.id]
+            path = paths.get(node.id)
+        for node in reversed(missing):
+            title = node.title or ""
+            path = paths[node.id] = f"{path}/{title}" if path else title
+        return path
+
+    def find(self, path, default=None):
+        """Return the node with this path, the first one in the order of the
+        tree if several nodes share it, or the default if there is none."""
+        if self._by_path is None:
+            by_path = {}
+            for event, node in iter_tree_events(self.root):
+                if event != END and node.id in self._nodes:
+                    by_path.setdefault(self.path(node), node)
+            self._by_path = by_path
+        return self._by_path.get(path.strip("/"), default)
+
+    def add(self, node, parent):
+        """Index a node added to a folder of the tree, along with its
+        descendants."""
+        self._nodes[node.id] = node
+        self._parents[node.id] = parent
+        if node.type == "folder":
+            self._index_children(node)
+        self._by_path = None
+
+    def remove(self, node):
+        """Remove a node removed from the tree from the index, along with its
+        descendants."""
+        for id_ in self._subtree_ids(node):
+            self._nodes.pop(id_, None)
+            self._parents.pop(id_, None)
+            self._paths.pop(id_, None)
+        self._by_path = None
+
+    def update(self, node):
+        """Drop the cached paths of a renamed node and of its descendants."""
+        for id_ in self._subtree_ids(node):
+            self._paths.pop(id_, None)
+        self._paths[self.root.id] = ""
+        self._by_path = None
+
+    @staticmethod
+    def _subtree_ids(node):
+        if node.type != "folder":
+            return [node.id]
+        return [child.id for event, child in iter_tree_events(node) if event != END]
@@ -0,0 +1,117 @@
+"""Merging of several bookmarks trees into one.
+
+The trees (parsed from a Chrome json, a Firefox json, a legacy database, ...)
+are traversed one after the other and copied into a single ColumnarTree:
+- the roots of the trees become the root of the merged tree,
+- the folders with the same path (the titles of the folders from the root)
+  are merged into one, the special folders of the different browsers
+  ("Bookmarks bar" and "toolbar", ...) being considered the same at the top
+  of the tree,
+- a url whose normalized url (see `dedup.normalize_url`) was already added is
+  skipped, the first tree having precedence,
+- the nodes are numbered as they are added, so the ids of the merged tree
+  never overlap whatever the ids of the source trees.
+
+Each node is looked up in two dicts, the folders by (parent row, title) and
+the urls by normalized url, the whole merge is a single traversal of each
+tree."""
+
+from .columnar import ColumnarTree
+from .dedup import normalize_url
+from .streaming import END, FOLDER, iter_tree_events
+
+# titles of the special folders of the browsers, merged at the top of the tree.
+_ROOT_FOLDER_TITLES = {
+    "Bookmarks Toolbar": "toolbar",
+    "Bookmarks bar": "toolbar",
+    "toolbar": "toolbar",
+    "Other Bookmarks": "unfiled",
+    "unfiled": "unfiled",
+    "Bookmarks Menu": "menu",
+    "menu": "menu",
+    "Mobile Bookmarks": "mobile",
+    "Mobile bookmarks": "mobile",
+    "mobile": "mobile",
+}
+
+
+def merge_trees(roots, dedup=True):
+    """Merge bookmarks trees into a single ColumnarTree (see the module
+    docstring). The folders/urls of the merged tree are numbered from 1 in
+    the order they are added, their index being their position among the
+    children of their (merged) folder.
+
+    Parameters:
+    -----------
+    roots : iterable of NodeMixin
+        roots of the trees to merge (Bookmark, HTMLBookmark, JSONBookmark or
+        NodeView), in order of precedence
+    dedup : bool
+        skip the urls whose normalized url is already in the merged tree
+        (default True)
+
+    Returns:
+    --------
+    ColumnarTree
+        the merged tree"""
+    tree = ColumnarTree()
+    # number of children of each row of the merged tree.
+    counts = []
+    folders = {}
+    urls = set()
+
+    def add(node, parent_row):
+        row = len(counts)
+        if node.type == "url":
+            url_fields = (node.url, node.icon, node.icon_uri, node.tags)
+        else:
+            url_fields = ()
+        if parent_row < 0:
+            parent_id = index = None
+        else:
+            parent_id = parent_row + 1
+            index = counts[parent_row]
+            counts[parent_row] += 1
+        tree.append_row(
+            node.type,
+            row + 1,
+            parent_id,
+            index,
+            node.title,
+            node.date_added,
+            *url_fields,
+            parent_row=parent_row,
+        )
+        counts.append(0)
+        return row
+
+    for root in roots:
+        # rows of the merged folders matching the folders being traversed.
+        rows = []
+        for event, node in iter_tree_events(root):
+            if event == FOLDER:
+                if not rows:
+                    if not counts:
+                        add(node, -1)
+                    rows.append(0)
+                    continue
+                parent_row = rows[-1]
+                title = node.title
+                if parent_row == 0:
+                    title = _ROOT_FOLDER_TITLES.get(title, title)
+                row = folders.get((parent_row, title))
+                if row is None:
+                    row = folders[parent_row, title] = add(node, parent_row)
+                rows.append(row)
+            elif event == END:
+                rows.pop()
+            else:
+                if dedup and node.url is not None:
+                    key = normalize_url(node.url)
+                    if key in urls:
+                        continue
+                    urls.add(key)
+                add(node, rows[-1])
+    if not counts:
+        raise ValueError("No bookmarks tree to merge.")
+    return tree
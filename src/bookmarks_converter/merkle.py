@@ -0,0 +1,209 @@
+"""Merkle hashes of the subtrees of a bookmarks tree, and reuse of the output
+of the unchanged subtrees.
+
+The digest of a url is the hash of its fields (those compared by NodeMixin,
+and its index). The digest of a folder also covers the digests of its
+children, in order, so two subtrees with the same digest hold the same
+folders/urls and produce the same output. `MerkleIndex` computes the digests
+bottom-up in a single traversal and keeps them until a node is marked as
+changed, which drops the digests of the node and of its ancestors only.
+
+`HTMLFragments` and `JSONFragments` keep the output of each folder by
+digest: converting a tree again only formats the folders whose digest
+changed, the output of the others is reused as is."""
+
+import hashlib
+
+from .streaming import HTMLEventWriter
+
+
+def _own_digest(node, children=()):
+    """Digest of the fields of a node followed by the digests of its
+    children."""
+    hash_ = hashlib.sha1(repr((node._key(), node.index)).encode("utf-8"))
+    for digest in children:
+        hash_.update(digest)
+    return hash_.digest()
+
+
+class MerkleIndex:
+    """Digests of the subtrees of a bookmarks tree (see the module docstring),
+    the nodes being identified by their id.
+
+    Usage:
+        index = MerkleIndex(bookmarks_tree)
+        index.hexdigest()  # digest of the whole tree
+        node.title = "new title"
+        index.changed(node)  # only the digests of the path to the root are recomputed
+
+    Parameters:
+    -----------
+    root : NodeMixin
+        root of the tree (Bookmark, HTMLBookmark, JSONBookmark or NodeView)
+
+    Attributes:
+    -----------
+    root : NodeMixin
+        root of the tree"""
+
+    def __init__(self, root):
+        self.root = root
+        self._digests = {}
+        # the id of the folder of each node, to invalidate its ancestors.
+        self._parents = {}
+        self.digest(root)
+
+    def digest(self, node):
+        """Return the digest of the subtree of a node, computing the digests
+        missing (or dropped) in a post-order traversal of the subtree, the
+        unchanged subtrees being skipped."""
+        digests = self._digests
+        digest = digests.get(node.id)
+        if digest is not None:
+            return digest
+        if node.type != "folder":
+            digest = digests[node.id] = _own_digest(node)
+            return digest
+        parents = self._parents
+        # the folders being traversed, their children and their digests.
+        stack = [(node, iter(node.children), [])]
+        while stack:
+            folder, children, children_digests = stack[-1]
+            for child in children:
+                parents[child.id] = folder.id
+                digest = digests.get(child.id)
+                if digest is None:
+                    if child.type == "folder":
+                        stack.append((child, iter(child.children), []))
+                        break
+                    digest = digests[child.id] = _own_digest(child)
+                children_digests.append(digest)
+            else:
+                stack.pop()
+                digest = digests[folder.id] = _own_digest(folder, children_digests)
+                if stack:
+                    stack[-1][2].append(digest)
+        return digest
+
+    def changed(self, node):
+        """Drop the digests of a changed node and of its ancestors. A node
+        added, removed or moved changes the folders it was in and was added
+        to, the ones that must be passed."""
+        id_ = node.id
+        while id_ is not None:
+            self._digests.pop(id_, None)
+            id_ = self._parents.get(id_)
+
+    def hexdigest(self, node=None):
+        """Return the digest of the subtree of a node (of the whole tree by
+        default) as a hex string."""
+        return self.digest(self.root if node is None else node).hex()
+
+
+class HTMLFragments:
+    """HTML output of the folders of the trees converted, by digest.
+
+    The fragment of a folder is a list of str chunks (its own folder/url
+    lines) and of the digests of its subfolders, whose fragments are
+    inserted in their place. Only the fragments of the last tree converted
+    are kept."""
+
+    def __init__(self):
+        self._fragments = {}
+
+    def render(self, merkle):
+        """Return the HTML output of the tree of a MerkleIndex, the same as
+        `BookmarksConverter._convert_to_html`."""
+        fragments = self._fragments
+        root = merkle.root
+        stack = [root]
+        while stack:
+            folder = stack.pop()
+            digest = merkle.digest(folder)
+            if digest in fragments:
+                continue
+            items = []
+            text = []
+            if folder is not root:
+                text.append(folder._convert_folder_to_html() + "<DL><p>\n")
+            for child in folder.children:
+                if child.type == "folder":
+                    items.append("".join(text))
+                    items.append(merkle.digest(child))
+                    text = []
+                    stack.append(child)
+                else:
+                    text.append(child._convert_url_to_html())
+            if folder is not root:
+                text.append("</DL><p>\n")
+            items.append("".join(text))
+            fragments[digest] = items
+
+        chunks = [HTMLEventWriter.header]
+        digest = merkle.digest(root)
+        used = {digest: fragments[digest]}
+        stack = [iter(used[digest])]
+        while stack:
+            for item in stack[-1]:
+                if isinstance(item, bytes):
+                    used[item] = fragments[item]
+                    stack.append(iter(used[item]))
+                    break
+                chunks.append(item)
+            else:
+                stack.pop()
+        chunks.append(HTMLEventWriter.footer)
+        self._fragments = used
+        return "".join(chunks)
+
+
+class JSONFragments:
+    """JSON dicts of the folders of the trees converted, by digest.
+
+    The dict of an unchanged folder is reused as is, so the outputs of two
+    conversions share the dicts of the folders that didn't change (they
+    must not be modified). Only the dicts of the last tree converted are
+    kept."""
+
+    def __init__(self):
+        # (dict, digests of the subfolders) of each folder.
+        self._fragments = {}
+
+    def render(self, merkle):
+        """Return the JSON dict of the tree of a MerkleIndex, the same as
+        `BookmarksConverter._convert_to_json`."""
+        fragments = self._fragments
+        root = merkle.root
+        digest = merkle.digest(root)
+        if digest not in fragments:
+            item = root._convert_folder_to_json()
+            stack = [(root, iter(root.children), item, [])]
+            while stack:
+                folder, children, item, subfolders = stack[-1]
+                append = item["children"].append
+                for child in children:
+                    if child.type != "folder":
+                        append(child._convert_url_to_json())
+                        continue
+                    digest = merkle.digest(child)
+                    subfolders.append(digest)
+                    fragment = fragments.get(digest)
+                    if fragment is None:
+                        child_item = child._convert_folder_to_json()
+                        append(child_item)
+                        stack.append((child, iter(child.children), child_item, []))
+                        break
+                    append(fragment[0])
+                else:
+                    stack.pop()
+                    fragments[merkle.digest(folder)] = (item, subfolders)
+
+        digest = merkle.digest(root)
+        used = {}
+        stack = [digest]
+        while stack:
+            digest = stack.pop()
+            used[digest] = fragments[digest]
+            stack.extend(used[digest][1])
+        self._fragments = used
+        return used[merkle.digest(root)][0]
@@ -1,24 +1,43 @@
-import itertools
-import time
+"""The folders/urls of the bookmarks trees: the NodeMixin shared by all of
+them and the JSONBookmark nodes of the JSON files.
 
-from bs4 import Tag
-from sqlalchemy import Column, ForeignKey, Integer, String, create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import backref, relationship, sessionmaker
+The nodes of the other formats are defined along with their backend, so a
+JSON file is converted without importing SQLAlchemy or BeautifulSoup:
+- `db_models.py`, the Bookmark/Folder/Url SQLAlchemy models of the DB files,
+- `html_models.py`, the HTMLBookmark (BeautifulSoup Tag) nodes of the HTML
+  files.
 
-engine = create_engine("sqlite:///:memory:")
-Session = sessionmaker(bind=engine)
-session = Session()
-Base = declarative_base()
+Their names are still importable from this module, they are imported on
+first access."""
+
+import hashlib
+import sys
 
 
 class NodeMixin:
     """Mixin class containing the methods used to create folders/urls in
     different formats HTML/JSON/DB, used in the creation of new bookmark tree
-    in a different format."""
+    in a different format.
+
+    Equality is based on a tuple of the node's own fields, so nodes of
+    different formats (Bookmark, JSONBookmark, HTMLBookmark) holding the same
+    data compare equal. The children of a node are not part of the comparison.
+
+    The content fields (`_folder_fields` or `_url_fields`) are compared along
+    with the position fields (`_position_fields`). The hash and `content_hash`
+    only use the content fields, since the position fields are changed by the
+    converter (`_add_index`, `_convert_to_db`), a node keeps its hash (and its
+    place in a set or dict) while being converted. Changing the content
+    fields of a node stored in a set or dict is still unsafe."""
+
+    _folder_fields = ("type", "id", "title", "date_added")
+    _url_fields = _folder_fields + ("url", "icon", "icon_uri", "tags")
+    _position_fields = ("index", "parent_id")
 
     def _convert_folder_to_db(self):
         """Convert a (html or json) folder object to a database folder object."""
+        from .db_models import Folder
+
         self._check_instance_type("folder")
         folder = Folder(
             _id=self.id,
@@ -31,6 +50,8 @@ class NodeMixin:
 
     def _convert_url_to_db(self):
         """Convert a url (html or json) object to a database url object."""
+        from .db_models import Url
+
         self._check_instance_type("url")
         url = Url(
             _id=self.id,
@@ -90,170 +111,40 @@ class NodeMixin:
         return url
 
     def _check_instance_type(self, type_):
-        """"Check that the type of the instance matches the type of executed method"""
+        """Check that the type of the instance matches the type of executed method"""
         if self.type != type_:
             raise TypeError(f"The item you are converting is not a {type_}")
 
-    def __iter__(self):
-        """Iterating over an Object iterates over its contents."""
-        return iter(self.children)
-
-    def __repr__(self):
-        """Bookmark object representation"""
-        return f"{self.title} - {self.type} - id: {self.id}"
-
-
-class Bookmark(Base, NodeMixin):
-    """Base model for the Url and Folder model.
-    (used for Single Table Inheritance)
-    ...
-    Attributes
-    ----------
-    id : int
-        id of the bookmark (url/folder)
-    title : str
-        title of bookmark (url/folder)
-    date_added : datetime
-        date bookmark (url/folder) was added on
-    index : int
-        current index to remember order of bookmark (url/folder) in folder
-    parent_id : int
-        id of the folder the bookmark (url/folder) is contained in
-    parent : relation
-        Many to One relation for the Folder, containing the
-        bookmarks (url/folder)
-    """
-
-    __tablename__ = "bookmark"
-
-    id = Column(Integer, primary_key=True)
-    title = Column(String)
-    index = Column(Integer)
-    parent_id = Column(Integer, ForeignKey("bookmark.id"), nullable=True)
-    date_added = Column(Integer, nullable=False, default=round(time.time() * 1000))
-    type = Column(String)
-    parent = relationship(
-        "Bookmark",
-        cascade="save-update, merge",
-        backref=backref("children", cascade="all", order_by="Bookmark.index"),
-        lazy=False,
-        remote_side="Bookmark.id",
-    )
-
-    __mapper_args__ = {"polymorphic_on": type, "polymorphic_identity": "bookmark"}
-
-    def insert(self):
-        """Insert a Bookmark object into the database."""
-        session.add(self)
-        session.commit()
+    def _key(self):
+        """Return a tuple of the content fields of the node."""
+        fields = self._url_fields if self.type == "url" else self._folder_fields
+        return tuple(getattr(self, field, None) for field in fields)
 
-    def update(self):
-        """Update a Bookmark object in the database"""
-        session.commit()
+    def _position(self):
+        """Return a tuple of the position fields of the node."""
+        return tuple(getattr(self, field, None) for field in self._position_fields)
 
-    def delete(self):
-        """Delete a Bookmark object from the database"""
-        session.delete(self)
-        session.commit()
+    @property
+    def content_hash(self):
+        """Hex digest of the node's content fields, stable across processes
+        and python versions (unlike the builtin `hash`)."""
+        return hashlib.sha1(repr(self._key()).encode("utf-8")).hexdigest()
 
     def __eq__(self, other):
-        if not isinstance(other, type(self)):
+        if not isinstance(other, NodeMixin):
             return NotImplemented
-        # skip if the attribute is '_sa_instance_state' which is in
-        # .__dict__ and vars(), since the object is a sqlalchemy object.
-        remove = "_sa_instance_state"
-        vars_self = vars(self).copy()
-        vars_other = vars(other).copy()
-        del vars_self[remove]
-        del vars_other[remove]
-        return vars_self == vars_other
-
-
-class Folder(Bookmark):
-    """Model representing bookmark folders
-    ...
-    Attributes
-    ----------
-    id : int
-        id of the folder
-    title : str
-        name of the folder
-    date_added : datetime
-        date folder was added on
-    parent_id : int
-        id of parent folder
-    index : int
-        current index in parent folder
-    children : db relationship
-        urls contained in the folder"""
-
-    __mapper_args__ = {"polymorphic_identity": "folder"}
+        return self._key() == other._key() and self._position() == other._position()
 
-    def __init__(self, title, index, parent_id, _id=None, date_added=None):
-        if _id:
-            self.id = _id
-        self.title = title
-        self.index = index
-        self.parent_id = parent_id
-        self.date_added = date_added
+    def __hash__(self):
+        return hash(self._key())
 
+    def __iter__(self):
+        """Iterating over an Object iterates over its contents."""
+        return iter(self.children)
 
-class Url(Bookmark):
-    """Model representing the URLs
-    ...
-    Attributes
-    ----------
-    id : int
-        id of the url
-    title : str
-        title of url
-    url : str
-        url address
-    date_added : datetime
-        date url was added on
-    icon : str
-        html icon data
-    icon_uri : str
-        html icon_uri found in firefox bookmarks
-    tags : str
-        tags describing url
-    index : int
-        current index to remember order of urls in folder
-    parent_id : int
-        id of the folder the url is contained in"""
-
-    url = Column(String)
-    icon = Column(String)
-    icon_uri = Column(String)
-    tags = Column(String)
-
-    __mapper_args__ = {"polymorphic_identity": "url"}
-
-    def __init__(
-        self,
-        title,
-        index,
-        parent_id,
-        url,
-        _id=None,
-        date_added=None,
-        icon=None,
-        icon_uri=None,
-        tags=None,
-    ):
-        if _id:
-            self.id = _id
-        if title == None:
-            self.title = url
-        else:
-            self.title = title
-        self.index = index
-        self.parent_id = parent_id
-        self.date_added = date_added
-        self.url = url
-        self.icon = icon
-        self.icon_uri = icon_uri
-        self.tags = tags
+    def __repr__(self):
+        """Bookmark object representation"""
+        return f"{self.title} - {self.type} - id: {self.id}"
 
 
 class JSONBookmark(NodeMixin):
@@ -324,92 +215,45 @@ class JSONBookmark(NodeMixin):
             self.date_added = self.date_added - 11644473600000000
 
 
-class HTMLBookmark(Tag, NodeMixin):
-    """TreeBuilder class, used to add additional functionality to the
-    BeautifulSoup Tag class. The following functionality is added:
-
-    - add id to each folder("h3")/url("a") being imported
-    - add property access to the Tag class' attributes
-      (date_added, icon, icon_uri, id, index, title, type and url)
-      which are usually found at the 'self.attrs' dictionary.
-    - add a setter for (id, index and title)
-    - redirect the self.children from an iterator `iter(self.contents)`
-    to a list `self.contents` directly"""
-
-    id_counter = itertools.count(start=2)
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        if self.name in ("a", "h3"):
-            if not self.attrs.get("id"):
-                self.attrs["id"] = next(__class__.id_counter)
-
-    @property
-    def date_added(self):
-        """Redirect the `add_date` lookup to a `date_added` attribute.
-        add a `date_added` with current datetime if it doesn't exist"""
-        date_added = self.attrs.get("add_date")
-        if not date_added:
-            date_added = round(time.time() * 1000)
-        return int(date_added)
-
-    @property
-    def icon(self):
-        """Redirect the `icon` lookup to a `icon` attribute."""
-        return self.attrs.get("icon")
-
-    @property
-    def icon_uri(self):
-        """Redirect the `iconuri` lookup to a `icon_uri` attribute."""
-        return self.attrs.get("iconuri")
-
-    @property
-    def id(self):
-        """Redirect the `id` lookup to a `id` attribute."""
-        return self.attrs.get("id")
-
-    @id.setter
-    def id(self, new_id):
-        self.attrs["id"] = new_id
-
-    @property
-    def index(self):
-        """Redirect the `index` lookup to a `index` attribute."""
-        return self.attrs.get("index")
-
-    @index.setter
-    def index(self, new_index):
-        self.attrs["index"] = new_index
-
-    @property
-    def title(self):
-        """Redirect the `title` lookup to a `title` attribute."""
-        return self.attrs.get("title")
-
-    @title.setter
-    def title(self, new_title):
-        self.attrs["title"] = new_title
-
-    @property
-    def type(self):
-        """Add a type attribute defining the type of object the instance is."""
-        if self.name == "h3":
-            return "folder"
-        elif self.name == "a":
-            return "url"
-
-    @property
-    def url(self):
-        """Redirect the `href` lookup to a `url` attribute."""
-        return self.attrs.get("href")
-
-    @property
-    def children(self):
-        """To standardize the access of children amongst the different
-        Bookmark classes."""
-        return self.contents
-
-    @classmethod
-    def reset_id_counter(cls):
-        """Reset the id_counter."""
-        cls.id_counter = itertools.count(start=2)
+# names of the DB/HTML models, imported from their module on first access.
+_lazy_attributes = {
+    "Base": ".db_models",
+    "Bookmark": ".db_models",
+    "Folder": ".db_models",
+    "Session": ".db_models",
+    "Url": ".db_models",
+    "create_engine": ".db_models",
+    "engine": ".db_models",
+    "session": ".db_models",
+    "sessionmaker": ".db_models",
+    "HTMLBookmark": ".html_models",
+}
+
+if sys.version_info >= (3, 7):
+
+    def __getattr__(name):
+        module = _lazy_attributes.get(name)
+        if module is None:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+        from importlib import import_module
+
+        value = getattr(import_module(module, __package__), name)
+        globals()[name] = value
+        return value
+
+    def __dir__():
+        return sorted(list(globals()) + list(_lazy_attributes))
+
+else:
+    from .db_models import (
+        Base,
+        Bookmark,
+        Folder,
+        Session,
+        Url,
+        create_engine,
+        engine,
+        session,
+        sessionmaker,
+    )
+    from .html_models import HTMLBookmark
@@ -0,0 +1,143 @@
+"""Pipelined streaming conversions.
+
+A streaming conversion (see `streaming.py`) reads the source file, formats
+the nodes and writes the output one after the other, in a single thread.
+In pipelined mode the three stages overlap:
+- a reader thread parses the source file into events (`prefetch`),
+- the calling thread formats them with the writer of the target format,
+  which uses the `NodeMixin._convert_*` methods,
+- a writer thread writes the output to the file (`write_behind`).
+
+The stages are connected by bounded queues, of batches of events and of
+buffers of output, so the memory used stays capped whatever the size of the
+file. With the GIL the reading and formatting don't run in parallel, what is
+hidden is the time the threads spend waiting for the disk (reading a file
+that isn't in the page cache, writing to a slow disk)."""
+
+import queue
+import threading
+
+# end of the stream, put in the queues after the last batch/buffer.
+_DONE = object()
+
+
+class _Failure:
+    """Exception raised by the thread of a stage, re-raised by the caller."""
+
+    __slots__ = ("error",)
+
+    def __init__(self, error):
+        self.error = error
+
+
+def prefetch(iterable, batch_size=1024, queue_size=16):
+    """Iterate over an iterable in a reader thread, yielding its items in the
+    calling thread.
+
+    The items are handed over in batches of `batch_size` through a queue of
+    at most `queue_size` batches, the reader waits when the queue is full.
+    An exception raised by the iterable is re-raised in the calling thread,
+    and the reader stops when the returned generator is closed.
+
+    Parameters:
+    -----------
+    iterable : iterable
+        iterable read in the reader thread (the events of a source file)
+    batch_size : int
+        number of items per batch
+    queue_size : int
+        maximum number of batches waiting in the queue"""
+    batches = queue.Queue(queue_size)
+    stop = threading.Event()
+
+    def read():
+        try:
+            batch = []
+            for item in iterable:
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    batches.put(batch)
+                    if stop.is_set():
+                        return
+                    batch = []
+            batches.put(batch)
+            batches.put(_DONE)
+        except BaseException as error:
+            batches.put(_Failure(error))
+
+    reader = threading.Thread(target=read, name="bookmarks-reader", daemon=True)
+    reader.start()
+    try:
+        while True:
+            batch = batches.get()
+            if batch is _DONE:
+                break
+            if isinstance(batch, _Failure):
+                raise batch.error
+            yield from batch
+    finally:
+        stop.set()
+        # empty the queue until the reader returns, it may be waiting on it.
+        while reader.is_alive():
+            try:
+                batches.get(timeout=0.01)
+            except queue.Empty:
+                pass
+        reader.join()
+
+
+def write_behind(file_, chunks, buffer_size=2**16, queue_size=16):
+    """Write str chunks to a file from a writer thread.
+
+    The chunks are consumed in the calling thread and joined into buffers of
+    about `buffer_size` characters, handed over to the writer thread through
+    a queue of at most `queue_size` buffers. An exception raised while
+    writing is re-raised in the calling thread.
+
+    Parameters:
+    -----------
+    file_ : file object
+        file opened for writing in text mode
+    chunks : iterable of str
+        the output, consumed in the calling thread
+    buffer_size : int
+        number of characters per buffer
+    queue_size : int
+        maximum number of buffers waiting in the queue"""
+    buffers = queue.Queue(queue_size)
+    failures = []
+
+    def write():
+        try:
+            while True:
+                buffer = buffers.get()
+                if buffer is _DONE:
+                    return
+                file_.write(buffer)
+        except BaseException as error:
+            failures.append(error)
+            # keep emptying the queue, the calling thread may be waiting on it.
+            while buffers.get() is not _DONE:
+                pass
+
+    writer = threading.Thread(target=write, name="bookmarks-writer", daemon=True)
+    writer.start()
+    try:
+        pending = []
+        size = 0
+        for chunk in chunks:
+            pending.append(chunk)
+            size += len(chunk)
+            if size >= buffer_size:
+                if failures:
+                    break
+                buffers.put("".join(pending))
+                pending = []
+                size = 0
+        else:
+            buffers.put("".join(pending))
+    finally:
+        buffers.put(_DONE)
+        writer.join()
+    if failures:
+        raise failures[0]
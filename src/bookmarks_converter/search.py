@@ -0,0 +1,318 @@
+"""In-memory search over a bookmarks tree.
+
+`SearchIndex` is an inverted index of the words of the title, of the host and
+path of the url, and of the tags of each folder/url of a tree: each word maps
+to the (sorted) list of the documents holding it, a document being the
+position of a node in the index. The words of the titles are also indexed on
+their own, to rank the results.
+
+A query is a list of words, all of which must match (AND). A word ending
+with "*" matches the words starting with it (prefix query). The postings of
+the word with the fewest documents are the candidates, and each candidate is
+checked against the other words by a binary search in their postings, so a
+selective query costs about the size of its rarest word whatever the size of
+the tree. The results are ranked without reading the nodes again: a word
+found in the title weighs twice a word found in the url or the tags, and a
+whole word twice a prefix, the results of equal relevance being in the order
+of the tree.
+
+The index follows the changes of the tree through `add`, `remove` and
+`update`: a removed (or updated) node leaves its postings behind, skipped by
+the queries, and the index is rebuilt once half of its documents are stale.
+The nodes are indexed by identity (by row for a NodeView), so the nodes
+sharing an id (urls merged from several files for example) are kept apart."""
+
+import re
+from bisect import bisect_left
+
+from .columnar import NodeView
+from .streaming import END, iter_tree_events
+
+_WORD = re.compile(r"\w+")
+_URL = re.compile(r"[A-Za-z][A-Za-z0-9+.-]*://([^/?#]*)([^?#]*)")
+# number of postings above which the documents of a word are gathered in a
+# set, instead of being searched in each postings list.
+_MAX_LISTS = 8
+ORDERS = ("relevance", "date_added")
+
+
+def _words(node):
+    """Return the words of the title of a node, and the words of its url
+    (host and path) and tags."""
+    title = node.title
+    title_words = _WORD.findall(title.lower()) if title else []
+    if node.type != "url":
+        return title_words, []
+    url = node.url or ""
+    match = _URL.match(url)
+    if match is None:
+        words = _WORD.findall(url.lower())
+    else:
+        words = _WORD.findall("/".join(match.groups()).lower())
+    tags = node.tags
+    if tags:
+        words.extend(_WORD.findall(tags.lower()))
+    return title_words, words
+
+
+def _node_key(node):
+    """Key of a node in the index: the row of a NodeView (the views of a
+    folder being created again once its children change), the identity of
+    the other nodes."""
+    return node.row if isinstance(node, NodeView) else id(node)
+
+
+def _contains(postings, doc):
+    position = bisect_left(postings, doc)
+    return position < len(postings) and postings[position] == doc
+
+
+def _membership(postings):
+    """Return a function telling whether a document is in one of the
+    postings lists."""
+    if not postings:
+        return lambda doc: False
+    if len(postings) == 1:
+        documents = postings[0]
+        return lambda doc: _contains(documents, doc)
+    if len(postings) <= _MAX_LISTS:
+        return lambda doc: any(_contains(documents, doc) for documents in postings)
+    return set().union(*postings).__contains__
+
+
+class _Term:
+    """A word of a query and the postings of the words it matches."""
+
+    __slots__ = ("word", "prefix", "words", "size")
+
+    def __init__(self, word, prefix, words, postings):
+        self.word = word
+        self.prefix = prefix
+        self.words = words
+        self.size = sum(len(postings[word]) for word in words)
+
+
+class SearchIndex:
+    """Inverted index of the folders/urls of a bookmarks tree (see the module
+    docstring). The root of the tree isn't indexed.
+
+    Usage:
+        index = SearchIndex(bookmarks_tree)
+        index.search("python doc*")  # the nodes matching, most relevant first
+        index.search("python", order="date_added", limit=10)
+
+    Parameters:
+    -----------
+    root : NodeMixin
+        root of the tree (Bookmark, HTMLBookmark, JSONBookmark or NodeView)
+
+    Attributes:
+    -----------
+    root : NodeMixin
+        root of the indexed tree"""
+
+    def __init__(self, root):
+        self.root = root
+        # the folder of each node and the children of each folder, by key,
+        # to find the children added to or removed from an updated folder.
+        self._parents = {}
+        self._children = {}
+        self._build(())
+        self._index_subtree(root, None)
+
+    def _build(self, nodes):
+        # the indexed nodes by document, None for a removed node.
+        self._nodes = []
+        # the document of each indexed node, by node key.
+        self._docs = {}
+        self._postings = {}
+        self._title_postings = {}
+        self._sorted_words = None
+        self._stale = 0
+        for node in nodes:
+            if node is not self.root:
+                self._add_node(node)
+
+    def _index_subtree(self, node, parent):
+        """Index a node and its descendants in the order of the tree, parent
+        being the folder of the node."""
+        stack = [(node, parent)]
+        while stack:
+            node, parent = stack.pop()
+            key = _node_key(node)
+            self._parents[key] = None if parent is None else _node_key(parent)
+            if node is not self.root:
+                self._add_node(node)
+            if node.type == "folder":
+                children = list(node.children)
+                self._children[key] = children
+                stack.extend((child, node) for child in reversed(children))
+
+    def _add_node(self, node):
+        doc = len(self._nodes)
+        key = _node_key(node)
+        previous = self._docs.get(key)
+        if previous is not None:
+            self._nodes[previous] = None
+            self._stale += 1
+        self._nodes.append(node)
+        self._docs[key] = doc
+        title_words, words = _words(node)
+        title_words = set(title_words)
+        for word in title_words:
+            self._title_postings.setdefault(word, []).append(doc)
+        postings = self._postings
+        for word in title_words.union(words):
+            documents = postings.get(word)
+            if documents is None:
+                postings[word] = [doc]
+                self._sorted_words = None
+            else:
+                documents.append(doc)
+
+    def add(self, node, parent=None):
+        """Index a node added to the tree, along with its descendants.
+
+        node : NodeMixin
+            the folder/url added
+        parent : NodeMixin
+            the folder it was added to (default None)"""
+        self._index_subtree(node, parent)
+
+    def remove(self, node):
+        """Remove a node removed from the tree from the index, along with its
+        descendants."""
+        nodes = [node]
+        if node.type == "folder":
+            nodes = [child for event, child in iter_tree_events(node) if event != END]
+        for child in nodes:
+            key = _node_key(child)
+            self._parents.pop(key, None)
+            self._children.pop(key, None)
+            doc = self._docs.pop(key, None)
+            if doc is not None:
+                self._nodes[doc] = None
+                self._stale += 1
+        self._compact()
+
+    def update(self, node):
+        """Index again a node whose title, url or tags changed. The children
+        added to an updated folder are indexed along with their descendants,
+        and the ones removed from it are dropped, unless they were moved to a
+        folder updated before it."""
+        key = _node_key(node)
+        if node is not self.root:
+            self._add_node(node)
+        if node.type == "folder":
+            children = list(node.children)
+            keys = set(map(_node_key, children))
+            parents = self._parents
+            for child in self._children.get(key, ()):
+                child_key = _node_key(child)
+                if child_key not in keys and parents.get(child_key) == key:
+                    self.remove(child)
+            for child in children:
+                child_key = _node_key(child)
+                if child_key in parents:
+                    parents[child_key] = key
+                else:
+                    self._index_subtree(child, node)
+            self._children[key] = children
+        self._compact()
+
+    def _compact(self):
+        """Rebuild the index once half of its documents are stale."""
+        if self._stale * 2 > len(self._nodes):
+            self._build([node for node in self._nodes if node is not None])
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _term(self, word):
+        if not word.endswith("*"):
+            words = [word] if word in self._postings else []
+            return _Term(word, False, words, self._postings)
+        word = word.rstrip("*")
+        if self._sorted_words is None:
+            self._sorted_words = sorted(self._postings)
+        sorted_words = self._sorted_words
+        words = []
+        for position in range(bisect_left(sorted_words, word), len(sorted_words)):
+            if not sorted_words[position].startswith(word):
+                break
+            words.append(sorted_words[position])
+        return _Term(word, True, words, self._postings)
+
+    def _terms(self, query):
+        terms = []
+        for word in query.lower().split():
+            parts = _WORD.findall(word)
+            # a word with punctuation ("c++", "e-mail") is searched as its parts.
+            for i, part in enumerate(parts):
+                if i == len(parts) - 1 and word.endswith("*"):
+                    part += "*"
+                terms.append(self._term(part))
+        return terms
+
+    def search(self, query, order="relevance", limit=None):
+        """Return the nodes matching every word of the query.
+
+        query : str
+            words to search for, a word ending with "*" being a prefix
+        order : str
+            "relevance" to order the results by where the words were found
+            (see the module docstring), "date_added" to order them from the
+            newest to the oldest (default "relevance")
+        limit : int or None
+            maximum number of results (default None)"""
+        if order not in ORDERS:
+            raise ValueError(
+                f"Unknown order {order!r}, use one of {', '.join(ORDERS)}."
+            )
+        terms = self._terms(query)
+        if not terms:
+            return []
+        terms.sort(key=lambda term: term.size)
+        postings = self._postings
+        first = [postings[word] for word in terms[0].words]
+        if len(first) == 1:
+            candidates = first[0]
+        else:
+            candidates = sorted(set().union(*first))
+        nodes = self._nodes
+        candidates = [doc for doc in candidates if nodes[doc] is not None]
+        for term in terms[1:]:
+            if not candidates:
+                break
+            contains = _membership([postings[word] for word in term.words])
+            candidates = [doc for doc in candidates if contains(doc)]
+
+        if order == "date_added":
+            candidates.sort(key=lambda doc: -(nodes[doc].date_added or 0))
+        else:
+            scores = self._scores(candidates, terms)
+            candidates.sort(key=lambda doc: -scores[doc])
+        if limit is not None:
+            candidates = candidates[:limit]
+        return [nodes[doc] for doc in candidates]
+
+    def _scores(self, docs, terms):
+        """Relevance of the documents matching the terms (see the module
+        docstring), as {doc: score}."""
+        scores = dict.fromkeys(docs, 0)
+        title_postings = self._title_postings
+        for term in terms:
+            in_title = _membership(
+                [title_postings[word] for word in term.words if word in title_postings]
+            )
+            whole = _membership(
+                [self._postings[term.word]]
+                if term.prefix and term.word in self._postings
+                else []
+            )
+            for doc in docs:
+                score = 2 if in_title(doc) else 1
+                if not term.prefix or whole(doc):
+                    score *= 2
+                scores[doc] += score
+        return scores
@@ -0,0 +1,219 @@
+"""Sharded rendering of the html/json output of a bookmarks tree, in worker
+processes.
+
+The tree is split at the folders of a given depth (the top level folders by
+default): the output of each of these folders and of their contents, a
+shard, is rendered by a worker process, while the output of the folders/urls
+above them (a handful of lines) is rendered by the calling process around
+the place of each shard. The shards are then joined in order into the text
+of the output file of a serial conversion (`_convert_to_html`, or
+`_convert_to_json` saved by `_save_to_json`), byte for byte.
+
+On Linux, when no other thread is running, the workers are forked and
+inherit the tree, only the output of the shards being sent back. Elsewhere
+(macOS, Windows, a threaded process such as the executor of `aio.py`) the
+workers are started with the default start method of the platform, spawn
+replacing fork in a threaded process, and each shard is sent to the
+workers as a ColumnarTree.
+
+A shard can also be saved as a bookmarks file of its own
+(`shard_document`), holding the folder of the shard."""
+
+import json
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from .columnar import ColumnarTree
+from .streaming import (
+    END,
+    FOLDER,
+    URL,
+    HTMLEventWriter,
+    JSONEventWriter,
+    JSONTreeWriter,
+    iter_tree_events,
+    write_events,
+)
+
+SHARD = "shard"
+SHARDED_FORMATS = ("html", "json")
+
+# format and nodes of the shards, set in the forked workers.
+_shards = None
+
+
+def iter_shard_events(root, depth=1):
+    """Yield the events of a bookmarks tree down to the folders at `depth`
+    (the children of the root being at depth 1), a `(SHARD, folder)` event
+    standing for each of these folders and their contents."""
+    yield FOLDER, root
+    stack = [(root, iter(root.children))]
+    while stack:
+        folder, children = stack[-1]
+        for child in children:
+            if child.type == "folder":
+                if len(stack) == depth:
+                    yield SHARD, child
+                    continue
+                yield FOLDER, child
+                stack.append((child, iter(child.children)))
+                break
+            yield URL, child
+        else:
+            stack.pop()
+            yield END, folder
+
+
+def split_tree(root, format_, depth=1):
+    """Split a bookmarks tree at the folders at `depth`, returning the parts
+    of its output, the str chunks of the folders/urls above the shards and
+    the position of each shard in their place, and the folder of each
+    shard.
+
+    Parameters:
+    -----------
+    root : NodeMixin
+        root of the tree
+    format_ : str
+        "html" or "json"
+    depth : int
+        depth of the folders of the shards (default 1)"""
+    if format_ not in SHARDED_FORMATS:
+        raise TypeError("Only the 'html' and 'json' outputs can be sharded.")
+    if depth < 1:
+        raise ValueError("The depth of the shards has to be 1 or more.")
+    writer = HTMLEventWriter() if format_ == "html" else JSONEventWriter()
+    parts = []
+    folders = []
+    # the consecutive json urls, serialized together by the C encoder.
+    urls = []
+    chunk = writer.start()
+    if chunk is not None:
+        parts.append(chunk)
+    for event, node in iter_shard_events(root, depth):
+        if format_ == "json":
+            if event == URL:
+                urls.append(node._convert_url_to_json())
+                continue
+            if urls:
+                items = json.dumps(urls, ensure_ascii=False)[1:-1]
+                parts.append(writer.separator() + items)
+                urls = []
+        if event == SHARD:
+            if format_ == "json":
+                parts.append(writer.separator())
+            parts.append(len(folders))
+            folders.append(node)
+            continue
+        chunk = writer.write(event, node)
+        if chunk is not None:
+            parts.append(chunk)
+    chunk = writer.close()
+    if chunk is not None:
+        parts.append(chunk)
+    return parts, folders
+
+
+def render_shard(format_, folder):
+    """Return the html/json output of a folder and its contents, as found in
+    the output of the whole tree."""
+    events = iter_tree_events(folder)
+    if format_ == "html":
+        write = HTMLEventWriter(depth=1).write
+        return "".join(filter(None, (write(event, node) for event, node in events)))
+    item = write_events(events, [JSONTreeWriter()])[0]
+    return json.dumps(item, ensure_ascii=False)
+
+
+def _set_shards(format_, folders):
+    global _shards
+    _shards = (format_, folders)
+
+
+def _render_inherited(position):
+    format_, folders = _shards
+    return render_shard(format_, folders[position])
+
+
+def _render_columnar(format_, tree):
+    return render_shard(format_, tree.root)
+
+
+def _start_method():
+    """Return the start method of the workers: "fork" on Linux when the
+    calling process runs no other thread (forking a threaded process can
+    deadlock the workers, and isn't safe on macOS), the default of the
+    platform otherwise, "spawn" replacing "fork". None before python 3.7,
+    the executor not accepting a start method."""
+    if sys.version_info < (3, 7):
+        return None
+    if sys.platform.startswith("linux") and threading.active_count() == 1:
+        return "fork"
+    method = multiprocessing.get_start_method(allow_none=True)
+    if method is None:
+        # the first start method is the default of the platform.
+        method = multiprocessing.get_all_start_methods()[0]
+    return "spawn" if method == "fork" else method
+
+
+def render_shards(format_, folders, workers=None):
+    """Return the output of each shard, rendered by worker processes.
+
+    Parameters:
+    -----------
+    format_ : str
+        "html" or "json"
+    folders : list of NodeMixin
+        the folder of each shard
+    workers : int or None
+        number of processes, None for the number of CPUs. With 1 worker the
+        shards are rendered in the current process (default None)"""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 1 or len(folders) < 2:
+        return [render_shard(format_, folder) for folder in folders]
+    workers = min(workers, len(folders))
+    # a few chunks per worker, to balance shards of different sizes.
+    chunksize = max(1, len(folders) // (workers * 4))
+    method = _start_method()
+    if method == "fork":
+        # the workers inherit the shards of the calling process, without
+        # pickling.
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_set_shards,
+            initargs=(format_, folders),
+        ) as executor:
+            positions = range(len(folders))
+            return list(executor.map(_render_inherited, positions, chunksize=chunksize))
+    options = {}
+    if method is not None:
+        options["mp_context"] = multiprocessing.get_context(method)
+    trees = [ColumnarTree.from_tree(folder) for folder in folders]
+    with ProcessPoolExecutor(max_workers=workers, **options) as executor:
+        return list(
+            executor.map(
+                _render_columnar,
+                [format_] * len(trees),
+                trees,
+                chunksize=chunksize,
+            )
+        )
+
+
+def join_shards(parts, outputs):
+    """Return the output of the tree out of its parts and the output of its
+    shards (see `split_tree`)."""
+    return "".join(part if isinstance(part, str) else outputs[part] for part in parts)
+
+
+def shard_document(format_, output):
+    """Return the bookmarks file of a shard: an html file holding its
+    folder, or the json of its folder as the root folder."""
+    if format_ == "html":
+        return HTMLEventWriter.header + output + HTMLEventWriter.footer
+    return output
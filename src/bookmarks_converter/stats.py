@@ -0,0 +1,419 @@
+"""Instrumentation of the conversions: wall/CPU time and bytes read/written
+of each phase, and count of the folders/urls converted.
+
+The phases are recorded by `ConversionStats.phase`, used as a context
+manager around each step of BookmarksConverter. When the instrumentation is
+turned off, the converter uses `NO_STATS` whose `phase` returns a shared
+no-op context manager, so the cost is a method call per phase.
+
+In memory profiling mode, the allocations are traced with `tracemalloc`
+during the (top level) phases, recording the peak and retained memory of
+each phase and the top allocation sites, and the memory of the bookmarks is
+attributed to the type of their nodes."""
+
+import os
+import sys
+import time
+import tracemalloc
+
+
+def _file_size(filepath):
+    try:
+        return os.path.getsize(filepath)
+    except (OSError, TypeError):
+        return 0
+
+
+class PhaseStats:
+    """Measures of a phase of the conversion.
+
+    Attributes:
+    -----------
+    name : str
+        name of the phase, the names of the enclosing phases are prepended
+        and separated with dots ("parse.scan_html")
+    wall : float
+        elapsed (wall clock) time in seconds
+    cpu : float
+        CPU time of the process in seconds
+    bytes_read : int
+        size of the file(s) read during the phase
+    bytes_written : int
+        size of the file(s) written during the phase
+    peak_memory : int or None
+        in memory profiling mode, the highest memory allocated during the
+        phase, above the memory allocated when it started, in bytes
+    retained_memory : int or None
+        in memory profiling mode, the memory allocated during the phase and
+        still allocated when it ended, in bytes (negative if the phase freed
+        more than it allocated)"""
+
+    __slots__ = (
+        "name",
+        "wall",
+        "cpu",
+        "bytes_read",
+        "bytes_written",
+        "peak_memory",
+        "retained_memory",
+    )
+
+    def __init__(
+        self,
+        name,
+        wall=0.0,
+        cpu=0.0,
+        bytes_read=0,
+        bytes_written=0,
+        peak_memory=None,
+        retained_memory=None,
+    ):
+        self.name = name
+        self.wall = wall
+        self.cpu = cpu
+        self.bytes_read = bytes_read
+        self.bytes_written = bytes_written
+        self.peak_memory = peak_memory
+        self.retained_memory = retained_memory
+
+    def to_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __repr__(self):
+        return (
+            f"<PhaseStats {self.name}: {self.wall:.6f}s wall, {self.cpu:.6f}s cpu, "
+            f"{self.bytes_read} bytes read, {self.bytes_written} bytes written>"
+        )
+
+
+class _Phase:
+    """Context manager measuring a phase, see `ConversionStats.phase`."""
+
+    __slots__ = ("stats", "name", "read", "written", "wall", "cpu", "memory")
+
+    def __init__(self, stats, name, read, written):
+        self.stats = stats
+        self.name = name
+        self.read = read
+        self.written = written
+
+    def __enter__(self):
+        self.stats._names.append(self.name)
+        if self.stats.memory is not None:
+            self.memory = self.stats.memory.enter()
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        stats = self.stats
+        phase = PhaseStats(
+            ".".join(stats._names),
+            wall,
+            cpu,
+            _file_size(self.read),
+            _file_size(self.written),
+        )
+        if stats.memory is not None:
+            phase.peak_memory, phase.retained_memory = stats.memory.exit(
+                self.memory, phase.name
+            )
+        stats._names.pop()
+        stats.phases.append(phase)
+        if stats.callback is not None:
+            stats.callback(phase)
+        return False
+
+
+class _NullPhase:
+    """No-op context manager used when the instrumentation is turned off."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+def _reset_peak():
+    # tracemalloc.reset_peak is new in python 3.9, before that the peaks are
+    # the highest memory traced since the start of the top level phase.
+    if hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+
+
+class MemoryProfiler:
+    """Traces the allocations with tracemalloc during the phases.
+
+    The tracing starts with the first (top level) phase and stops when it
+    ends, unless it was already started by someone else. The running peak
+    of the enclosing phases is kept when the peak is reset for a nested
+    phase.
+
+    Attributes:
+    -----------
+    sites : list
+        the `top` allocation sites ("file:line") of the memory still
+        allocated at the end of each top level phase, as
+        [(phase, [(site, size, count), ...]), ...]
+    by_type : dict
+        memory of the last parsed tree and converted bookmarks attributed to
+        the type of their nodes ("HTMLBookmark", "JSONBookmark", "Folder",
+        "Url", ...) and to the "output" (the converted str/dict), in bytes
+
+    Parameters:
+    -----------
+    top : int
+        number of allocation sites kept for each top level phase
+    frames : int
+        number of frames stored by tracemalloc for each allocation"""
+
+    def __init__(self, top=10, frames=1):
+        self.top = top
+        self.frames = frames
+        self.sites = []
+        self._tree_types = {}
+        self._output_types = {}
+        self._peaks = []
+        self._tracing = False
+
+    def enter(self):
+        """Start measuring a phase, returning the memory allocated at its start."""
+        if not self._peaks and not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._tracing = True
+        current, peak = tracemalloc.get_traced_memory()
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], peak)
+        _reset_peak()
+        self._peaks.append(current)
+        return current
+
+    def exit(self, start, name):
+        """Stop measuring a phase, returning its (peak, retained) memory."""
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(self._peaks.pop(), peak)
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], peak)
+        else:
+            self.sites.append((name, self._top_sites()))
+            if self._tracing:
+                tracemalloc.stop()
+                self._tracing = False
+        return peak - start, current - start
+
+    def _top_sites(self):
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<unknown>"),
+            )
+        )
+        return [
+            (str(statistic.traceback[0]), statistic.size, statistic.count)
+            for statistic in snapshot.statistics("lineno")[: self.top]
+        ]
+
+    @property
+    def by_type(self):
+        by_type = dict(self._tree_types)
+        for name, size in self._output_types.items():
+            by_type[name] = by_type.get(name, 0) + size
+        return by_type
+
+    def measure_tree(self, root):
+        """Attribute the memory of the nodes of a tree to their type."""
+        by_type = self._tree_types = {}
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            name = type(node).__name__
+            by_type[name] = by_type.get(name, 0) + _node_size(node)
+            if node.type == "folder":
+                stack.extend(node.children)
+
+    def measure_output(self, bookmarks):
+        """Attribute the memory of the converted bookmarks, the database
+        objects to their type and the str/dict to the "output"."""
+        by_type = self._output_types = {}
+        if isinstance(bookmarks, list):
+            for node in bookmarks:
+                name = type(node).__name__
+                by_type[name] = by_type.get(name, 0) + _node_size(node)
+        elif isinstance(bookmarks, (str, dict)):
+            by_type["output"] = _deep_size(bookmarks)
+
+
+def _node_size(node):
+    """Approximate memory of a node: the object, its attributes dict and the
+    values it references directly (with the dicts of HTML attributes), the
+    other nodes and the items of the children lists excluded."""
+    size = sys.getsizeof(node)
+    attributes = getattr(node, "__dict__", None)
+    if attributes is None:
+        return size
+    size += sys.getsizeof(attributes)
+    for key, value in attributes.items():
+        if isinstance(value, (str, int, float, list)) and not isinstance(value, bool):
+            size += sys.getsizeof(value)
+        elif isinstance(value, dict):
+            size += sys.getsizeof(value)
+            for item_key, item in value.items():
+                size += sys.getsizeof(item_key) + sys.getsizeof(item)
+        elif key == "_sa_instance_state":
+            size += sys.getsizeof(value) + sys.getsizeof(value.__dict__)
+    return size
+
+
+def _deep_size(value):
+    """Memory of a str, or of a dict/list and everything it contains."""
+    size = 0
+    seen = set()
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+        size += sys.getsizeof(value)
+        if isinstance(value, dict):
+            stack.extend(value.keys())
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return size
+
+
+class ConversionStats:
+    """Statistics of the conversions of a BookmarksConverter.
+
+    Attributes:
+    -----------
+    phases : list of PhaseStats
+        the phases in the order they ended (the nested phases end before
+        the phase enclosing them)
+    nodes : dict
+        number of folders and urls ({"folder": int, "url": int}) of the
+        last parsed/converted bookmarks
+    callback : callable or None
+        called with the PhaseStats of each phase as soon as it ends
+    memory : MemoryProfiler or None
+        the allocation sites and memory by node type in memory profiling mode
+
+    Parameters:
+    -----------
+    callback : callable or None
+        see the `callback` attribute
+    profile_memory : bool
+        trace the allocations during the phases (see `MemoryProfiler`), it
+        slows down the conversion
+    top : int
+        number of allocation sites kept for each top level phase"""
+
+    enabled = True
+
+    def __init__(self, callback=None, profile_memory=False, top=10):
+        self.callback = callback
+        self.memory = MemoryProfiler(top) if profile_memory else None
+        self.phases = []
+        self.nodes = {"folder": 0, "url": 0}
+        self._names = []
+
+    def phase(self, name, read=None, written=None):
+        """Context manager measuring a phase.
+
+        name: str
+            name of the phase
+        read: str or Path
+            file read during the phase, its size is counted as bytes read
+        written: str or Path
+            file written during the phase, its size (once the phase ends) is
+            counted as bytes written"""
+        return _Phase(self, name, read, written)
+
+    def count_nodes(self, root):
+        """Count the folders/urls of a tree (the root excluded)."""
+        nodes = {"folder": 0, "url": 0}
+        stack = [root]
+        while stack:
+            for child in stack.pop():
+                nodes[child.type] += 1
+                if child.type == "folder":
+                    stack.append(child)
+        self.nodes = nodes
+
+    def count_events(self, events, folder, url):
+        """Count the folders/urls of a stream of events while passing them
+        through, the first event being the root."""
+        nodes = self.nodes = {"folder": -1, "url": 0}
+        for event in events:
+            if event[0] == folder:
+                nodes["folder"] += 1
+            elif event[0] == url:
+                nodes["url"] += 1
+            yield event
+
+    def measure_tree(self, root):
+        """In memory profiling mode, attribute the memory of the parsed tree
+        to the type of its nodes."""
+        if self.memory is not None:
+            self.memory.measure_tree(root)
+
+    def measure_output(self, bookmarks):
+        """In memory profiling mode, attribute the memory of the converted
+        bookmarks to the type of their nodes or to the "output"."""
+        if self.memory is not None:
+            self.memory.measure_output(bookmarks)
+
+    def totals(self):
+        """Sum of the measures of the phases by name, as {name: PhaseStats}."""
+        totals = {}
+        for phase in self.phases:
+            total = totals.get(phase.name)
+            if total is None:
+                total = totals[phase.name] = PhaseStats(phase.name)
+            total.wall += phase.wall
+            total.cpu += phase.cpu
+            total.bytes_read += phase.bytes_read
+            total.bytes_written += phase.bytes_written
+        return totals
+
+    def to_dict(self):
+        result = {
+            "phases": [phase.to_dict() for phase in self.phases],
+            "nodes": dict(self.nodes),
+        }
+        if self.memory is not None:
+            result["memory_sites"] = [
+                {"phase": name, "sites": [list(site) for site in sites]}
+                for name, sites in self.memory.sites
+            ]
+            result["memory_by_type"] = dict(self.memory.by_type)
+        return result
+
+
+class _NoStats(ConversionStats):
+    """Stand-in for ConversionStats when the instrumentation is turned off."""
+
+    enabled = False
+
+    def phase(self, name, read=None, written=None):
+        return _NULL_PHASE
+
+    def count_nodes(self, root):
+        pass
+
+    def count_events(self, events, folder, url):
+        return events
+
+
+NO_STATS = _NoStats()
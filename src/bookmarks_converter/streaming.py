@@ -0,0 +1,584 @@
+"""Event based (streaming) reading and writing of bookmarks files.
+
+A bookmarks tree is represented as a sequence of events in pre-order:
+- `(FOLDER, node)` when a folder starts, followed by the events of its children
+- `(URL, node)` for a url
+- `(END, node)` when a folder ends
+
+The nodes are NodeMixin objects (JSONBookmark or HTMLBookmark), so the
+writers can use the `_convert_*` methods to format them. The readers produce
+the events while the source file is read, without building the whole tree.
+
+The writers are fed one event at a time (`write`), returning the items of
+their output as they go (str chunks, dicts or database objects), so several
+writers can share a single traversal of the tree (`write_events`)."""
+
+import itertools
+import json
+import mmap
+import os
+import re
+from json.decoder import scanstring
+
+FOLDER = "folder"
+URL = "url"
+END = "end"
+
+
+def add_index(events):
+    """Set the index of each node to its position in its parent folder, as
+    `BookmarksConverter._add_index` does for a tree. The first event is the
+    root of the tree, which keeps its index."""
+    positions = []
+    for event, node in events:
+        if event == END:
+            positions.pop()
+        else:
+            if positions:
+                node.index = positions[-1]
+                positions[-1] += 1
+            if event == FOLDER:
+                positions.append(0)
+        yield event, node
+
+
+def iter_tree_events(root):
+    """Yield the events of a bookmarks tree (NodeMixin objects)."""
+    yield FOLDER, root
+    stack = [(root, iter(root.children))]
+    while stack:
+        folder, children = stack[-1]
+        for child in children:
+            if child.type == "folder":
+                yield FOLDER, child
+                stack.append((child, iter(child.children)))
+                break
+            yield URL, child
+        else:
+            stack.pop()
+            yield END, folder
+
+
+def build_tree(events):
+    """Build the tree of a stream of events, appending each node to the
+    children of its folder, and return its root. The nodes are expected to
+    start without children."""
+    root = None
+    folders = []
+    for event, node in events:
+        if event == END:
+            folders.pop()
+            continue
+        if folders:
+            folders[-1].children.append(node)
+        else:
+            root = node
+        if event == FOLDER:
+            folders.append(node)
+    return root
+
+
+class HTMLEventScanner:
+    """Reader of the events of a HTML bookmarks file, scanning its bytes
+    (memory mapped) with compiled regexes instead of formatting it line by
+    line and running the HTML parser. The events are the same as the
+    folders/urls of the first "<H3>" tree BeautifulSoup ("html.parser")
+    finds in the lines formatted by `format_html_file`, with the same ids,
+    counted from 2 by each scan (not by the HTMLBookmark class counter, so
+    scans running in other threads don't interfere):
+    - a "<H1>"/"<H3>" element ending a line starts a folder, and a "<A>"
+      element ending a line is a url (dropped before the first folder),
+    - a "</DL><p>" ending a line ends the current folder, the end of the
+      first folder ending the stream.
+
+    The lines are never decoded: the attributes of the folders/urls, the
+    title being the text of the element, are stored as UTF-8 bytes, and
+    decoded by HTMLBookmark the first time they are read. The fields left
+    unused (the icons of a conversion to a filtered selection for example)
+    are never decoded.
+
+    A binary file object (a decompressed stream for example) is scanned in
+    chunks instead, each chunk ending after the last line break read.
+
+    Usage:
+        for event, node in HTMLEventScanner(filepath):
+            ...
+
+    Parameters:
+    -----------
+    filepath : str or Path or file object
+        path to the HTML bookmarks file, or binary file object
+    chunk_size : int
+        size of the chunks read from a file object (default 2**20)"""
+
+    _token = re.compile(rb"<(H1|H3|A)([^>\n]*)>(.*)</\1>\r?\n|</DL><p>\r?\n")
+    _attribute = re.compile(
+        rb"""([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?"""
+    )
+
+    def __init__(self, filepath, chunk_size=2**20):
+        # imported here, BeautifulSoup is only loaded to read a HTML file.
+        from .html_models import HTMLBookmark
+
+        self._node = HTMLBookmark
+        self.filepath = filepath
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        if hasattr(self.filepath, "read"):
+            yield from self._scan(self._iter_chunks(self.filepath))
+            return
+        with open(self.filepath, "rb") as file_:
+            if not os.fstat(file_.fileno()).st_size:
+                return
+            buffer = mmap.mmap(file_.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                yield from self._scan([buffer])
+            finally:
+                # the regex scanner holding the buffer is gone with _scan.
+                buffer.close()
+
+    def _iter_chunks(self, file_):
+        """Chunks of a file object ending after a line break, the elements
+        matched by the tokens never spanning two chunks."""
+        rest = b""
+        for data in iter(lambda: file_.read(self.chunk_size), b""):
+            data = rest + data
+            end = data.rfind(b"\n") + 1
+            # a line longer than the chunk is completed by the next ones.
+            rest = data[end:]
+            if end:
+                yield data[:end]
+        if rest:
+            yield rest
+
+    def _scan(self, buffers):
+        ids = itertools.count(start=2)
+        folders = []
+        started = False
+        for buffer in buffers:
+            for match in self._token.finditer(buffer):
+                tag = match.group(1)
+                if tag is None:
+                    if folders:
+                        yield END, folders.pop()
+                        if not folders:
+                            return
+                elif tag == b"A":
+                    # the urls before the first folder are dropped, though
+                    # they take an id as in BeautifulSoup.
+                    url = self._create("a", match, ids)
+                    if started:
+                        yield URL, url
+                else:
+                    started = True
+                    folder = self._create("h3", match, ids)
+                    folders.append(folder)
+                    yield FOLDER, folder
+        while folders:
+            yield END, folders.pop()
+
+    def _create(self, name, match, ids):
+        """Create the HTMLBookmark of an element, its attributes (keys
+        lowercased, as done by the HTML parser) left as bytes, and its id
+        taken from the ids of the scan unless it has one."""
+        attrs = {}
+        for key, double, single, bare in self._attribute.findall(match.group(2)):
+            attrs[key.decode("latin-1").lower()] = double or single or bare
+        attrs["title"] = match.group(3)
+        if not attrs.get("id"):
+            attrs["id"] = next(ids)
+        return self._node(name=name, attrs=attrs)
+
+
+class JSONEventReader:
+    """Incremental (pull) reader of a JSON file.
+
+    The file is read in chunks, the values are read one at a time using
+    `read_value`, `iter_keys` and `iter_items`, and the bookmark objects are
+    turned into events by `iter_node`."""
+
+    _whitespace = re.compile(r"[ \t\n\r]*")
+    _delimiter = re.compile(r"[,\]} \t\n\r]")
+    _decoder = json.JSONDecoder()
+    _scalar = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?|true|false|null")
+
+    def __init__(self, file_, chunk_size=2**16):
+        self._file = file_
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+
+    def _fill(self):
+        """Read the next chunk of the file, dropping the consumed part of the
+        buffer. Return False at the end of the file."""
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            return False
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        """Return the next non whitespace character, without consuming it."""
+        while True:
+            self._pos = self._whitespace.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of the JSON file.")
+
+    def _expect(self, char):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' in the JSON file, found '{found}'.")
+        self._pos += 1
+
+    def _read_string(self):
+        self._expect('"')
+        while True:
+            try:
+                value, self._pos = scanstring(self._buffer, self._pos)
+                return value
+            except json.JSONDecodeError:
+                # the string might continue in the next chunk.
+                if not self._fill():
+                    raise
+
+    def _read_scalar(self):
+        # make sure the whole value is in the buffer, the value ends at the
+        # next delimiter (or at the end of the file).
+        while not self._delimiter.search(self._buffer, self._pos):
+            if not self._fill():
+                break
+        match = self._scalar.match(self._buffer, self._pos)
+        if not match:
+            raise ValueError("Invalid value in the JSON file.")
+        self._pos = match.end()
+        return json.loads(match.group())
+
+    def _read_flat_object(self):
+        """Read the object at the current position with the (C accelerated)
+        json decoder if it doesn't contain other objects, as the urls do.
+        Return None, without consuming anything, otherwise."""
+        while True:
+            end = self._buffer.find("}", self._pos) + 1
+            if end:
+                break
+            if not self._fill():
+                return None
+        try:
+            value, _ = self._decoder.raw_decode(self._buffer[self._pos : end])
+        except json.JSONDecodeError:
+            # the first "}" closes a nested object, or is part of a string.
+            return None
+        self._pos = end
+        return value
+
+    def iter_keys(self):
+        """Iterate over the keys of the object at the current position, the
+        value of each key has to be read before getting the next key."""
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self._read_string()
+            self._expect(":")
+            yield key
+            if self._peek() == ",":
+                self._pos += 1
+            else:
+                self._expect("}")
+                return
+
+    def iter_items(self):
+        """Iterate over the items of the array at the current position, each
+        item has to be read before getting the next one."""
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield
+            if self._peek() == ",":
+                self._pos += 1
+            else:
+                self._expect("]")
+                return
+
+    def read_value(self):
+        """Read the value at the current position."""
+        char = self._peek()
+        if char == "{":
+            return {key: self.read_value() for key in self.iter_keys()}
+        if char == "[":
+            return [self.read_value() for _ in self.iter_items()]
+        if char == '"':
+            return self._read_string()
+        return self._read_scalar()
+
+    def iter_node(self, create, prepare=None):
+        """Yield the events of the bookmark object at the current position.
+
+        The folder event is yielded as soon as its "children" are reached, if
+        its "type" was already read. Otherwise (as in Chrome files where the
+        "children" come first) the events of the children are kept until the
+        folder ends.
+
+        create: callable
+            creates the node out of the dict of fields of the object.
+        prepare: callable
+            called with the dict of fields before creating the node."""
+        if self._peek() == "{":
+            fields = self._read_flat_object()
+            if fields is not None:
+                # a url, or a folder with an empty "children" list.
+                fields.pop("children", None)
+                if prepare:
+                    prepare(fields)
+                node = create(fields)
+                if node.type == URL:
+                    yield URL, node
+                else:
+                    yield FOLDER, node
+                    yield END, node
+                return
+        fields = {}
+        node = None
+        children = None
+        for key in self.iter_keys():
+            if key != "children":
+                fields[key] = self.read_value()
+            elif "type" in fields:
+                if prepare:
+                    prepare(fields)
+                node = create(fields)
+                yield FOLDER, node
+                yield from self.iter_children(create)
+            else:
+                children = list(self.iter_children(create))
+        if node is None:
+            if prepare:
+                prepare(fields)
+            node = create(fields)
+            if node.type == URL:
+                yield URL, node
+                return
+            yield FOLDER, node
+            if children:
+                yield from children
+        yield END, node
+
+    def iter_children(self, create, prepare=None):
+        """Yield the events of the bookmark objects in the array at the current
+        position. prepare is called with the fields and position of each one."""
+        for position, _ in enumerate(self.iter_items()):
+            if prepare:
+                yield from self.iter_node(
+                    create, lambda fields: prepare(fields, position)
+                )
+            else:
+                yield from self.iter_node(create)
+
+
+class HTMLEventWriter:
+    """Writer of the HTML output of a stream of events, the same as
+    `BookmarksConverter._convert_to_html`: the folders and urls in the order
+    of a depth first traversal, the root folder excluded.
+
+    Parameters:
+    -----------
+    depth : int
+        depth of the folder of the first event, 1 to write the output of a
+        subtree as found in the output of the whole tree (default 0)"""
+
+    header = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<!-- This is an automatically generated file.
+     It will be read and overwritten.
+     DO NOT EDIT! -->
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks Menu</H1>
+
+<DL><p>
+"""
+    footer = "</DL>"
+
+    def __init__(self, depth=0):
+        self._depth = depth
+
+    def start(self):
+        return self.header
+
+    def write(self, event, node):
+        """Return the str chunk of an event, None if it has none."""
+        if event == FOLDER:
+            self._depth += 1
+            # the root folder is not part of the output.
+            if self._depth > 1:
+                return node._convert_folder_to_html() + "<DL><p>\n"
+        elif event == URL:
+            return node._convert_url_to_html()
+        else:
+            self._depth -= 1
+            if self._depth:
+                return "</DL><p>\n"
+        return None
+
+    def close(self):
+        return self.footer
+
+    @staticmethod
+    def join(chunks):
+        return "".join(chunks)
+
+
+class JSONEventWriter:
+    """Writer of the JSON output of a stream of events, the same as
+    `BookmarksConverter._convert_to_json` saved by `_save_to_json`."""
+
+    def __init__(self):
+        # one entry per open folder, whether its next child is the first one.
+        self._first = []
+
+    def start(self):
+        return None
+
+    def separator(self):
+        """Return the separator preceding the next child of the current
+        folder."""
+        first = self._first
+        if not first or first[-1]:
+            if first:
+                first[-1] = False
+            return ""
+        return ", "
+
+    def write(self, event, node):
+        """Return the str chunk of an event."""
+        first = self._first
+        if event == END:
+            first.pop()
+            return "]}"
+        separator = self.separator()
+        if event == FOLDER:
+            first.append(True)
+            folder = json.dumps(node._convert_folder_to_json(), ensure_ascii=False)
+            # remove the closing of the empty children list '"children": []}'
+            return separator + folder[:-2]
+        return separator + json.dumps(node._convert_url_to_json(), ensure_ascii=False)
+
+    def close(self):
+        return None
+
+    @staticmethod
+    def join(chunks):
+        return "".join(chunks)
+
+
+class JSONTreeWriter:
+    """Writer of the JSON dict of a stream of events, the same dict as
+    `BookmarksConverter._convert_to_json`. Its only item is the root dict,
+    returned at the end of the root folder."""
+
+    def __init__(self):
+        self._folders = []
+
+    def start(self):
+        return None
+
+    def write(self, event, node):
+        folders = self._folders
+        if event == END:
+            folder = folders.pop()
+            return None if folders else folder
+        if event == FOLDER:
+            item = node._convert_folder_to_json()
+        else:
+            item = node._convert_url_to_json()
+        if folders:
+            folders[-1]["children"].append(item)
+        if event == FOLDER:
+            folders.append(item)
+        return None
+
+    def close(self):
+        return None
+
+    @staticmethod
+    def join(items):
+        return items[0]
+
+
+class DBEventWriter:
+    """Writer of the database objects of a stream of events, the same
+    objects as `BookmarksConverter._convert_to_db` in pre-order. The
+    `parent_id` of each node is set to the id of its folder, as done by
+    `_convert_to_db`."""
+
+    def __init__(self):
+        self._parents = []
+
+    def start(self):
+        return None
+
+    def write(self, event, node):
+        """Return the database object of an event, None for the end of a
+        folder."""
+        parents = self._parents
+        if event == END:
+            parents.pop()
+            return None
+        if parents:
+            node.parent_id = parents[-1]
+        if event == FOLDER:
+            folder = node._convert_folder_to_db()
+            parents.append(folder.id)
+            return folder
+        return node._convert_url_to_db()
+
+    def close(self):
+        return None
+
+    @staticmethod
+    def join(objects):
+        return objects
+
+
+def iter_output(writer, events):
+    """Yield the output items of a writer fed with a stream of events."""
+    item = writer.start()
+    if item is not None:
+        yield item
+    write = writer.write
+    for event, node in events:
+        item = write(event, node)
+        if item is not None:
+            yield item
+    item = writer.close()
+    if item is not None:
+        yield item
+
+
+def write_events(events, writers):
+    """Feed a stream of events to several writers in a single pass,
+    returning the output of each writer (its items joined by its `join`)."""
+    outputs = [[] for _ in writers]
+    for writer, output in zip(writers, outputs):
+        item = writer.start()
+        if item is not None:
+            output.append(item)
+    targets = [
+        (writer.write, output.append) for writer, output in zip(writers, outputs)
+    ]
+    for event, node in events:
+        for write, append in targets:
+            item = write(event, node)
+            if item is not None:
+                append(item)
+    for writer, output in zip(writers, outputs):
+        item = writer.close()
+        if item is not None:
+            output.append(item)
+    return [writer.join(output) for writer, output in zip(writers, outputs)]
@@ -0,0 +1,247 @@
+"""Transforms applied to the bookmarks between parsing and converting.
+
+A transform is a stage with two hooks, `folder` and `url`, called with each
+folder/url and returning the node (changed in place) or None to drop it, a
+dropped folder being dropped with its contents. A stage can also drop the
+folders left empty (`drop_empty_folders`). The root of the tree is left as
+is.
+
+A `TransformPipeline` chains stages and applies them all in a single
+traversal: each node goes through the hooks of every stage before the next
+node is visited. It works on a parsed tree (`apply`, in place) as well as on
+a stream of events (`events`, see `streaming.py`), where the folders are held
+back until something in them is kept when the empty folders are dropped.
+
+The stages provided:
+- `StripIcons`, drops the icon and icon_uri of the urls,
+- `DropEmptyFolders`, drops the folders holding no url (once the other
+  stages applied),
+- `StripTrackingParameters`, removes the tracking parameters (utm_*,
+  fbclid, ...) from the query of the urls,
+- `ClampTitles`, truncates the titles longer than a maximum length."""
+
+import re
+
+from .dedup import _remove_children
+from .streaming import END, FOLDER, URL
+
+# query parameters removed by StripTrackingParameters, along with the ones
+# starting with one of the prefixes.
+TRACKING_PARAMETERS = (
+    "fbclid",
+    "gclid",
+    "dclid",
+    "msclkid",
+    "mc_cid",
+    "mc_eid",
+    "igshid",
+    "yclid",
+    "_hsenc",
+    "_hsmi",
+)
+TRACKING_PREFIXES = ("utm_",)
+
+
+class Transform:
+    """Base class of the stages of a TransformPipeline, which leaves the
+    nodes untouched. A stage overrides the hooks it needs.
+
+    Attributes:
+    -----------
+    drop_empty_folders : bool
+        whether the folders left without url are dropped"""
+
+    drop_empty_folders = False
+
+    def folder(self, node):
+        """Return the folder, changed in place, or None to drop it along with
+        its contents."""
+        return node
+
+    def url(self, node):
+        """Return the url, changed in place, or None to drop it."""
+        return node
+
+
+class StripIcons(Transform):
+    """Drop the icon and icon_uri of the urls."""
+
+    def url(self, node):
+        node.icon = node.icon_uri = None
+        return node
+
+
+class DropEmptyFolders(Transform):
+    """Drop the folders holding no url, the folders holding only empty
+    folders included."""
+
+    drop_empty_folders = True
+
+
+class StripTrackingParameters(Transform):
+    """Remove the tracking parameters from the query of the urls.
+
+    Parameters:
+    -----------
+    names : iterable of str
+        names of the parameters removed (default TRACKING_PARAMETERS)
+    prefixes : iterable of str
+        prefixes of the names of the parameters removed (default
+        TRACKING_PREFIXES)"""
+
+    def __init__(self, names=TRACKING_PARAMETERS, prefixes=TRACKING_PREFIXES):
+        self.names = frozenset(names)
+        self.prefixes = tuple(prefixes)
+        alternatives = [re.escape(name) for name in self.names]
+        alternatives += [re.escape(prefix) + r"[^=&#]*" for prefix in self.prefixes]
+        # the urls without any of the parameters are returned unchanged.
+        self._search = re.compile(
+            r"[?&](?:%s)(?:[=&#]|$)" % "|".join(alternatives)
+        ).search
+
+    def _tracking(self, parameter):
+        name = parameter.partition("=")[0]
+        return name in self.names or name.startswith(self.prefixes)
+
+    def url(self, node):
+        url = node.url
+        if url and self._search(url):
+            base, _, query = url.partition("?")
+            query, hash_, fragment = query.partition("#")
+            query = "&".join(
+                parameter
+                for parameter in query.split("&")
+                if parameter and not self._tracking(parameter)
+            )
+            node.url = base + ("?" + query if query else "") + hash_ + fragment
+        return node
+
+
+class ClampTitles(Transform):
+    """Truncate the titles of the folders/urls longer than a maximum length.
+
+    Parameters:
+    -----------
+    max_length : int
+        maximum length of the titles, the suffix included (default 200)
+    suffix : str
+        appended to the truncated titles (default "…")"""
+
+    def __init__(self, max_length=200, suffix="…"):
+        if len(suffix) >= max_length:
+            raise ValueError("The suffix has to be shorter than the maximum length.")
+        self.max_length = max_length
+        self.suffix = suffix
+
+    def _clamp(self, node):
+        title = node.title
+        if title and len(title) > self.max_length:
+            node.title = title[: self.max_length - len(self.suffix)] + self.suffix
+        return node
+
+    folder = url = _clamp
+
+
+class TransformPipeline:
+    """Stages applied to the folders/urls in a single traversal, in order
+    (see the module docstring).
+
+    Usage:
+        pipeline = TransformPipeline([StripIcons(), DropEmptyFolders()])
+        pipeline.apply(bookmarks_tree)
+        events = pipeline.events(events)
+
+    Parameters:
+    -----------
+    stages : iterable of Transform
+        the stages, each node goes through them in order
+
+    Attributes:
+    -----------
+    stages : list of Transform
+        the stages of the pipeline
+    drop_empty_folders : bool
+        whether a stage drops the empty folders"""
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+        self.drop_empty_folders = any(stage.drop_empty_folders for stage in self.stages)
+        # only the hooks overridden by the stages are called.
+        self._folder_hooks = [
+            stage.folder
+            for stage in self.stages
+            if type(stage).folder is not Transform.folder
+        ]
+        self._url_hooks = [
+            stage.url for stage in self.stages if type(stage).url is not Transform.url
+        ]
+
+    def _folder(self, node):
+        for hook in self._folder_hooks:
+            node = hook(node)
+            if node is None:
+                return None
+        return node
+
+    def _url(self, node):
+        for hook in self._url_hooks:
+            node = hook(node)
+            if node is None:
+                return None
+        return node
+
+    def apply(self, root):
+        """Apply the stages to a bookmarks tree, in place. The index of the
+        children of the folders whose children were dropped is updated."""
+        drop_empty = self.drop_empty_folders
+        # the folders being traversed, their children and the ones dropped.
+        stack = [(root, iter(root.children), [])]
+        while stack:
+            folder, children, dropped = stack[-1]
+            for child in children:
+                if child.type == "folder":
+                    if self._folder(child) is None:
+                        dropped.append(child)
+                        continue
+                    stack.append((child, iter(child.children), []))
+                    break
+                if self._url(child) is None:
+                    dropped.append(child)
+            else:
+                stack.pop()
+                if dropped:
+                    _remove_children(folder, dropped)
+                if drop_empty and stack and not folder.children:
+                    stack[-1][2].append(folder)
+
+    def events(self, events):
+        """Yield the events of the folders/urls kept out of a stream of
+        events, the index of the nodes isn't updated."""
+        drop_empty = self.drop_empty_folders
+        # the open folders, the first `emitted` were yielded.
+        folders = []
+        emitted = 0
+        # depth in a dropped folder.
+        skipped = 0
+        for event, node in events:
+            if skipped:
+                skipped += (event == FOLDER) - (event == END)
+                continue
+            if event == END:
+                folders.pop()
+                if emitted > len(folders):
+                    emitted -= 1
+                    yield END, node
+            elif event == FOLDER:
+                if folders and self._folder(node) is None:
+                    skipped = 1
+                    continue
+                folders.append(node)
+                if not drop_empty or not emitted:
+                    yield FOLDER, node
+                    emitted += 1
+            elif self._url(node) is not None:
+                for folder in folders[emitted:]:
+                    yield FOLDER, folder
+                emitted = len(folders)
+                yield URL, node
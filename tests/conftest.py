@@ -2,7 +2,13 @@ import json
 from pathlib import Path
 
 import pytest
-from bookmarks_converter.models import Bookmark, create_engine, sessionmaker
+from bookmarks_converter import BookmarksConverter
+from bookmarks_converter.models import (
+    Bookmark,
+    JSONBookmark,
+    create_engine,
+    sessionmaker,
+)
 
 ROOT_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = ROOT_DIR.joinpath("data")
@@ -154,3 +160,32 @@ def folder_custom():
         "date_added": 0,
         "children": [],
     }
+
+
+@pytest.fixture
+def folder():
+    def _function(id_, title, *children):
+        return JSONBookmark(
+            type="folder", id=id_, title=title, date_added=0, children=list(children)
+        )
+
+    return _function
+
+
+@pytest.fixture
+def url():
+    def _function(id_, url_="https://example.com/", title="page", **fields):
+        fields.setdefault("date_added", 0)
+        return JSONBookmark(type="url", id=id_, title=title, url=url_, **fields)
+
+    return _function
+
+
+@pytest.fixture
+def parse():
+    def _function(filepath, format_, filter_=None, **options):
+        bookmarks = BookmarksConverter(filepath, **options)
+        bookmarks.parse(format_, filter_)
+        return bookmarks
+
+    return _function
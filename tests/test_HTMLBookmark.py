@@ -30,3 +30,24 @@ def test_HTMLBookmark_folder_custom(folder_custom):
     assert "folder" == folder.type
     assert isinstance(folder.contents, list)
     assert isinstance(folder.children, list)
+
+
+def test_HTMLBookmark_parent_id(folder_custom):
+    folder = HTMLBookmark(name="h3", attrs=folder_custom)
+    assert folder.parent_id is None
+    folder.parent_id = 1
+    assert 1 == folder.parent_id
+    assert folder.tags is None
+
+
+def test_HTMLBookmark_hash_stable(folder_custom):
+    # the folder has no "add_date", its date_added is the current time.
+    folder = HTMLBookmark(name="h3", attrs=folder_custom)
+    assert hash(folder) == hash(folder)
+    assert folder in {folder}
+    assert folder == HTMLBookmark(name="h3", attrs=folder_custom)
+
+
+def test_HTMLBookmark_equality_other_tags():
+    assert HTMLBookmark(name="dl") != HTMLBookmark(name="p")
+    assert HTMLBookmark(name="dl") == HTMLBookmark(name="dl")
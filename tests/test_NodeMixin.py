@@ -1,5 +1,11 @@
 import pytest
-from bookmarks_converter.models import Folder, NodeMixin, Url
+from bookmarks_converter.models import (
+    Folder,
+    HTMLBookmark,
+    JSONBookmark,
+    NodeMixin,
+    Url,
+)
 
 
 def test_convert_url_to_db(url_custom, create_class_instance):
@@ -122,3 +128,54 @@ def test_repr():
     instance.type = "folder"
     instance.id = 0
     assert repr(instance) == "Title - folder - id: 0"
+
+
+def test_equality_across_formats(url_custom):
+    url_custom["date_added"] = 1599750431776
+    json_url = JSONBookmark(**url_custom)
+    html_url = HTMLBookmark(
+        name="a", attrs=dict(url_custom, href=url_custom["url"], add_date=1599750431776)
+    )
+    db_url = Url(
+        title="Google",
+        index=0,
+        parent_id=None,
+        url="https://www.google.com",
+        _id=2,
+        date_added=1599750431776,
+        icon=None,
+        icon_uri="https://www.google.com/favicon.ico",
+        tags=None,
+    )
+    assert json_url == html_url == db_url
+    assert hash(json_url) == hash(html_url) == hash(db_url)
+    assert json_url.content_hash == html_url.content_hash == db_url.content_hash
+
+
+def test_equality_ignores_children(folder_custom):
+    folder_a = JSONBookmark(**dict(folder_custom, children=[]))
+    folder_b = JSONBookmark(**dict(folder_custom, children=[]))
+    folder_b.children.append(JSONBookmark(**dict(folder_custom, children=[])))
+    assert folder_a.children != folder_b.children
+    assert folder_a == folder_b
+    assert len({folder_a, folder_b}) == 1
+
+
+def test_equality_false(folder_custom):
+    folder_a = JSONBookmark(**folder_custom)
+    folder_b = JSONBookmark(**folder_custom)
+    folder_b.title = "Other Folder"
+    assert folder_a != folder_b
+    assert folder_a.content_hash != folder_b.content_hash
+    assert (folder_a == 0) is False
+
+
+def test_hash_ignores_position(folder_custom):
+    folder_a = JSONBookmark(**dict(folder_custom, children=[]))
+    folder_b = JSONBookmark(**dict(folder_custom, children=[]))
+    folders = {folder_a}
+    folder_a.index = 9000
+    folder_a.parent_id = 1
+    assert folder_a in folders
+    assert folder_a.content_hash == folder_b.content_hash
+    assert folder_a != folder_b
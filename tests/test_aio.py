@@ -0,0 +1,148 @@
+import asyncio
+import shutil
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+from bookmarks_converter import (
+    AsyncBookmarksConverter,
+    BookmarksConverter,
+    convert_async,
+)
+from bookmarks_converter.streaming import iter_tree_events
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_async_converter(source_bookmark_files, streaming):
+    source_file = source_bookmark_files["bookmarks_firefox.json"]
+
+    async def convert():
+        bookmarks = AsyncBookmarksConverter(
+            source_file, semaphore=asyncio.Semaphore(1), streaming=streaming
+        )
+        await bookmarks.parse("json")
+        await bookmarks.convert("html")
+        await bookmarks.save()
+        return bookmarks.output_filepath.with_suffix(".html")
+
+    output_file = run(convert())
+    expected = BookmarksConverter(source_file)
+    expected.parse("json")
+    expected.convert("html")
+    with open(output_file, "r", encoding="utf-8") as file_:
+        assert file_.read() == expected.bookmarks
+    output_file.unlink()
+
+
+def test_semaphore_caps_concurrency(source_bookmark_files, tmp_path):
+    # each converter gets its own file, as they share the same temporary file.
+    source_files = []
+    for i in range(6):
+        source_files.append(tmp_path.joinpath(f"bookmarks_{i}.json"))
+        shutil.copy(source_bookmark_files["bookmarks_chrome.json"], source_files[i])
+    running = []
+    peak = []
+
+    class Executor(ThreadPoolExecutor):
+        def submit(self, function, *args):
+            def wrapper():
+                running.append(None)
+                peak.append(len(running))
+                try:
+                    return function(*args)
+                finally:
+                    running.pop()
+
+            return super().submit(wrapper)
+
+    async def convert_all():
+        semaphore = asyncio.Semaphore(2)
+        with Executor(max_workers=4) as executor:
+            converters = [
+                AsyncBookmarksConverter(
+                    source_file, executor=executor, semaphore=semaphore
+                )
+                for source_file in source_files
+            ]
+            await asyncio.gather(*(bookmarks.parse("json") for bookmarks in converters))
+        return converters
+
+    converters = run(convert_all())
+    assert max(peak) <= 2
+    assert all(bookmarks.converter._tree is not None for bookmarks in converters)
+
+
+def test_convert_async_keeps_loop_responsive(source_bookmark_files, tmp_path):
+    source_file = tmp_path.joinpath("bookmarks.html")
+    shutil.copy(source_bookmark_files["bookmarks_firefox.html"], source_file)
+
+    async def convert():
+        ticks = []
+
+        async def health_check():
+            while True:
+                ticks.append(None)
+                await asyncio.sleep(0)
+
+        task = asyncio.ensure_future(health_check())
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            result = await convert_async(
+                source_file, None, ["json", "db"], executor=executor
+            )
+        task.cancel()
+        return result, len(ticks)
+
+    result, ticks = run(convert())
+    assert result.ok
+    assert len(result.output_filepaths) == 2
+    assert ticks > 1
+
+
+def write_html(filepath, folders, urls):
+    lines = ["<H1>Bookmarks</H1>\n", "<DL><p>\n"]
+    for i in range(folders):
+        lines.append(f'<DT><H3 ADD_DATE="1">Folder {i}</H3>\n<DL><p>\n')
+        lines.extend(
+            f'<DT><A HREF="https://{i}.com/{j}" ADD_DATE="2">Page {j}</A>\n'
+            for j in range(urls)
+        )
+        lines.append("</DL><p>\n")
+    lines.append("</DL><p>\n")
+    filepath.write_text("".join(lines), encoding="utf-8")
+
+
+def node_ids(tree):
+    return [(node.id, node.title) for _, node in iter_tree_events(tree)]
+
+
+def test_concurrent_html_parses(tmp_path):
+    # the ids of each file are its own, whatever the files parsed meanwhile.
+    source_files = []
+    for i in range(3):
+        source_files.append(tmp_path.joinpath(f"bookmarks_{i}.html"))
+        write_html(source_files[i], 20 + i, 200)
+    expected = []
+    for source_file in source_files:
+        bookmarks = BookmarksConverter(source_file)
+        bookmarks.parse("html")
+        expected.append(node_ids(bookmarks._tree))
+
+    async def parse_all():
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            converters = [
+                AsyncBookmarksConverter(source_file, executor=executor)
+                for source_file in source_files
+            ]
+            await asyncio.gather(*(bookmarks.parse("html") for bookmarks in converters))
+        return converters
+
+    converters = run(parse_all())
+    for bookmarks, ids in zip(converters, expected):
+        assert node_ids(bookmarks.converter._tree) == ids
@@ -0,0 +1,52 @@
+import shutil
+
+import pytest
+from bookmarks_converter import BookmarksConverter, convert_many
+from bookmarks_converter.batch import BatchReport, ConversionResult
+
+
+@pytest.fixture
+def batch_files(source_bookmark_files, tmp_path):
+    paths = []
+    for i, name in enumerate(["bookmarks_firefox.json", "bookmarks_chrome.json"]):
+        path = tmp_path.joinpath(f"{i}_{name}")
+        shutil.copy(source_bookmark_files[name], path)
+        paths.append(path)
+    broken = tmp_path.joinpath("broken.json")
+    broken.write_text("{", encoding="utf-8")
+    paths.insert(1, broken)
+    return paths
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_convert_many(batch_files, workers):
+    report = convert_many(batch_files, "json", ["html", "db"], workers=workers)
+    assert isinstance(report, BatchReport)
+    assert [result.filepath for result in report.results] == list(map(str, batch_files))
+    assert [result.ok for result in report.results] == [True, False, True]
+    assert report.errors == [report.results[1]]
+    assert report.results[1].error.startswith("JSONDecodeError")
+    for path, result in zip(batch_files[::2], report.results[::2]):
+        assert len(result.output_filepaths) == 2
+        bookmarks = BookmarksConverter(path)
+        bookmarks.parse("json")
+        bookmarks.convert("html")
+        with open(result.output_filepaths[0], "r", encoding="utf-8") as file_:
+            assert file_.read() == bookmarks.bookmarks
+    assert report.size == sum(path.stat().st_size for path in batch_files)
+    assert report.files_per_second > 0
+    assert report.mb_per_second > 0
+
+
+def test_convert_many_missing_file(tmp_path):
+    report = convert_many(
+        [tmp_path.joinpath("missing.json")], "json", "html", workers=1
+    )
+    assert report.results[0].error.startswith("FileNotFoundError")
+    assert report.results[0].size == 0
+
+
+def test_report_empty():
+    report = BatchReport([ConversionResult("file")], 0)
+    assert report.files_per_second == 0
+    assert report.mb_per_second == 0
@@ -1,11 +1,13 @@
 import json
+import sqlite3
+import threading
 from filecmp import cmp
 from pathlib import Path
 
 import pytest
 from bookmarks_converter import BookmarksConverter
 from bookmarks_converter.core import JSONMixin
-from bookmarks_converter.models import Folder, JSONBookmark
+from bookmarks_converter.models import Base, Folder, JSONBookmark, Url
 from pytest_mock import class_mocker as mocker
 
 
@@ -45,6 +47,105 @@ class Test_DBMixin:
         assert bookmarks == temp_bookmarks
         output_file.unlink()
 
+    @pytest.mark.parametrize("wal", [True, False])
+    def test_save_to_db_wal(self, wal, tmp_path):
+        instance = BookmarksConverter(tmp_path.joinpath("temp.db"), wal=wal)
+        instance.bookmarks = [
+            Folder(date_added=0, index=0, _id=1, parent_id=None, title="root")
+        ]
+        instance._export = instance._format = "db"
+        instance.save()
+        with sqlite3.connect(str(instance.output_filepath)) as connection:
+            journal_mode = connection.execute("PRAGMA journal_mode").fetchone()[0]
+        assert journal_mode == ("wal" if wal else "delete")
+        # the log is checkpointed and truncated once the bulk load is done.
+        wal_file = tmp_path.joinpath("output_temp.db-wal")
+        assert not wal_file.exists() or wal_file.stat().st_size == 0
+
+    def test_parse_db_wal_keeps_journal_mode(self, result_bookmark_files, tmp_path):
+        file_path = tmp_path.joinpath("bookmarks.db")
+        file_path.write_bytes(
+            Path(result_bookmark_files["from_chrome_html.db"]).read_bytes()
+        )
+        instance = BookmarksConverter(file_path, wal=True)
+        instance.parse("db")
+        assert instance._tree.children
+        with sqlite3.connect(str(file_path)) as connection:
+            journal_mode = connection.execute("PRAGMA journal_mode").fetchone()[0]
+        assert journal_mode == "delete"
+
+    def test_parse_db_from_wal_file(self, tmp_path):
+        writer = BookmarksConverter(tmp_path.joinpath("temp.db"), wal=True)
+        writer.bookmarks = [
+            Folder(date_added=0, index=0, _id=1, parent_id=None, title="root"),
+            Url(
+                title="Google",
+                index=0,
+                parent_id=1,
+                url="https://www.google.com",
+                _id=2,
+                date_added=0,
+            ),
+        ]
+        writer._export = writer._format = "db"
+        writer.save()
+        reader = BookmarksConverter(writer.output_filepath)
+        reader.parse("db")
+        assert reader._tree.children == [writer.bookmarks[1]]
+
+    def test_save_to_db_wal_concurrent_readers(self, tmp_path):
+        instance = BookmarksConverter(tmp_path.joinpath("temp.db"), wal=True)
+        output_file = instance.output_filepath
+        # create the schema in WAL mode before the readers connect.
+        engine = instance._create_engine(output_file, wal=True)
+        Base.metadata.create_all(engine)
+        engine.dispose()
+        bookmarks = [Folder(date_added=0, index=0, _id=1, parent_id=None, title="root")]
+        for i in range(2, 50_002):
+            bookmarks.append(
+                Url(
+                    title=f"Title {i}",
+                    index=i - 2,
+                    parent_id=1,
+                    url=f"https://{i}.com",
+                    _id=i,
+                    date_added=0,
+                )
+            )
+        instance.bookmarks = bookmarks
+        instance._export = instance._format = "db"
+
+        counts, errors = [], []
+        writing = threading.Event()
+        done = threading.Event()
+
+        def reader():
+            # timeout=0, fail right away instead of waiting if the db is locked.
+            connection = sqlite3.connect(str(output_file), timeout=0)
+            writing.wait()
+            try:
+                while not done.is_set():
+                    query = "SELECT count(*) FROM bookmark"
+                    counts.append(connection.execute(query).fetchone()[0])
+            except sqlite3.OperationalError as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        writing.set()
+        instance.save()
+        done.set()
+        for thread in threads:
+            thread.join()
+
+        assert not errors
+        assert counts
+        # readers only ever see the state before or after the bulk load.
+        assert set(counts) <= {0, len(bookmarks)}
+
 
 class Test_HTMLMixin:
     def test_save_to_html(self, result_bookmark_files):
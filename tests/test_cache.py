@@ -0,0 +1,142 @@
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from bookmarks_converter import convert_many
+from bookmarks_converter.cache import ParseCache
+from bookmarks_converter.columnar import ColumnarTree, NodeView
+
+
+def put_entry(directory, key, tree):
+    ParseCache(directory).put(key, tree)
+    return ParseCache(directory).get(key) is not None
+
+
+def without_folder_dates(root):
+    for folder in [root] + root["children"]:
+        folder["date_added"] = 0
+    return root
+
+
+@pytest.mark.parametrize(
+    "source_file, source_format, target_format",
+    [
+        ("bookmarks_firefox.json", "json", "html"),
+        ("bookmarks_chrome.json", "json", "db"),
+        ("bookmarks_firefox.html", "html", "json"),
+        ("from_chrome_html.db", "db", "html"),
+    ],
+)
+@pytest.mark.parametrize("columnar", [False, True])
+def test_cache_hit(
+    source_file,
+    source_format,
+    target_format,
+    columnar,
+    source_bookmark_files,
+    result_bookmark_files,
+    tmp_path,
+    monkeypatch,
+    parse,
+):
+    files = dict(source_bookmark_files, **result_bookmark_files)
+    cache = ParseCache(tmp_path)
+    bookmarks = parse(files[source_file], source_format, cache=cache, columnar=columnar)
+    assert (cache.hits, cache.misses) == (0, 1)
+    bookmarks.convert(target_format)
+    expected = bookmarks.bookmarks
+    if source_format == "html":
+        # the dates missing from the html file are generated when read.
+        expected = without_folder_dates(expected)
+
+    # the second parse doesn't touch the parsing backend.
+    def fail():
+        raise AssertionError("parsed again")
+
+    monkeypatch.setattr(bookmarks, f"_parse_{source_format}", fail)
+    bookmarks.parse(source_format)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert isinstance(bookmarks._tree, NodeView)
+    bookmarks.convert(target_format)
+    if target_format == "db":
+        key = lambda node: node.id
+        assert sorted(bookmarks.bookmarks, key=key) == sorted(expected, key=key)
+    elif source_format == "html":
+        assert without_folder_dates(bookmarks.bookmarks) == expected
+    else:
+        assert bookmarks.bookmarks == expected
+
+
+def test_cache_key(source_bookmark_files, tmp_path):
+    filepath = tmp_path.joinpath("bookmarks.json")
+    shutil.copy(source_bookmark_files["bookmarks_firefox.json"], filepath)
+    key = ParseCache.key(filepath, "json")
+    assert ParseCache.key(filepath, "JSON") == key
+    assert ParseCache.key(filepath, "html") != key
+    with open(filepath, "a", encoding="utf-8") as file_:
+        file_.write(" ")
+    assert ParseCache.key(filepath, "json") != key
+
+
+def test_cache_stats(source_bookmark_files, tmp_path, parse):
+    filepath = source_bookmark_files["bookmarks_firefox.json"]
+    names = []
+    for _ in range(2):
+        bookmarks = parse(filepath, "json", cache=tmp_path, stats=True)
+        names.append([phase.name for phase in bookmarks.stats.phases])
+    assert names[0] == [
+        "parse.cache_load",
+        "parse.format_json_file",
+        "parse.json_load",
+        "parse.cache_store",
+        "parse",
+    ]
+    assert names[1] == ["parse.cache_load", "parse"]
+    assert bookmarks.stats.nodes["url"] > 0
+
+
+def test_cache_eviction(source_bookmark_files, tmp_path, parse):
+    filepath = source_bookmark_files["bookmarks_firefox.json"]
+    tree = ColumnarTree.from_tree(parse(filepath, "json")._tree)
+    cache = ParseCache(tmp_path, max_size=None)
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, tree)
+        os.utime(str(cache.path(key)), (i, i))
+    size = cache.path("a").stat().st_size
+    # "a" is used, "b" becomes the least recently used entry.
+    assert cache.get("a") is not None
+    cache.max_size = 2 * size
+    cache.evict()
+    assert sorted(path.stem for path in tmp_path.iterdir()) == ["a", "c"]
+    cache.clear()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cache_corrupt_entry(source_bookmark_files, tmp_path, parse):
+    filepath = source_bookmark_files["bookmarks_firefox.json"]
+    cache = ParseCache(tmp_path)
+    key = cache.key(filepath, "json")
+    cache.directory.joinpath(key + ".tree").write_bytes(b"truncated")
+    bookmarks = parse(filepath, "json", cache=cache)
+    assert cache.misses == 1
+    assert bookmarks._tree.children
+    # the broken entry was replaced by the parsed tree.
+    assert isinstance(cache.get(key), ColumnarTree)
+
+
+def test_cache_processes(source_bookmark_files, tmp_path, parse):
+    filepath = source_bookmark_files["bookmarks_firefox.json"]
+    tree = ColumnarTree.from_tree(parse(filepath, "json")._tree)
+    with ProcessPoolExecutor(4) as executor:
+        results = executor.map(put_entry, [tmp_path] * 8, ["key"] * 8, [tree] * 8)
+        assert all(results)
+    assert [path.name for path in tmp_path.iterdir()] == ["key.tree"]
+
+    files = []
+    for i in range(2):
+        files.append(tmp_path.joinpath(f"{i}_bookmarks_firefox.json"))
+        shutil.copy(filepath, files[-1])
+    report = convert_many(files, "json", "html", workers=2, cache=tmp_path)
+    assert report.errors == []
+    assert len(list(tmp_path.glob("*.tree"))) == 2
@@ -0,0 +1,128 @@
+import shutil
+import subprocess
+import sys
+
+import pytest
+from bookmarks_converter import __version__
+from bookmarks_converter.cli import collect_files, main
+from bookmarks_converter.formats import detect_format
+
+
+@pytest.fixture
+def bookmarks_dir(source_bookmark_files, tmp_path):
+    for name in ["bookmarks_firefox.json", "bookmarks_chrome.html"]:
+        shutil.copy(source_bookmark_files[name], tmp_path.joinpath(name))
+    tmp_path.joinpath("output_bookmarks_firefox.html").write_text("")
+    tmp_path.joinpath("notes.txt").write_text("")
+    sub_dir = tmp_path.joinpath("sub")
+    sub_dir.mkdir()
+    shutil.copy(source_bookmark_files["bookmarks_chrome.json"], sub_dir)
+    return tmp_path
+
+
+@pytest.mark.parametrize(
+    "name, content, format_",
+    [
+        ("file.db", b"", "db"),
+        ("file.HTM", b"", "html"),
+        ("file.json", b"", "json"),
+        ("file", b"SQLite format 3\x00", "db"),
+        ("file", b"\xef\xbb\xbf\n {", "json"),
+        ("file", b"<!DOCTYPE", "html"),
+        ("file", b"bookmarks", None),
+    ],
+)
+def test_detect_format(name, content, format_, tmp_path):
+    path = tmp_path.joinpath(name)
+    path.write_bytes(content)
+    assert detect_format(path) == format_
+
+
+def test_collect_files(bookmarks_dir):
+    names = [path.name for path in collect_files([str(bookmarks_dir)])]
+    assert names == ["bookmarks_chrome.html", "bookmarks_firefox.json"]
+    files = collect_files([str(bookmarks_dir)], recursive=True)
+    assert [path.name for path in files][-1] == "bookmarks_chrome.json"
+    pattern = str(bookmarks_dir.joinpath("**", "*.json"))
+    files = collect_files([pattern, pattern])
+    assert [path.name for path in files] == [
+        "bookmarks_firefox.json",
+        "bookmarks_chrome.json",
+    ]
+
+
+def test_main(bookmarks_dir, capsys):
+    assert main([str(bookmarks_dir), "-t", "json", "db", "--stats"]) == 0
+    output = capsys.readouterr().out
+    for name in ["chrome.html", "firefox.json"]:
+        for suffix in [".json", ".db"]:
+            output_file = bookmarks_dir.joinpath(f"output_bookmarks_{name}")
+            assert output_file.with_suffix(suffix).exists()
+    assert "parse" in output and "files/s" in output
+
+
+def test_main_jobs(bookmarks_dir, capsys):
+    missing = bookmarks_dir.joinpath("missing.json")
+    files = [str(bookmarks_dir.joinpath("bookmarks_firefox.json")), str(missing)]
+    assert main(files + ["-t", "html", "--jobs", "2", "--streaming"]) == 1
+    captured = capsys.readouterr()
+    assert "FileNotFoundError" in captured.err
+    assert bookmarks_dir.joinpath("output_bookmarks_firefox.html").stat().st_size > 0
+    assert not bookmarks_dir.joinpath("output_missing.html").exists()
+
+
+def test_main_no_files(tmp_path, capsys):
+    assert main([str(tmp_path), "-t", "html"]) == 2
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 7), reason="lazy module attributes need python 3.7"
+)
+def test_version_without_backends():
+    # the backends are only imported when there are files to convert.
+    code = (
+        "import sys\n"
+        "from bookmarks_converter.cli import main\n"
+        "try:\n"
+        "    main(['--version'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "assert 'bs4' not in sys.modules and 'sqlalchemy' not in sys.modules\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], stdout=subprocess.PIPE, check=True
+    ).stdout
+    assert output.decode().strip() == f"bookmarks-converter {__version__}"
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 7), reason="lazy module attributes need python 3.7"
+)
+def test_main_loads_used_backends(bookmarks_dir):
+    # a json to html conversion loads neither the db nor the html backend.
+    filepath = str(bookmarks_dir.joinpath("bookmarks_firefox.json"))
+    code = (
+        "import sys\n"
+        "from bookmarks_converter.cli import main\n"
+        f"assert main([{filepath!r}, '-t', 'html', 'json']) == 0\n"
+        "assert 'bs4' not in sys.modules and 'sqlalchemy' not in sys.modules\n"
+        f"assert main([{filepath!r}, '-t', 'db']) == 0\n"
+        "assert 'bs4' not in sys.modules and 'sqlalchemy' in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE, check=True)
+
+
+def test_main_profile_memory(bookmarks_dir, capsys):
+    filepath = str(bookmarks_dir.joinpath("bookmarks_firefox.json"))
+    assert main([filepath, "-t", "html", "--profile-memory"]) == 0
+    output = capsys.readouterr().out
+    assert "top allocation sites at the end of parse:" in output
+    assert "JSONBookmark:" in output and "output:" in output
+
+
+def test_main_cache(bookmarks_dir, tmp_path):
+    filepath = str(bookmarks_dir.joinpath("bookmarks_firefox.json"))
+    cache_dir = tmp_path.joinpath("cache")
+    for _ in range(2):
+        assert main([filepath, "-t", "html", "--cache", str(cache_dir)]) == 0
+    assert len(list(cache_dir.glob("*.tree"))) == 1
@@ -0,0 +1,146 @@
+import pickle
+
+import pytest
+from bookmarks_converter import BookmarksConverter
+from bookmarks_converter.columnar import ColumnarTree, NodeView, StringTable
+from bookmarks_converter.models import JSONBookmark
+
+
+@pytest.fixture
+def json_tree(folder_custom, url_custom):
+    # each folder gets its own children list.
+    root = JSONBookmark(**dict(folder_custom, children=[]))
+    for i in range(3):
+        url = JSONBookmark(**dict(url_custom, id=i + 2, index=i, parent_id=1))
+        root.children.append(url)
+    folder = JSONBookmark(
+        **dict(folder_custom, id=5, index=3, title="Sub Folder", children=[])
+    )
+    folder.children.append(JSONBookmark(**dict(url_custom, id=6, index=0)))
+    root.children.append(folder)
+    return root
+
+
+def test_string_table():
+    table = StringTable()
+    assert table.intern("a") == 0
+    assert table.intern("b") == 1
+    assert table.intern("a") == 0
+    assert table.intern(None) == -1
+    assert table[1] == "b"
+    assert table[-1] is None
+    assert len(table) == 2
+
+
+def test_from_tree(json_tree):
+    tree = ColumnarTree.from_tree(json_tree)
+    assert len(tree) == 6
+    # the 4 urls share the same title and url, they are stored once.
+    assert len(tree.urls) == 1
+    assert list(tree.parents) == [-1, 0, 0, 0, 0, 4]
+    assert tree.children_rows(0) == [1, 2, 3, 4]
+    assert tree.children_rows(4) == [5]
+    assert tree.children_rows(5) == []
+
+
+def test_views(json_tree):
+    tree = ColumnarTree.from_tree(json_tree)
+    root = tree.root
+    assert isinstance(root, NodeView)
+    assert root == json_tree
+    for view, node in zip(root, json_tree):
+        assert view == node
+        assert view.type == node.type
+    folder = root.children[3]
+    assert folder.title == "Sub Folder"
+    assert folder.children[0].url == "https://www.google.com"
+    assert folder.parent_id is None
+
+
+def test_view_setters(json_tree):
+    tree = ColumnarTree.from_tree(json_tree)
+    view = tree[1]
+    view.index = 9000
+    view.title = "Over 9000"
+    view.parent_id = None
+    assert tree[1].index == 9000
+    assert tree[1].title == "Over 9000"
+    assert tree[1].parent_id is None
+
+
+def test_pickle(json_tree):
+    tree = ColumnarTree.from_tree(json_tree)
+    tree.children_rows(0)
+    loaded = pickle.loads(pickle.dumps(tree))
+    assert loaded._children is None
+    assert list(loaded) == list(tree)
+    assert loaded.titles.intern("Main Folder") == tree.titles.intern("Main Folder")
+
+
+def test_from_tree_cycle(json_tree):
+    json_tree.children[3].children.append(json_tree)
+    with pytest.raises(ValueError):
+        ColumnarTree.from_tree(json_tree)
+
+
+def test_children_views(json_tree):
+    tree = ColumnarTree.from_tree(json_tree)
+    assert tree.root.children is tree.root.children
+
+
+def test_append_after_children_rows(json_tree):
+    tree = ColumnarTree.from_tree(json_tree)
+    tree[4].children
+    row = tree.append(JSONBookmark(id=7, type="url", date_added=0, url="url"), 4)
+    assert tree.children_rows(4) == [5, row]
+    assert [view.id for view in tree[4].children] == [6, 7]
+
+
+@pytest.mark.parametrize(
+    "source_file, source_format, target_format",
+    [
+        ("bookmarks_chrome.json", "json", "html"),
+        ("bookmarks_firefox.json", "json", "html"),
+        ("bookmarks_firefox.json", "json", "json"),
+        ("bookmarks_chrome.html", "html", "json"),
+    ],
+)
+def test_columnar_conversion(
+    source_file, source_format, target_format, source_bookmark_files
+):
+    source_file = source_bookmark_files[source_file]
+    results = []
+    for columnar in (False, True):
+        bookmarks = BookmarksConverter(source_file, columnar=columnar)
+        bookmarks.parse(source_format)
+        bookmarks.convert(target_format)
+        if source_format == "html":
+            # the root and "Other Bookmarks" dates are generated when parsing.
+            bookmarks.bookmarks["date_added"] = 0
+            bookmarks.bookmarks["children"][1]["date_added"] = 0
+        results.append(bookmarks.bookmarks)
+    assert results[0] == results[1]
+    assert isinstance(bookmarks._tree, NodeView)
+
+
+def test_columnar_conversion_to_db(source_bookmark_files):
+    source_file = source_bookmark_files["bookmarks_firefox.json"]
+    results = []
+    for columnar in (False, True):
+        bookmarks = BookmarksConverter(source_file, columnar=columnar)
+        bookmarks.parse("json")
+        bookmarks.convert("db")
+        results.append(sorted(bookmarks.bookmarks, key=lambda node: node.id))
+    assert results[0] == results[1]
+
+
+def test_columnar_parse_db(result_bookmark_files):
+    source_file = result_bookmark_files["from_firefox_json.db"]
+    results = []
+    for columnar in (False, True):
+        bookmarks = BookmarksConverter(source_file, columnar=columnar)
+        bookmarks.parse("db")
+        bookmarks.convert("html")
+        results.append(bookmarks.bookmarks)
+    assert results[0] == results[1]
+    assert isinstance(bookmarks._tree, NodeView)
@@ -0,0 +1,120 @@
+import bz2
+import gzip
+import io
+import lzma
+from pathlib import Path
+
+import pytest
+from bookmarks_converter import BookmarksConverter
+from bookmarks_converter.cli import collect_files
+from bookmarks_converter.compression import (
+    detect_compression,
+    open_file,
+    strip_compression,
+)
+from bookmarks_converter.formats import detect_format
+from bookmarks_converter.streaming import iter_tree_events
+
+MODULES = {".gz": gzip, ".bz2": bz2, ".xz": lzma}
+
+
+def compress(source, directory, suffix, name=None):
+    """Write the compressed copy of a file in directory."""
+    source = Path(source)
+    path = directory.joinpath((name or source.name) + suffix)
+    path.write_bytes(MODULES[suffix].compress(source.read_bytes()))
+    return path
+
+
+def fields(root):
+    return [
+        (event, node.id, node.index, node.title, getattr(node, "url", None))
+        for event, node in iter_tree_events(root)
+    ]
+
+
+def converted(filepath, format_, **options):
+    """Return the text of the json output of a file, and its path."""
+    bookmarks = BookmarksConverter(filepath, **options)
+    bookmarks.parse(format_)
+    bookmarks.convert("json")
+    bookmarks.save()
+    output_file = bookmarks._output_file("json")
+    with open_file(output_file, "rt", bookmarks.compression) as file_:
+        return file_.read(), output_file
+
+
+@pytest.mark.parametrize("suffix", [".gz", ".bz2", ".xz"])
+@pytest.mark.parametrize("streaming", [False, True])
+def test_compressed_path(source_bookmark_files, tmp_path, suffix, streaming):
+    source = source_bookmark_files["bookmarks_chrome.json"]
+    expected, _ = converted(source, "json", streaming=streaming)
+    filepath = compress(source, tmp_path, suffix)
+    assert detect_format(filepath) == "json"
+    output, output_file = converted(filepath, "json", streaming=streaming)
+    assert output == expected
+    # the output is compressed as the source, unless told otherwise.
+    assert output_file.name == "output_bookmarks_chrome.json" + suffix
+    assert detect_compression(output_file.read_bytes()) is not None
+    assert not tmp_path.joinpath("temp_bookmarks_chrome.json").exists()
+    output, output_file = converted(filepath, "json", compression=None)
+    assert output == expected and output_file.suffix == ".json"
+
+
+def test_compressed_html(source_bookmark_files, tmp_path):
+    source = source_bookmark_files["bookmarks_firefox.html"]
+    bookmarks = BookmarksConverter(source)
+    bookmarks.parse("html")
+    filepath = compress(source, tmp_path, ".xz")
+    compressed = BookmarksConverter(filepath)
+    compressed.parse("html")
+    # the date of the root folder is the time it was parsed at.
+    assert fields(compressed._tree) == fields(bookmarks._tree)
+
+
+def test_file_objects(source_bookmark_files, tmp_path):
+    source = source_bookmark_files["bookmarks_firefox.json"]
+    expected, _ = converted(source, "json")
+    filepath = compress(source, tmp_path, ".gz", "bookmarks")
+    # the compression of a file object (or a file without suffix) is
+    # detected out of its first bytes.
+    assert detect_format(filepath) == "json"
+    with open(filepath, "rb") as source_file:
+        bookmarks = BookmarksConverter(source_file, compression="bz2", compresslevel=1)
+        bookmarks.parse("json")
+        bookmarks.convert("json")
+        output = io.BytesIO()
+        bookmarks.save(output=output)
+        assert not source_file.closed and not output.closed
+    assert bookmarks.source_compression == "gzip"
+    assert bz2.decompress(output.getvalue()).decode("utf-8") == expected
+    # a path given to save is compressed after its suffix.
+    bookmarks.save(output=tmp_path.joinpath("bookmarks.json"))
+    assert tmp_path.joinpath("bookmarks.json").read_text("utf-8") == expected
+
+    bookmarks = BookmarksConverter(io.BytesIO(Path(source).read_bytes()))
+    assert bookmarks.filepath == Path("bookmarks")
+    bookmarks.parse("json")
+    bookmarks.convert(["json", "html"])
+    with pytest.raises(ValueError):
+        bookmarks.save(output=io.BytesIO())
+
+
+def test_compressed_db(source_bookmark_files, result_bookmark_files, tmp_path):
+    filepath = compress(result_bookmark_files["from_chrome_html.db"], tmp_path, ".gz")
+    assert detect_format(filepath) == "db"
+    with pytest.raises(TypeError):
+        BookmarksConverter(filepath).parse("db")
+    bookmarks = BookmarksConverter(source_bookmark_files["bookmarks_chrome.json"])
+    bookmarks.parse("json")
+    bookmarks.convert("db")
+    with pytest.raises(TypeError):
+        bookmarks.save(output=tmp_path.joinpath("bookmarks.db.gz"))
+
+
+def test_collect_compressed_files(tmp_path):
+    for name in ["bookmarks.json.gz", "bookmarks.html.xz", "notes.txt.gz"]:
+        tmp_path.joinpath(name).write_bytes(b"")
+    names = [path.name for path in collect_files([str(tmp_path)])]
+    assert names == ["bookmarks.html.xz", "bookmarks.json.gz"]
+    assert strip_compression("a/bookmarks.json.gz") == Path("a/bookmarks.json")
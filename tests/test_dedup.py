@@ -0,0 +1,189 @@
+import pytest
+from bookmarks_converter import BookmarksConverter
+from bookmarks_converter.columnar import ColumnarTree
+from bookmarks_converter.dedup import DuplicateIndex, normalize_url
+from bookmarks_converter.models import JSONBookmark
+
+
+@pytest.mark.parametrize(
+    "url, normalized",
+    [
+        ("https://www.Example.com:443/path/?b=2&a=1#top", "example.com/path?a=1&b=2"),
+        ("http://example.com/path?a=1&b=2", "example.com/path?a=1&b=2"),
+        ("HTTP://WWW.EXAMPLE.COM", "example.com"),
+        ("http://example.com:8080/", "example.com:8080"),
+        ("https://example.com/?&", "example.com"),
+        ("  https://example.com/a/  ", "example.com/a"),
+        ("https://example.com/A?q", "example.com/A?q"),
+        ("ftp://example.com/file/", "ftp://example.com/file/"),
+        ("place:sort=8&maxResults=10", "place:sort=8&maxResults=10"),
+        ("javascript:void(0)", "javascript:void(0)"),
+    ],
+)
+def test_normalize_url(url, normalized):
+    assert normalize_url(url) == normalized
+
+
+def test_normalize_url_cache():
+    normalize_url.cache_clear()
+    for _ in range(3):
+        normalize_url("https://example.com/")
+    info = normalize_url.cache_info()
+    assert (info.hits, info.misses) == (2, 1)
+    assert info.maxsize is not None
+
+
+def create_tree(urls):
+    """Tree with the urls split in two folders, urls being (url, date_added)."""
+    root = JSONBookmark(
+        type="folder", id=1, index=0, title="root", date_added=0, children=[]
+    )
+    folders = []
+    for i in range(2):
+        folder = JSONBookmark(
+            type="folder",
+            id=2 + i,
+            index=i,
+            title=f"folder {i}",
+            date_added=0,
+            children=[],
+        )
+        root.children.append(folder)
+        folders.append(folder)
+    for i, (url, date_added) in enumerate(urls):
+        folder = folders[i % 2]
+        folder.children.append(
+            JSONBookmark(
+                type="url",
+                id=10 + i,
+                index=len(folder.children),
+                title=f"url {i}",
+                date_added=date_added,
+                url=url,
+            )
+        )
+    return root
+
+
+URLS = [
+    ("https://example.com/", 30),
+    ("https://other.com/", 10),
+    ("http://www.example.com", 10),
+    ("https://other.com/#about", 20),
+    ("https://example.com/?", 20),
+    ("https://unique.com/", 0),
+]
+
+
+def test_duplicate_index():
+    index = DuplicateIndex(create_tree(URLS))
+    assert index.urls == {
+        "example.com": [10, 12, 14],
+        "other.com": [11, 13],
+        "unique.com": [15],
+    }
+    assert index.duplicates() == {"example.com": [10, 12, 14], "other.com": [11, 13]}
+
+
+@pytest.mark.parametrize(
+    "keep, report",
+    [
+        ("first", [("example.com", 10, [12, 14]), ("other.com", 11, [13])]),
+        ("last", [("example.com", 14, [10, 12]), ("other.com", 13, [11])]),
+        ("oldest", [("example.com", 12, [10, 14]), ("other.com", 11, [13])]),
+        ("newest", [("example.com", 10, [12, 14]), ("other.com", 13, [11])]),
+        (
+            lambda nodes: nodes[1],
+            [("example.com", 12, [10, 14]), ("other.com", 13, [11])],
+        ),
+    ],
+)
+def test_report(keep, report):
+    assert DuplicateIndex(create_tree(URLS)).report(keep) == report
+
+
+def test_report_errors():
+    index = DuplicateIndex(create_tree(URLS))
+    with pytest.raises(ValueError, match="Unknown keep policy"):
+        index.report("random")
+    with pytest.raises(ValueError, match="a node of the group"):
+        index.report(lambda nodes: None)
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_remove(columnar):
+    root = create_tree(URLS)
+    if columnar:
+        root = ColumnarTree.from_tree(root).root
+    index = DuplicateIndex(root)
+    removed = index.remove("oldest")
+    assert [node.id for node in removed] == [10, 14, 13]
+    assert index.duplicates() == {}
+    folders = root.children
+    assert [(url.id, url.index) for url in folders[0].children] == [(12, 0)]
+    assert [(url.id, url.index) for url in folders[1].children] == [(11, 0), (15, 1)]
+    assert DuplicateIndex(root).duplicates() == {}
+    if columnar:
+        # the detached rows stay out of the tree once pickled.
+        tree = ColumnarTree.from_tree(root)
+        assert len(tree) == 6
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_remove_same_ids(columnar, folder, url):
+    # the ids of the urls of merged files can collide.
+    root = folder(
+        1,
+        "root",
+        folder(2, "a", url(3, "https://example.com/"), url(4, "https://other.com/")),
+        folder(2, "b", url(3, "https://other.com/"), url(4, "https://example.com/")),
+    )
+    if columnar:
+        root = ColumnarTree.from_tree(root).root
+    index = DuplicateIndex(root)
+    assert index.report() == [
+        ("example.com", 3, [4]),
+        ("other.com", 4, [3]),
+    ]
+    removed = index.remove()
+    assert [node.url for node in removed] == [
+        "https://other.com/",
+        "https://example.com/",
+    ]
+    assert [
+        [(node.id, node.url) for node in child.children] for child in root.children
+    ] == [[(3, "https://example.com/"), (4, "https://other.com/")], []]
+    assert DuplicateIndex(root).duplicates() == {}
+
+
+@pytest.mark.parametrize(
+    "source_file, source_format, options",
+    [
+        ("bookmarks_firefox.json", "json", {}),
+        ("bookmarks_chrome.html", "html", {}),
+        ("bookmarks_chrome.json", "json", {"streaming": True}),
+        ("bookmarks_firefox.json", "json", {"columnar": True}),
+    ],
+)
+def test_converter_remove_duplicates(
+    source_file, source_format, options, source_bookmark_files
+):
+    bookmarks = BookmarksConverter(source_bookmark_files[source_file], **options)
+    bookmarks.parse(source_format)
+    first = bookmarks._tree.children[0] if bookmarks._tree else None
+    report = bookmarks.find_duplicates()
+    removed = bookmarks.remove_duplicates()
+    assert sorted(node.id for node in removed) == sorted(
+        id_ for _, _, ids in report for id_ in ids
+    )
+    assert bookmarks.find_duplicates() == []
+    bookmarks.convert("json")
+    assert bookmarks.bookmarks["children"]
+    if first is not None:
+        assert bookmarks._tree.children[0] is first
+
+
+def test_converter_duplicates_not_parsed():
+    bookmarks = BookmarksConverter("bookmarks.json")
+    with pytest.raises(RuntimeError):
+        bookmarks.find_duplicates()
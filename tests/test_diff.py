@@ -0,0 +1,161 @@
+import json
+import shutil
+
+import pytest
+from bookmarks_converter.diff import apply_changes, diff_trees
+
+
+@pytest.fixture
+def old_tree(folder, url):
+    def _function():
+        return folder(
+            1,
+            "root",
+            folder(
+                2,
+                "Bookmarks bar",
+                url(3, "https://a.com/", "a"),
+                url(4, "https://b.com/", "b"),
+                folder(5, "News", url(6, "https://news.com/", "news")),
+            ),
+            folder(7, "Other Bookmarks", url(8, "https://c.com/", "c")),
+        )
+
+    return _function
+
+
+def shape(node):
+    if node.type == "url":
+        return (node.title, node.url)
+    return (node.title, [shape(child) for child in node.children])
+
+
+def test_diff_same_tree(old_tree):
+    assert diff_trees(old_tree(), old_tree()) == []
+
+
+def test_diff_changes(old_tree, folder, url):
+    new = folder(
+        1,
+        "root",
+        folder(
+            2,
+            "Toolbar",
+            folder(5, "News", url(6, "https://news.com/", "news")),
+            url(4, "https://b.com/", "b"),
+            folder(20, "New", url(21, "https://new.com/", "new")),
+        ),
+        folder(7, "Other Bookmarks", url(3, "https://a.com/?page=2", "a")),
+    )
+    assert diff_trees(old_tree(), new) == [
+        {"op": "rename", "id": 2, "title": "Toolbar"},
+        {
+            "op": "add",
+            "id": 9,
+            "parent_id": 2,
+            "index": 2,
+            "type": "folder",
+            "title": "New",
+            "date_added": 0,
+        },
+        {
+            "op": "add",
+            "id": 10,
+            "parent_id": 9,
+            "index": 0,
+            "type": "url",
+            "title": "new",
+            "date_added": 0,
+            "url": "https://new.com/",
+            "icon": None,
+            "icon_uri": None,
+            "tags": None,
+        },
+        {"op": "move", "id": 3, "parent_id": 7, "index": 0},
+        {"op": "update", "id": 3, "fields": {"url": "https://a.com/?page=2"}},
+        {"op": "reorder", "id": 2, "children": [5, 4]},
+        {"op": "remove", "id": 8},
+    ]
+
+
+def test_diff_generated_ids(old_tree, folder, url):
+    # the ids of the html files depend on the order the nodes are read.
+    new = folder(
+        100,
+        "root",
+        folder(
+            101,
+            "Bookmarks bar",
+            url(102, "https://b.com/", "b"),
+            url(103, "https://a.com/", "a"),
+            folder(104, "News", url(105, "https://news.com/", "news")),
+        ),
+        folder(106, "Other Bookmarks", url(107, "https://c.com/", "c")),
+    )
+    assert diff_trees(old_tree(), new) == [
+        {"op": "reorder", "id": 2, "children": [4, 3, 5]}
+    ]
+
+
+def test_diff_formats(source_bookmark_files, result_bookmark_files, parse):
+    db = parse(result_bookmark_files["from_chrome_json.db"], "db")
+    assert db.diff(parse(source_bookmark_files["bookmarks_chrome.json"], "json")) == []
+    changes = db.diff(parse(source_bookmark_files["bookmarks_chrome.html"], "html"))
+    # the html file holds the icons missing from the json file, and not the
+    # empty "Mobile bookmarks" folder.
+    assert changes[-1] == {"op": "remove", "id": 4}
+    assert {change["op"] for change in changes[:-1]} == {"update"}
+    assert all(list(change["fields"]) == ["icon"] for change in changes[:-1])
+
+
+def test_apply_changes(
+    source_bookmark_files, result_bookmark_files, tmp_path, parse, folder, url
+):
+    filepath = tmp_path.joinpath("bookmarks.db")
+    shutil.copy(result_bookmark_files["from_chrome_json.db"], filepath)
+    old = parse(filepath, "db")
+    new = parse(source_bookmark_files["bookmarks_chrome.json"], "json")._tree
+    bar, other = new.children[:2]
+    other.children.insert(1, bar.children.pop(0))
+    bar.children.reverse()
+    bar.children[0].title = "Renamed"
+    news = [child for child in bar.children if child.type == "folder"][0]
+    news.children.pop()
+    bar.children.insert(2, folder(1000, "New", url(1001, "https://new.com/")))
+    other.children.pop()
+
+    changes = diff_trees(old._tree, new)
+    assert {change["op"] for change in changes} == {
+        "add",
+        "move",
+        "rename",
+        "reorder",
+        "remove",
+    }
+    apply_changes(filepath, json.loads(json.dumps(changes)))
+    updated = parse(filepath, "db")._tree
+    assert shape(updated) == shape(new)
+    assert diff_trees(updated, new) == []
+    stack = [updated]
+    while stack:
+        node = stack.pop()
+        for index, child in enumerate(node.children):
+            assert (child.parent_id, child.index) == (node.id, index)
+            if child.type == "folder":
+                stack.append(child)
+
+
+def test_apply_changes_errors(result_bookmark_files, tmp_path, parse):
+    filepath = tmp_path.joinpath("bookmarks.db")
+    shutil.copy(result_bookmark_files["from_chrome_json.db"], filepath)
+    before = shape(parse(filepath, "db")._tree)
+    changes = [
+        {"op": "rename", "id": 2, "title": "Renamed"},
+        {"op": "remove", "id": 12345},
+    ]
+    with pytest.raises(ValueError, match="12345"):
+        apply_changes(filepath, changes)
+    # nothing is written when a change can't be applied.
+    assert shape(parse(filepath, "db")._tree) == before
+    with pytest.raises(ValueError, match="Unknown change"):
+        apply_changes(filepath, [{"op": "copy", "id": 2}])
@@ -0,0 +1,125 @@
+import pytest
+from bookmarks_converter.filters import ParseFilter
+from bookmarks_converter.streaming import build_tree, iter_tree_events
+
+
+@pytest.fixture
+def tree(folder, url):
+    def icon_url(id_, url_, date_added):
+        return url(id_, url_, date_added=date_added, icon="data")
+
+    return folder(
+        1,
+        "root",
+        folder(
+            2,
+            "Bookmarks bar",
+            icon_url(3, "https://a.com/", 10),
+            folder(4, "Work", icon_url(5, "https://b.com/", 20), folder(6, "Empty")),
+            folder(7, "Workshop", icon_url(8, "https://a.com/shop", 30)),
+        ),
+        folder(9, "Other Bookmarks", icon_url(10, "https://c.com/", 40)),
+    )
+
+
+def shape(node):
+    if node.type == "url":
+        return node.id
+    return (node.id, [shape(child) for child in node.children])
+
+
+def filter_tree(filter_, root):
+    events = list(filter_.filter_events(iter_tree_events(root)))
+    # the tree is built again out of the events.
+    for event, node in events:
+        if node.type == "folder":
+            node.children = []
+    return build_tree(events)
+
+
+@pytest.mark.parametrize(
+    "filter_, expected",
+    [
+        (ParseFilter(), (1, [(2, [3, (4, [5, (6, [])]), (7, [8])]), (9, [10])])),
+        (ParseFilter(folders="Bookmarks bar/Work"), (1, [(2, [(4, [5, (6, [])])])])),
+        (
+            ParseFilter(folders=["/Bookmarks bar/Work*/", "Other Bookmarks"]),
+            (1, [(2, [(4, [5, (6, [])]), (7, [8])]), (9, [10])]),
+        ),
+        (ParseFilter(folders="*/Missing"), (1, [])),
+        (ParseFilter(urls="https://a.com/*"), (1, [(2, [3, (7, [8])])])),
+        (
+            ParseFilter(added_after=20, added_before=40),
+            (1, [(2, [(4, [5]), (7, [8])])]),
+        ),
+        (
+            ParseFilter(folders="Bookmarks bar", added_after=20),
+            (1, [(2, [(4, [5]), (7, [8])])]),
+        ),
+    ],
+)
+def test_filter_events(filter_, expected, tree):
+    assert shape(filter_tree(filter_, tree)) == expected
+
+
+def test_filter_icons(tree):
+    assert tree.children[0].children[0].icon == "data"
+    root = filter_tree(ParseFilter(icons=False), tree)
+    assert [child.icon for child in root.children[0].children[:1]] == [None]
+
+
+def fields(root):
+    return [
+        (event, node.title, node.url if node.type == "url" else None, node.index)
+        + ((node.icon, node.icon_uri) if node.type == "url" else ())
+        for event, node in iter_tree_events(root)
+    ]
+
+
+def test_parse_filtered(source_bookmark_files, result_bookmark_files, parse):
+    filter_ = ParseFilter(folders=["Bookmarks bar/*", "Other Bookmarks"], icons=False)
+    files = [
+        (source_bookmark_files["bookmarks_chrome.json"], "json"),
+        (source_bookmark_files["bookmarks_chrome.html"], "html"),
+        (result_bookmark_files["from_chrome_json.db"], "db"),
+    ]
+    trees = [
+        parse(filepath, format_, filter_, columnar=columnar)._tree
+        for filepath, format_ in files
+        for columnar in (False, True)
+    ]
+    root = trees[0]
+    titles = [child.title for child in root.children]
+    assert titles == ["Bookmarks bar", "Other Bookmarks"]
+    # only the folders of the "Bookmarks bar" are kept.
+    assert {child.type for child in root.children[0].children} == {"folder"}
+    for tree in trees:
+        # the html file holds the icons and dates missing from the json file.
+        assert fields(tree) == fields(root)
+
+    full = parse(files[0][0], "json", None)._tree
+    assert sum(1 for _ in iter_tree_events(root)) < sum(
+        1 for _ in iter_tree_events(full)
+    )
+
+
+def test_parse_filtered_urls(source_bookmark_files, result_bookmark_files, parse):
+    filter_ = ParseFilter(urls="*mozilla.org*")
+    json_ = parse(source_bookmark_files["bookmarks_chrome.json"], "json", filter_)
+    db = parse(result_bookmark_files["from_chrome_json.db"], "db", filter_)
+    assert fields(db._tree) == fields(json_._tree)
+    urls = [node for _, node in iter_tree_events(db._tree) if node.type == "url"]
+    assert urls and all("mozilla.org" in node.url for node in urls)
+
+
+def test_parse_filtered_streaming(source_bookmark_files, parse):
+    filepath = source_bookmark_files["bookmarks_chrome.json"]
+    filter_ = ParseFilter(folders="Bookmarks bar")
+    bookmarks = parse(filepath, "json", filter_)
+    bookmarks.convert("html")
+    streamed = parse(filepath, "json", filter_, streaming=True)
+    streamed.convert("html")
+    assert "".join(streamed.bookmarks) == bookmarks.bookmarks
+    streamed = parse(filepath, "json", filter_, streaming=True)
+    streamed.convert("db")
+    assert fields(streamed._tree) == fields(bookmarks._tree)
@@ -0,0 +1,184 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from bookmarks_converter import BookmarksConverter, formats
+from bookmarks_converter.filters import ParseFilter
+from bookmarks_converter.formats import (
+    FormatPlugin,
+    available_formats,
+    detect_format,
+    get_format,
+    register_format,
+)
+
+# a plain text format, a "url<TAB>title" line per url of the root folder.
+TEXT_MODULE = """
+from bookmarks_converter.models import JSONBookmark
+from bookmarks_converter.streaming import END, FOLDER, URL, build_tree
+
+
+class Reader:
+    calls = []
+
+    @classmethod
+    def events(cls, converter):
+        cls.calls.append("events")
+        root = JSONBookmark(type="folder", id=1, title="root", date_added=0)
+        yield FOLDER, root
+        with open(converter.filepath, encoding="utf-8") as file_:
+            for index, line in enumerate(file_):
+                url, title = line.rstrip("\\n").split("\\t")
+                node = JSONBookmark(
+                    type="url", id=index + 2, index=index, title=title, url=url,
+                    date_added=0,
+                )
+                yield URL, node
+        yield END, root
+
+    @classmethod
+    def parse(cls, converter):
+        cls.calls.append("parse")
+        return build_tree(cls.events(converter))
+
+
+class Writer:
+    def start(self):
+        return None
+
+    def write(self, event, node):
+        if event == URL:
+            return f"{node.url}\\t{node.title}\\n"
+        return None
+
+    def close(self):
+        return None
+
+    @staticmethod
+    def join(chunks):
+        return "".join(chunks)
+"""
+
+TEXT = "https://a.com/\tA\nhttps://b.org/\tB\n"
+
+
+@pytest.fixture
+def text_format(tmp_path, monkeypatch):
+    """Register the text format, its module being importable but not
+    imported."""
+    (tmp_path / "bookmarks_text.py").write_text(TEXT_MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "bookmarks_text", raising=False)
+    monkeypatch.setattr(formats, "_registry", dict(formats._registry))
+
+    def register(**capabilities):
+        plugin = FormatPlugin(
+            "txt",
+            reader="bookmarks_text:Reader",
+            writer="bookmarks_text:Writer",
+            **capabilities,
+        )
+        register_format(plugin)
+        return plugin
+
+    return register
+
+
+def test_builtin_formats():
+    assert available_formats()[:3] == ("db", "html", "json")
+    assert get_format("HTML").streaming and get_format("html").incremental
+    assert get_format("db").random_access and not get_format("db").streaming
+    assert get_format("missing") is None
+    with pytest.raises(ValueError):
+        register_format(FormatPlugin("json"))
+    with pytest.raises(TypeError):
+        FormatPlugin("write_only").reader
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 7), reason="lazy module attributes need python 3.7"
+)
+def test_builtin_readers_loaded_lazily(source_bookmark_files, tmp_path):
+    # only the backend of the formats converted is imported.
+    code = (
+        "import sys\n"
+        "from bookmarks_converter import BookmarksConverter\n"
+        f"bookmarks = BookmarksConverter({str(tmp_path / 'bookmarks.json')!r})\n"
+        "bookmarks.parse('json')\n"
+        "bookmarks.convert('html')\n"
+        "bookmarks.save()\n"
+        "assert 'bs4' not in sys.modules and 'sqlalchemy' not in sys.modules\n"
+        "bookmarks = BookmarksConverter(bookmarks.output_filepath.with_suffix('.html'))\n"
+        "bookmarks.parse('html')\n"
+        "bookmarks.convert('json')\n"
+        "assert 'bs4' in sys.modules and 'sqlalchemy' not in sys.modules\n"
+    )
+    source = Path(source_bookmark_files["bookmarks_chrome.json"])
+    (tmp_path / "bookmarks.json").write_bytes(source.read_bytes())
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_plugin_format(text_format, tmp_path, streaming):
+    text_format(streaming=streaming)
+    filepath = tmp_path / "bookmarks.txt"
+    filepath.write_text(TEXT)
+    assert detect_format(filepath) == "txt"
+    # the plugin is imported once its format is used.
+    assert "bookmarks_text" not in sys.modules
+    bookmarks = BookmarksConverter(filepath, streaming=True)
+    bookmarks.parse("txt")
+    bookmarks.convert("json")
+    bookmarks.save()
+    reader = sys.modules["bookmarks_text"].Reader
+    # a streaming source is converted without building its tree.
+    assert reader.calls == (["events"] if streaming else ["parse", "events"])
+    json_file = bookmarks.output_filepath.with_suffix(".json")
+
+    bookmarks = BookmarksConverter(json_file)
+    bookmarks.parse("json")
+    bookmarks.convert("txt")
+    assert bookmarks.bookmarks == TEXT
+    bookmarks.convert(["txt", "html"])
+    assert bookmarks.bookmarks["txt"] == TEXT
+    bookmarks.save()
+    assert bookmarks.output_filepath.with_suffix(".txt").read_text() == TEXT
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_plugin_format_filtered(text_format, tmp_path, streaming):
+    text_format(streaming=streaming)
+    filepath = tmp_path / "bookmarks.txt"
+    filepath.write_text(TEXT)
+    bookmarks = BookmarksConverter(filepath)
+    bookmarks.parse("txt", ParseFilter(urls="*.org/"))
+    bookmarks.convert("txt")
+    assert bookmarks.bookmarks == "https://b.org/\tB\n"
+    assert bookmarks._tree.children[0].index == 0
+
+
+class EntryPoint:
+    name = "txt"
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+        self.loaded = False
+
+    def load(self):
+        self.loaded = True
+        return self.plugin
+
+
+def test_entry_points(text_format, monkeypatch):
+    entry_point = EntryPoint(FormatPlugin("txt", writer="bookmarks_text:Writer"))
+    monkeypatch.setattr(formats, "_entry_points", {"txt": entry_point})
+    assert "txt" in available_formats()
+    # the suffix of a plugin format is matched without loading it.
+    assert detect_format("bookmarks.txt") == "txt"
+    assert not entry_point.loaded
+    plugin = get_format("txt")
+    assert entry_point.loaded and plugin is entry_point.plugin
+    assert get_format("txt") is plugin
+    with pytest.raises(TypeError):
+        BookmarksConverter("bookmarks.txt").parse("missing")
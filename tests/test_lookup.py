@@ -0,0 +1,82 @@
+import pytest
+from bookmarks_converter.columnar import ColumnarTree
+from bookmarks_converter.lookup import TreeIndex
+
+
+@pytest.fixture
+def create_tree(folder, url):
+    def _function():
+        return folder(
+            1,
+            "root",
+            folder(
+                2,
+                "Bookmarks bar",
+                folder(3, "Work", folder(4, "Infra", url(5, title="Grafana"))),
+                url(6, title="Work"),
+            ),
+            folder(7, "Other Bookmarks", url(8, title="News")),
+        )
+
+    return _function
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_tree_index(columnar, create_tree):
+    root = create_tree()
+    if columnar:
+        root = ColumnarTree.from_tree(root).root
+    index = TreeIndex(root)
+    assert len(index) == 8
+    assert 5 in index and 9 not in index
+    grafana = index.get(5)
+    assert grafana.title == "Grafana"
+    assert index.get(9) is None
+    assert index.parent(grafana).id == 4
+    assert index.parent(index.get(2)) is root
+    assert index.parent(root) is None
+    assert index.path(grafana) == "Bookmarks bar/Work/Infra/Grafana"
+    assert index.path(index.get(3)) == "Bookmarks bar/Work"
+    assert index.path(root) == ""
+    assert index.find("Bookmarks bar/Work/Infra").id == 4
+    assert index.find("/Other Bookmarks/News/").id == 8
+    # the first node of the tree with the path.
+    assert index.find("Bookmarks bar/Work").id == 3
+    assert index.find("Bookmarks bar/Missing") is None
+
+
+def test_tree_index_changes(create_tree):
+    root = create_tree()
+    index = TreeIndex(root)
+    bar, other = root.children
+    work = bar.children[0]
+    assert index.path(work.children[0]) == "Bookmarks bar/Work/Infra"
+
+    work.title = "Jobs"
+    index.update(work)
+    assert index.path(work.children[0]) == "Bookmarks bar/Jobs/Infra"
+    assert index.find("Bookmarks bar/Jobs/Infra/Grafana").id == 5
+
+    bar.children.remove(work)
+    index.remove(work)
+    assert index.get(3) is index.get(5) is None
+    assert index.find("Bookmarks bar/Jobs") is None
+
+    other.children.append(work)
+    index.add(work, other)
+    assert index.parent(work) is other
+    assert index.path(index.get(5)) == "Other Bookmarks/Jobs/Infra/Grafana"
+
+
+def test_converter_tree_index(source_bookmark_files, parse):
+    bookmarks = parse(source_bookmark_files["bookmarks_chrome.json"], "json")
+    index = bookmarks.tree_index()
+    assert bookmarks.tree_index() is index
+    bar = index.find("Bookmarks bar")
+    child = bar.children[0]
+    assert index.get(child.id) is child
+    assert index.parent(child) is bar
+    assert index.path(child) == f"Bookmarks bar/{child.title}"
+
+    bookmarks.parse("json")
+    assert bookmarks.tree_index() is not index
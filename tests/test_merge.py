@@ -0,0 +1,124 @@
+import pytest
+from bookmarks_converter import BookmarksConverter
+from bookmarks_converter.dedup import DuplicateIndex
+from bookmarks_converter.merge import merge_trees
+from bookmarks_converter.streaming import FOLDER, iter_tree_events
+
+
+def check_tree(root):
+    """Check the ids are unique and the positions of the nodes consistent."""
+    ids = set()
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        assert node.id not in ids
+        ids.add(node.id)
+        for index, child in enumerate(node.children):
+            assert (child.parent_id, child.index) == (node.id, index)
+            if child.type == "folder":
+                stack.append(child)
+            else:
+                ids.add(child.id)
+    return ids
+
+
+def titles(root):
+    return [(event, node.title) for event, node in iter_tree_events(root) if node.title]
+
+
+def test_merge_trees(folder, url):
+    chrome = folder(
+        1,
+        "root",
+        folder(2, "Bookmarks bar", url(3, "https://example.com/"), folder(4, "News")),
+        folder(5, "Other Bookmarks", url(6, "https://other.com/")),
+    )
+    firefox = folder(
+        1,
+        "root",
+        folder(
+            2,
+            "toolbar",
+            url(3, "http://www.example.com", "example"),
+            folder(4, "News", url(5, "https://news.com/")),
+        ),
+        folder(6, "menu", folder(7, "Bookmarks bar"), url(8, "https://other.com")),
+    )
+    tree = merge_trees([chrome, firefox])
+    root = tree.root
+    assert titles(root) == [
+        (FOLDER, "root"),
+        (FOLDER, "Bookmarks bar"),
+        ("url", "page"),
+        (FOLDER, "News"),
+        ("url", "page"),
+        ("end", "News"),
+        ("end", "Bookmarks bar"),
+        (FOLDER, "Other Bookmarks"),
+        ("url", "page"),
+        ("end", "Other Bookmarks"),
+        (FOLDER, "menu"),
+        # only the special folders at the top of the tree are merged.
+        (FOLDER, "Bookmarks bar"),
+        ("end", "Bookmarks bar"),
+        ("end", "menu"),
+        ("end", "root"),
+    ]
+    assert check_tree(root) == set(range(1, len(tree) + 1))
+    assert DuplicateIndex(root).duplicates() == {}
+
+    tree = merge_trees([chrome, firefox], dedup=False)
+    assert len(tree) == len(merge_trees([chrome, firefox])) + 2
+    check_tree(tree.root)
+
+
+def test_merge_trees_empty():
+    with pytest.raises(ValueError):
+        merge_trees([])
+
+
+SOURCES = [
+    ("bookmarks_chrome.json", "json"),
+    ("bookmarks_firefox.json", "json"),
+    ("bookmarks_firefox.html", "html"),
+    ("from_chrome_html.db", "db"),
+]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_converter_merge(workers, source_bookmark_files, result_bookmark_files, parse):
+    files = dict(source_bookmark_files, **result_bookmark_files)
+    sources = [(files[name], format_) for name, format_ in SOURCES]
+    bookmarks = BookmarksConverter(
+        files["bookmarks_chrome.json"].replace("chrome", "merged"), stats=True
+    )
+    bookmarks.merge(sources, workers=workers)
+    ids = check_tree(bookmarks._tree)
+    assert len(ids) == sum(bookmarks.stats.nodes.values()) + 1
+    assert DuplicateIndex(bookmarks._tree).duplicates() == {}
+    assert [phase.name for phase in bookmarks.stats.phases][-1] == "merge"
+
+    # every url of the sources is in the merged tree.
+    merged = DuplicateIndex(bookmarks._tree).urls
+    for filepath, format_ in sources:
+        source = parse(filepath, format_)
+        assert set(DuplicateIndex(source._tree).urls) <= set(merged)
+
+    bookmarks.convert(["db", "html", "json"])
+    assert len(bookmarks.bookmarks["db"]) == len(ids)
+    assert len(bookmarks.bookmarks["json"]["children"]) == len(bookmarks._tree.children)
+
+
+def test_converter_merge_formats(source_bookmark_files, tmp_path):
+    sources = [
+        source_bookmark_files["bookmarks_chrome.json"],
+        (source_bookmark_files["bookmarks_firefox.json"], "json"),
+    ]
+    bookmarks = BookmarksConverter(tmp_path.joinpath("merged.json"))
+    bookmarks.merge(sources)
+    check_tree(bookmarks._tree)
+
+    unknown = tmp_path.joinpath("bookmarks")
+    unknown.write_text("bookmarks", encoding="utf-8")
+    with pytest.raises(TypeError, match="couldn't be detected"):
+        bookmarks.merge([unknown])
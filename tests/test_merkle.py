@@ -0,0 +1,112 @@
+import pytest
+from bookmarks_converter.columnar import ColumnarTree
+from bookmarks_converter.merkle import HTMLFragments, JSONFragments, MerkleIndex
+
+
+@pytest.fixture
+def create_tree(folder, url):
+    def _function():
+        tree = folder(
+            1,
+            "root",
+            folder(2, "Bar", url(3, "https://a.com/"), folder(4, "News")),
+            folder(5, "Other", url(6, "https://b.com/"), url(7, "https://c.com/")),
+        )
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            for index, child in enumerate(node.children):
+                child.index = index
+                if child.type == "folder":
+                    stack.append(child)
+        return tree
+
+    return _function
+
+
+def test_merkle_digests(create_tree):
+    tree = create_tree()
+    index = MerkleIndex(tree)
+    assert index.hexdigest() == MerkleIndex(create_tree()).hexdigest()
+    assert (
+        index.hexdigest() == MerkleIndex(ColumnarTree.from_tree(tree).root).hexdigest()
+    )
+    bar, other = tree.children
+    before = {node.id: index.digest(node) for node in (tree, bar, other)}
+
+    other.children[1].title = "changed"
+    index.changed(other.children[1])
+    assert set(index._digests) == {2, 3, 4, 6}
+    assert index.digest(bar) == before[2]
+    assert index.digest(other) != before[5]
+    assert index.digest(tree) != before[1]
+    assert index.hexdigest() == MerkleIndex(tree).hexdigest()
+
+    # the same children in another order.
+    other.children.reverse()
+    for position, child in enumerate(other.children):
+        child.index = position
+        index.changed(child)
+    assert index.hexdigest() == MerkleIndex(tree).hexdigest()
+    assert index.digest(other) != before[5]
+
+
+def test_fragments_reuse(create_tree):
+    tree = create_tree()
+    index = MerkleIndex(tree)
+    html = HTMLFragments()
+    json_ = JSONFragments()
+    first_html = html.render(index)
+    first_json = json_.render(index)
+    bar, other = tree.children
+
+    bar.title = "Toolbar"
+    index.changed(bar)
+    assert html.render(index) == first_html.replace(">Bar<", ">Toolbar<")
+    second_json = json_.render(index)
+    assert second_json["children"][0]["title"] == "Toolbar"
+    # the dicts of the folders that didn't change are reused.
+    assert second_json["children"][0]["children"][1] is (
+        first_json["children"][0]["children"][1]
+    )
+    assert second_json["children"][1] is first_json["children"][1]
+    assert first_json["children"][0]["title"] == "Bar"
+    # only the fragments of the last tree are kept.
+    assert len(html._fragments) == len(json_._fragments) == 4
+
+
+def test_converter_tree_hash(source_bookmark_files, result_bookmark_files, parse):
+    json_ = parse(source_bookmark_files["bookmarks_chrome.json"], "json")
+    db = parse(result_bookmark_files["from_chrome_json.db"], "db")
+    columnar = parse(
+        source_bookmark_files["bookmarks_chrome.json"], "json", columnar=True
+    )
+    assert json_.tree_hash() == db.tree_hash() == columnar.tree_hash()
+    html = parse(source_bookmark_files["bookmarks_chrome.html"], "html")
+    assert html.tree_hash() != json_.tree_hash()
+
+    node = json_._tree.children[0].children[0]
+    node.title = "changed"
+    json_.changed(node)
+    assert json_.tree_hash() != db.tree_hash()
+
+
+def test_converter_incremental(source_bookmark_files, parse):
+    filepath = source_bookmark_files["bookmarks_firefox.json"]
+    for format_ in ("html", "json"):
+        bookmarks = parse(filepath, "json", incremental=True)
+        expected = parse(filepath, "json")
+        bookmarks.convert(format_)
+        expected.convert(format_)
+        assert bookmarks.bookmarks == expected.bookmarks
+
+        for tree in (bookmarks._tree, expected._tree):
+            menu = tree.children[0]
+            menu.title = "Edited"
+            menu.children.pop()
+            tree.children[1].children[0].url = "https://example.com/"
+        bookmarks.changed(bookmarks._tree.children[0])
+        bookmarks.changed(bookmarks._tree.children[1].children[0])
+        bookmarks.convert(format_)
+        expected.convert(format_)
+        assert bookmarks.bookmarks == expected.bookmarks
@@ -0,0 +1,110 @@
+import io
+import threading
+import time
+
+import pytest
+from bookmarks_converter import BookmarksConverter
+from bookmarks_converter.pipeline import prefetch, write_behind
+
+
+def stage_threads():
+    names = ("bookmarks-reader", "bookmarks-writer")
+    return [thread for thread in threading.enumerate() if thread.name in names]
+
+
+@pytest.mark.parametrize("batch_size", [1, 3, 1024])
+def test_prefetch(batch_size):
+    assert list(prefetch(range(100), batch_size, queue_size=2)) == list(range(100))
+    assert stage_threads() == []
+
+
+def test_prefetch_bounded():
+    produced = []
+
+    def items():
+        for i in range(1000):
+            produced.append(i)
+            yield i
+
+    iterator = prefetch(items(), batch_size=10, queue_size=2)
+    assert next(iterator) == 0
+    time.sleep(0.1)
+    # the batch being read, the queued batches and the one being filled.
+    assert len(produced) <= 10 * 4
+    iterator.close()
+    assert stage_threads() == []
+
+
+def test_prefetch_error():
+    def items():
+        yield 1
+        raise ValueError("broken file")
+
+    with pytest.raises(ValueError, match="broken file"):
+        list(prefetch(items()))
+    assert stage_threads() == []
+
+
+class BrokenFile(io.StringIO):
+    def write(self, text):
+        raise OSError("disk full")
+
+
+def test_write_behind():
+    file_ = io.StringIO()
+    chunks = [str(i) * i for i in range(100)]
+    write_behind(file_, iter(chunks), buffer_size=50, queue_size=2)
+    assert file_.getvalue() == "".join(chunks)
+    assert stage_threads() == []
+
+
+def test_write_behind_errors():
+    with pytest.raises(OSError, match="disk full"):
+        write_behind(BrokenFile(), ("x" * 10 for _ in range(1000)), buffer_size=10)
+
+    def chunks():
+        yield "x"
+        raise ValueError("broken file")
+
+    file_ = io.StringIO()
+    with pytest.raises(ValueError, match="broken file"):
+        write_behind(file_, chunks())
+    assert stage_threads() == []
+
+
+@pytest.mark.parametrize(
+    "source_file, source_format, target_format",
+    [
+        ("bookmarks_chrome.json", "json", "html"),
+        ("bookmarks_firefox.json", "json", "json"),
+        ("bookmarks_firefox.json", "json", "db"),
+    ],
+)
+def test_pipelined_conversion(
+    source_file, source_format, target_format, source_bookmark_files
+):
+    outputs = []
+    for pipelined in (False, True):
+        bookmarks = BookmarksConverter(
+            source_bookmark_files[source_file], streaming=True, pipelined=pipelined
+        )
+        bookmarks.parse(source_format)
+        bookmarks.convert(target_format)
+        bookmarks.save()
+        output_file = bookmarks.output_filepath.with_suffix(f".{target_format}")
+        if target_format != "db":
+            outputs.append(output_file.read_text(encoding="utf-8"))
+        output_file.unlink()
+    assert bookmarks.streaming
+    assert len(set(outputs)) <= 1
+    assert stage_threads() == []
+
+
+def test_pipelined_missing_file(tmp_path):
+    bookmarks = BookmarksConverter(tmp_path.joinpath("missing.json"), pipelined=True)
+    bookmarks.parse("json")
+    bookmarks.convert("html")
+    with pytest.raises(FileNotFoundError):
+        bookmarks.save()
+    assert not bookmarks.output_filepath.with_suffix(".html").exists()
+    assert stage_threads() == []
@@ -0,0 +1,187 @@
+import pytest
+from bookmarks_converter.columnar import ColumnarTree
+from bookmarks_converter.search import SearchIndex
+
+
+@pytest.fixture
+def create_tree(folder, url):
+    def _function():
+        return folder(
+            1,
+            "root",
+            folder(
+                2,
+                "Python",
+                url(
+                    3,
+                    "https://docs.python.org/3/",
+                    "Python documentation",
+                    date_added=30,
+                ),
+                url(
+                    4,
+                    "https://docs.python.org/3/library/",
+                    "Built-in Functions",
+                    date_added=10,
+                ),
+                url(
+                    5,
+                    "https://peps.python.org/pep-0020/",
+                    "The Zen",
+                    date_added=20,
+                    tags="python,zen",
+                ),
+            ),
+            folder(
+                6,
+                "News",
+                url(7, "https://news.ycombinator.com/", "Hacker News", date_added=40),
+            ),
+        )
+
+    return _function
+
+
+def ids(nodes):
+    return [node.id for node in nodes]
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+@pytest.mark.parametrize(
+    "query, order, results",
+    [
+        # the words of the titles first, in the order of the tree.
+        ("python", "relevance", [2, 3, 4, 5]),
+        ("python", "date_added", [3, 5, 4, 2]),
+        ("PYTHON docs", "relevance", [3, 4]),
+        ("doc*", "relevance", [3, 4]),
+        ("python libr*", "relevance", [4]),
+        ("news", "relevance", [6, 7]),
+        ("ycombinator.com", "relevance", [7]),
+        ("zen", "relevance", [5]),
+        ("pep-0020", "relevance", [5]),
+        ("python missing", "relevance", []),
+        ("", "relevance", []),
+    ],
+)
+def test_search(query, order, results, columnar, create_tree):
+    root = create_tree()
+    if columnar:
+        root = ColumnarTree.from_tree(root).root
+    assert ids(SearchIndex(root).search(query, order)) == results
+
+
+def test_search_limit_and_order(create_tree):
+    index = SearchIndex(create_tree())
+    assert ids(index.search("python", order="date_added", limit=2)) == [3, 5]
+    with pytest.raises(ValueError, match="Unknown order"):
+        index.search("python", order="title")
+
+
+def test_search_index_changes(create_tree, folder, url):
+    root = create_tree()
+    index = SearchIndex(root)
+    assert len(index) == 6
+    python, news = root.children
+    removed = python.children.pop(0)
+    index.remove(removed)
+    assert ids(index.search("documentation")) == []
+
+    new = folder(8, "Snakes", url(9, "https://anaconda.org/", "Anaconda"))
+    news.children.append(new)
+    index.add(new)
+    assert ids(index.search("snakes")) == [8]
+    assert ids(index.search("anaconda")) == [9]
+
+    news.title = "Daily"
+    index.update(news)
+    assert ids(index.search("news")) == [7]
+    assert ids(index.search("daily")) == [6]
+
+    # the stale documents are dropped once they are half of the index.
+    index.remove(python)
+    assert len(index) == 4
+    assert len(index._nodes) == len(index)
+    assert ids(index.search("daily")) == [6]
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_search_index_update_folders(create_tree, columnar):
+    root = create_tree()
+    if columnar:
+        root = ColumnarTree.from_tree(root).root
+    index = SearchIndex(root)
+    python, news = root.children
+    if columnar:
+        root._tree.detach(python.children[0].row)
+    else:
+        python.children.pop(0)
+    index.update(python)
+    assert ids(index.search("python")) == [2, 4, 5]
+
+
+@pytest.mark.parametrize("news_first", [False, True])
+def test_search_index_moved_node(create_tree, news_first):
+    root = create_tree()
+    index = SearchIndex(root)
+    python, news = root.children
+    # a url moved from "Python" to "News", whatever the order of the updates.
+    news.children.append(python.children.pop(2))
+    for node in (news, python) if news_first else (python, news):
+        index.update(node)
+    assert ids(index.search("zen")) == [5]
+
+
+def test_search_index_same_ids(folder, url):
+    # the nodes are indexed apart, even when they share an id.
+    first = url(2, "https://a.com/", "Alpha")
+    second = url(2, "https://b.com/", "Beta")
+    root = folder(1, "root", first, second)
+    index = SearchIndex(root)
+    assert len(index) == 2
+    first.title = "Gamma"
+    index.update(first)
+    assert index.search("beta") == [second]
+    assert index.search("gamma") == [first]
+    assert index.search("alpha") == []
+
+
+def test_converter_search(source_bookmark_files, parse, url):
+    bookmarks = parse(source_bookmark_files["bookmarks_firefox.json"], "json")
+    results = bookmarks.search("mozilla")
+    assert results
+    duplicate = [node for node in results if node.type == "url"][0]
+    bookmarks._tree.children[0].children.append(
+        url(100000, duplicate.url, duplicate.title)
+    )
+    bookmarks._search_index = None
+    assert len(bookmarks.search("mozilla")) == len(results) + 1
+    index = bookmarks._search_index
+    bookmarks.search("firefox*")
+    assert bookmarks._search_index is index
+
+    # the index follows the duplicates removed from the tree.
+    removed = {node.id for node in bookmarks.remove_duplicates()}
+    assert removed == {100000}
+    assert bookmarks._search_index is index
+    assert not removed & {node.id for node in bookmarks.search("mozilla")}
+
+    # the nodes passed to `changed` are indexed again.
+    node = bookmarks._tree.children[0].children[0]
+    node.title = "Renamed node"
+    bookmarks.changed(node)
+    assert bookmarks.search("renamed") == [node]
+    folder = bookmarks._tree.children[0]
+    added = url(100001, "https://example.com/", "Added node")
+    folder.children.append(added)
+    bookmarks.changed(folder)
+    assert bookmarks.search("added") == [added]
+    folder.children.remove(added)
+    bookmarks.changed(folder)
+    assert bookmarks.search("added") == []
+    assert bookmarks._search_index is index
+
+    # a new tree is indexed again.
+    bookmarks.parse("json")
+    assert len(bookmarks.search("mozilla")) == len(results)
+    assert bookmarks._search_index is not index
@@ -0,0 +1,116 @@
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+from bookmarks_converter import BookmarksConverter, shards
+from bookmarks_converter.shards import iter_shard_events, split_tree
+from bookmarks_converter.streaming import iter_tree_events
+
+
+@pytest.fixture
+def tree(folder, url):
+    return folder(
+        1,
+        "root",
+        folder(2, "Bookmarks bar", url(3), folder(4, "Work", url(5)), url(6)),
+        url(7),
+        folder(8, "Other Bookmarks", folder(9, "Empty")),
+    )
+
+
+def test_iter_shard_events(tree):
+    events = [(event, node.id) for event, node in iter_shard_events(tree)]
+    assert events == [
+        ("folder", 1),
+        ("shard", 2),
+        ("url", 7),
+        ("shard", 8),
+        ("end", 1),
+    ]
+    events = [(event, node.id) for event, node in iter_shard_events(tree, 2)]
+    assert [id_ for event, id_ in events if event == "shard"] == [4, 9]
+    parts, folders = split_tree(tree, "json", 2)
+    assert [node.id for node in folders] == [4, 9]
+    assert parts.count(0) == parts.count(1) == 1
+    with pytest.raises(TypeError):
+        split_tree(tree, "db")
+
+
+def saved(bookmarks, format_):
+    bookmarks.save()
+    return bookmarks.output_filepath.with_suffix(f".{format_}").read_bytes()
+
+
+# the html files are left out, the date of the folders they lack being the
+# current time whenever it is read.
+@pytest.mark.parametrize("name", ["bookmarks_chrome.json", "bookmarks_firefox.json"])
+@pytest.mark.parametrize("format_", ["html", "json"])
+@pytest.mark.parametrize("depth", [1, 2, 3])
+@pytest.mark.parametrize("workers", [1, 2])
+def test_convert_sharded(source_bookmark_files, name, format_, depth, workers):
+    for columnar in (False, True):
+        bookmarks = BookmarksConverter(source_bookmark_files[name], columnar=columnar)
+        bookmarks.parse("json")
+        bookmarks.convert(format_)
+        expected = saved(bookmarks, format_)
+        bookmarks.convert_sharded(format_, workers=workers, depth=depth)
+        assert bookmarks.bookmarks.encode("utf-8") == expected
+        assert saved(bookmarks, format_) == expected
+
+
+def test_start_method(monkeypatch):
+    monkeypatch.setattr(sys, "platform", "linux")
+    if sys.version_info >= (3, 7):
+        assert shards._start_method() == "fork"
+    # a threaded process isn't forked.
+    event = threading.Event()
+    thread = threading.Thread(target=event.wait)
+    thread.start()
+    try:
+        assert shards._start_method() != "fork"
+    finally:
+        event.set()
+        thread.join()
+    monkeypatch.setattr(sys, "platform", "darwin")
+    assert shards._start_method() != "fork"
+
+
+def test_convert_sharded_pickled(source_bookmark_files, monkeypatch):
+    # the shards are sent to the workers where they can't be forked.
+    monkeypatch.setattr(shards, "_start_method", lambda: "spawn")
+    bookmarks = BookmarksConverter(source_bookmark_files["bookmarks_chrome.json"])
+    bookmarks.parse("json")
+    bookmarks.convert("json")
+    expected = saved(bookmarks, "json")
+    bookmarks.convert_sharded("json", workers=2)
+    assert bookmarks.bookmarks.encode("utf-8") == expected
+
+
+def test_save_shards(source_bookmark_files):
+    filepath = Path(source_bookmark_files["bookmarks_chrome.json"])
+    bookmarks = BookmarksConverter(filepath)
+    bookmarks.parse("json")
+    bookmarks.convert("json")
+    with pytest.raises(RuntimeError):
+        bookmarks.save(shards=True)
+
+    top_folders = [child.title for child in bookmarks._tree.children]
+    for format_ in ("json", "html"):
+        bookmarks.convert_sharded(format_, workers=1)
+        paths = bookmarks.save(shards=True)
+        assert [path.name for path in paths] == [
+            f"output_bookmarks_chrome_shard{i}.{format_}"
+            for i in range(len(top_folders))
+        ]
+        for path, title in zip(paths, top_folders):
+            shard = BookmarksConverter(path)
+            shard.parse(format_)
+            if format_ == "json":
+                assert shard._tree.title == title
+            else:
+                # the folders of an html file are moved under the usual ones.
+                assert title in {
+                    node.title for _, node in iter_tree_events(shard._tree)
+                }
+            path.unlink()
@@ -0,0 +1,166 @@
+import os
+import tracemalloc
+
+import pytest
+from bookmarks_converter import BookmarksConverter
+from bookmarks_converter.stats import NO_STATS, ConversionStats, PhaseStats
+
+
+def convert(filepath, source_format, target_format, **options):
+    bookmarks = BookmarksConverter(filepath, **options)
+    bookmarks.parse(source_format)
+    bookmarks.convert(target_format)
+    bookmarks.save()
+    bookmarks.output_filepath.with_suffix(f".{target_format}").unlink()
+    return bookmarks
+
+
+@pytest.mark.parametrize(
+    "source_file, source_format, steps",
+    [
+        (
+            "bookmarks_firefox.html",
+            "html",
+            ["scan_html", "restructure_root", "add_index"],
+        ),
+        (
+            "bookmarks_chrome.json",
+            "json",
+            ["format_json_file", "json_load", "add_index"],
+        ),
+        ("bookmarks_firefox.json", "json", ["format_json_file", "json_load"]),
+        ("from_firefox_json.db", "db", ["query", "build_tree"]),
+    ],
+)
+def test_phases(
+    source_file, source_format, steps, source_bookmark_files, result_bookmark_files
+):
+    files = dict(source_bookmark_files, **result_bookmark_files)
+    bookmarks = convert(files[source_file], source_format, "json", stats=True)
+    names = [phase.name for phase in bookmarks.stats.phases]
+    assert names == [f"parse.{step}" for step in steps] + ["parse", "convert", "save"]
+    phases = {phase.name: phase for phase in bookmarks.stats.phases}
+    assert phases["parse"].bytes_read == os.path.getsize(files[source_file])
+    assert phases["parse"].wall >= sum(phases[f"parse.{step}"].wall for step in steps)
+    assert phases["save"].bytes_written > 0
+    assert phases["save"].bytes_read == 0
+    assert all(phase.wall >= 0 and phase.cpu >= 0 for phase in phases.values())
+    nodes = bookmarks.stats.nodes
+    assert nodes["folder"] > 0 and nodes["url"] > 0
+
+
+def test_html_step_sizes(source_bookmark_files):
+    bookmarks = convert(
+        source_bookmark_files["bookmarks_chrome.html"], "html", "json", stats=True
+    )
+    phases = {phase.name: phase for phase in bookmarks.stats.phases}
+    # the file is scanned in place, no formatted copy is written.
+    assert phases["parse.scan_html"].bytes_read == phases["parse"].bytes_read > 0
+    assert phases["parse.scan_html"].bytes_written == 0
+
+
+def test_node_counts_match_streaming(source_bookmark_files):
+    source_file = source_bookmark_files["bookmarks_firefox.json"]
+    tree = convert(source_file, "json", "html", stats=True)
+    streamed = convert(source_file, "json", "html", stats=True, streaming=True)
+    assert streamed.stats.nodes == tree.stats.nodes
+    phases = {phase.name: phase for phase in streamed.stats.phases}
+    assert list(phases) == ["save"]
+    assert phases["save"].bytes_read == os.path.getsize(source_file)
+
+
+def test_callback(source_bookmark_files):
+    phases = []
+    bookmarks = convert(
+        source_bookmark_files["bookmarks_firefox.json"],
+        "json",
+        "db",
+        stats_callback=phases.append,
+    )
+    assert phases == bookmarks.stats.phases
+    assert all(isinstance(phase, PhaseStats) for phase in phases)
+
+
+def test_stats_off(source_bookmark_files):
+    bookmarks = convert(source_bookmark_files["bookmarks_firefox.json"], "json", "html")
+    assert bookmarks.stats is None
+    assert bookmarks._stats is NO_STATS
+    assert NO_STATS.phases == []
+
+
+def test_totals():
+    stats = ConversionStats()
+    for _ in range(2):
+        with stats.phase("convert"):
+            with stats.phase("step"):
+                pass
+    totals = stats.totals()
+    assert list(totals) == ["convert.step", "convert"]
+    assert totals["convert"].wall == sum(
+        phase.wall for phase in stats.phases if phase.name == "convert"
+    )
+    assert stats.to_dict()["phases"][0]["name"] == "convert.step"
+
+
+def test_phase_recorded_on_error():
+    stats = ConversionStats()
+    with pytest.raises(ValueError):
+        with stats.phase("parse"):
+            raise ValueError
+    assert [phase.name for phase in stats.phases] == ["parse"]
+    assert stats._names == []
+
+
+@pytest.mark.parametrize(
+    "source_file, source_format, target_format, node_types",
+    [
+        ("bookmarks_firefox.html", "html", "json", {"HTMLBookmark", "output"}),
+        ("bookmarks_chrome.json", "json", "db", {"JSONBookmark", "Folder", "Url"}),
+    ],
+)
+def test_profile_memory(
+    source_file, source_format, target_format, node_types, source_bookmark_files
+):
+    filepath = source_bookmark_files[source_file]
+    bookmarks = convert(filepath, source_format, target_format, profile_memory=True)
+    assert not tracemalloc.is_tracing()
+    for phase in bookmarks.stats.phases:
+        assert phase.peak_memory >= max(phase.retained_memory, 0)
+    parse = bookmarks.stats.phases[-3]
+    assert parse.name == "parse" and parse.retained_memory > 0
+    result = bookmarks.stats.to_dict()
+    phases = [phase["phase"] for phase in result["memory_sites"]]
+    assert phases == ["parse", "convert", "save"]
+    assert all(len(phase["sites"]) <= 10 for phase in result["memory_sites"])
+    assert set(result["memory_by_type"]) == node_types
+    assert all(size > 0 for size in result["memory_by_type"].values())
+
+
+def test_profile_memory_nested_peaks():
+    stats = ConversionStats(profile_memory=True)
+    with stats.phase("convert"):
+        with stats.phase("allocate"):
+            data = [bytearray(2**20)]
+        del data
+        with stats.phase("noop"):
+            pass
+    allocate, noop, convert_ = stats.phases
+    assert allocate.peak_memory >= 2**20
+    assert allocate.retained_memory >= 2**20
+    if hasattr(tracemalloc, "reset_peak"):
+        assert noop.peak_memory < 2**20
+    # the peak of a nested phase carries to the enclosing phase.
+    assert convert_.peak_memory >= 2**20
+    assert convert_.retained_memory < 2**20
+    assert not tracemalloc.is_tracing()
+
+
+def test_profile_memory_keeps_tracing():
+    tracemalloc.start()
+    try:
+        stats = ConversionStats(profile_memory=True)
+        with stats.phase("parse"):
+            pass
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,383 @@
+import io
+import json
+from html.parser import HTMLParser
+
+import pytest
+from bookmarks_converter import BookmarksConverter
+from bookmarks_converter.models import (
+    Bookmark,
+    HTMLBookmark,
+    JSONBookmark,
+    create_engine,
+    sessionmaker,
+)
+from bookmarks_converter.streaming import (
+    END,
+    FOLDER,
+    URL,
+    DBEventWriter,
+    HTMLEventScanner,
+    HTMLEventWriter,
+    JSONEventReader,
+    JSONTreeWriter,
+    add_index,
+    iter_output,
+    iter_tree_events,
+    write_events,
+)
+
+
+@pytest.fixture
+def convert_file():
+    def _function(filepath, source_format, target_format, streaming):
+        bookmarks = BookmarksConverter(filepath, streaming=streaming)
+        bookmarks.parse(source_format)
+        bookmarks.convert(target_format)
+        bookmarks.save()
+        output_file = bookmarks.output_filepath.with_suffix(f".{target_format}")
+        with open(output_file, "r", encoding="utf-8") as file_:
+            output = file_.read()
+        output_file.unlink()
+        return output
+
+    return _function
+
+
+@pytest.mark.parametrize("target_format", ["html", "json"])
+@pytest.mark.parametrize(
+    "source_file, source_format",
+    [
+        ("bookmarks_chrome.json", "json"),
+        ("bookmarks_firefox.json", "json"),
+        ("bookmarks_chrome.html", "html"),
+        ("bookmarks_firefox.html", "html"),
+    ],
+)
+def test_streaming_conversion(
+    source_file,
+    source_format,
+    target_format,
+    source_bookmark_files,
+    convert_file,
+    mocker,
+):
+    # the html source generates the dates of the folders missing one.
+    mocker.patch("time.time", return_value=1601886282.042)
+    source_file = source_bookmark_files[source_file]
+    expected = convert_file(source_file, source_format, target_format, False)
+    assert expected == convert_file(source_file, source_format, target_format, True)
+
+
+def test_streaming_result_files(
+    result_bookmark_files, source_bookmark_files, convert_file
+):
+    for source, result in [
+        ("bookmarks_chrome.json", "from_chrome_json.html"),
+        ("bookmarks_firefox.json", "from_firefox_json.html"),
+    ]:
+        with open(result_bookmark_files[result], "r", encoding="utf-8") as file_:
+            expected = file_.read()
+        assert expected == convert_file(
+            source_bookmark_files[source], "json", "html", True
+        )
+
+
+def test_streaming_lazy(source_bookmark_files):
+    bookmarks = BookmarksConverter(
+        source_bookmark_files["bookmarks_firefox.json"], streaming=True
+    )
+    bookmarks.parse("json")
+    assert bookmarks._tree is None
+    bookmarks.convert("html")
+    assert bookmarks._tree is None
+    assert next(bookmarks.bookmarks).startswith("<!DOCTYPE NETSCAPE-Bookmark-file-1>")
+
+
+def test_streaming_to_db(source_bookmark_files):
+    # db doesn't support streaming, the file is parsed as usual.
+    source_file = source_bookmark_files["bookmarks_firefox.json"]
+    bookmarks = BookmarksConverter(source_file, streaming=True)
+    bookmarks.parse("json")
+    bookmarks.convert("db")
+    expected = BookmarksConverter(source_file)
+    expected.parse("json")
+    expected.convert("db")
+    assert bookmarks.bookmarks == expected.bookmarks
+    assert bookmarks.streaming
+
+
+@pytest.mark.parametrize(
+    "titles",
+    [
+        ["Bookmarks Toolbar", "Other Bookmarks", "Folder"],
+        ["Folder", "Other Bookmarks", "Bookmarks Toolbar"],
+        ["Bookmarks bar", "Folder"],
+        ["Folder", "Bookmarks bar", "Folder 2"],
+    ],
+)
+def test_streaming_restructure_root(titles, tmp_path, convert_file, mocker):
+    mocker.patch("time.time", return_value=1601886282.042)
+    root_title = "Bookmarks" if "Bookmarks bar" in titles else "Bookmarks Menu"
+    lines = [f"<H1>{root_title}</H1>\n", "<DL><p>\n"]
+    for title in titles:
+        lines += [f'<DT><H3 ADD_DATE="1">{title}</H3>\n', "<DL><p>\n"]
+        lines += [f'<DT><A HREF="https://{title}.com" ADD_DATE="1">{title}</A>\n']
+        lines += ["</DL><p>\n"]
+    lines += ["</DL>\n"]
+    source_file = tmp_path.joinpath("bookmarks.html")
+    source_file.write_text("".join(lines), encoding="utf-8")
+    expected = convert_file(source_file, "html", "json", False)
+    assert expected == convert_file(source_file, "html", "json", True)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 2**16])
+def test_json_event_reader_read_value(chunk_size):
+    data = {"a": [1, -2.5e3, True, False, None], "b": {"c": 'é\\"中'}, "d": []}
+    reader = JSONEventReader(io.StringIO(json.dumps(data)), chunk_size=chunk_size)
+    assert reader.read_value() == data
+
+
+@pytest.mark.parametrize("children_first", [True, False])
+def test_json_event_reader_iter_node(children_first, url_custom, folder_custom):
+    folder = dict(folder_custom)
+    children = folder.pop("children")
+    children.append(url_custom)
+    folder = (
+        dict(children=children, **folder)
+        if children_first
+        else dict(folder, children=children)
+    )
+    reader = JSONEventReader(io.StringIO(json.dumps(folder)), chunk_size=5)
+    events = [
+        (event, node.title)
+        for event, node in reader.iter_node(lambda fields: JSONBookmark(**fields))
+    ]
+    assert events == [(FOLDER, "Main Folder"), (URL, "Google"), (END, "Main Folder")]
+
+
+def test_add_index(folder_custom, url_custom):
+    root = JSONBookmark(**dict(folder_custom, children=[]))
+    folder = JSONBookmark(**dict(folder_custom, children=[]))
+    urls = [JSONBookmark(**url_custom) for _ in range(3)]
+    events = [(FOLDER, root), (URL, urls[0]), (FOLDER, folder), (URL, urls[1])]
+    events += [(END, folder), (URL, urls[2]), (END, root)]
+    list(add_index(events))
+    assert [urls[0].index, folder.index, urls[1].index, urls[2].index] == [0, 1, 0, 2]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2**16])
+def test_json_event_reader_brace_in_string(chunk_size, url_custom, folder_custom):
+    url = dict(url_custom, title="{Google}")
+    empty = dict(folder_custom, title=None, children=[])
+    folder = dict(folder_custom, title="}", children=[url, empty])
+    reader = JSONEventReader(io.StringIO(json.dumps(folder)), chunk_size=chunk_size)
+    events = [
+        (event, node.title)
+        for event, node in reader.iter_node(lambda fields: JSONBookmark(**fields))
+    ]
+    assert events == [
+        (FOLDER, "}"),
+        (URL, "{Google}"),
+        (FOLDER, None),
+        (END, None),
+        (END, "}"),
+    ]
+
+
+def read_outputs(bookmarks, formats):
+    outputs = {}
+    for format_ in formats:
+        output_file = bookmarks.output_filepath.with_suffix(f".{format_}")
+        if format_ == "db":
+            outputs[format_] = sorted(
+                (bookmark.id, bookmark.parent_id, bookmark.index, bookmark.title)
+                for bookmark in get_db_bookmarks(output_file)
+            )
+        else:
+            outputs[format_] = output_file.read_text(encoding="utf-8")
+        output_file.unlink()
+    return outputs
+
+
+def get_db_bookmarks(db_path):
+    engine = create_engine("sqlite:///" + str(db_path))
+    session = sessionmaker(bind=engine)()
+    bookmarks = session.query(Bookmark).all()
+    session.close()
+    engine.dispose()
+    return bookmarks
+
+
+@pytest.mark.parametrize(
+    "source_file, source_format, streaming, formats",
+    [
+        ("bookmarks_chrome.json", "json", False, ["db", "html", "json"]),
+        ("bookmarks_firefox.json", "json", False, ["json", "db"]),
+        ("from_firefox_html.db", "db", False, ["html", "json"]),
+        ("bookmarks_firefox.json", "json", True, ["html", "json"]),
+        ("bookmarks_chrome.json", "json", True, ["db", "html", "json"]),
+    ],
+)
+def test_multi_target_conversion(
+    source_file,
+    source_format,
+    streaming,
+    formats,
+    source_bookmark_files,
+    result_bookmark_files,
+):
+    filepath = dict(source_bookmark_files, **result_bookmark_files)[source_file]
+    bookmarks = BookmarksConverter(filepath, streaming=streaming)
+    bookmarks.parse(source_format)
+    for format_ in formats:
+        bookmarks.convert(format_)
+        bookmarks.save()
+    expected = read_outputs(bookmarks, formats)
+
+    bookmarks = BookmarksConverter(filepath, streaming=streaming)
+    bookmarks.parse(source_format)
+    bookmarks.convert([format_.upper() for format_ in formats])
+    assert list(bookmarks.bookmarks) == formats
+    bookmarks.save()
+    assert read_outputs(bookmarks, formats) == expected
+
+
+def test_multi_target_single_traversal(source_bookmark_files, mocker):
+    filepath = source_bookmark_files["bookmarks_firefox.json"]
+    bookmarks = BookmarksConverter(filepath, streaming=True)
+    bookmarks.parse("json")
+    spy = mocker.spy(BookmarksConverter, "_stream_json_events")
+    bookmarks.convert(["html", "json"])
+    assert spy.call_count == 1
+    assert isinstance(bookmarks.bookmarks["html"], str)
+    assert isinstance(bookmarks.bookmarks["json"], dict)
+
+
+@pytest.mark.parametrize(
+    "formats, error", [([], ValueError), (["html", "xml"], TypeError)]
+)
+def test_multi_target_errors(formats, error, source_bookmark_files):
+    bookmarks = BookmarksConverter(source_bookmark_files["bookmarks_firefox.json"])
+    bookmarks.parse("json")
+    with pytest.raises(error):
+        bookmarks.convert(formats)
+
+
+def test_write_events(folder_custom, url_custom):
+    url = JSONBookmark(**url_custom)
+    folder = JSONBookmark(**dict(folder_custom, children=[url]))
+    events = list(iter_tree_events(folder))
+    html, tree, objects = write_events(
+        events, [HTMLEventWriter(), JSONTreeWriter(), DBEventWriter()]
+    )
+    assert html == "".join(iter_output(HTMLEventWriter(), events))
+    assert tree["children"] == [url._convert_url_to_json()]
+    assert [bookmark.type for bookmark in objects] == ["folder", "url"]
+    assert objects[1].parent_id == folder.id
+
+
+class HTMLEventParser(HTMLParser):
+    """Parser of the lines formatted by `format_html_file`, producing the
+    events of the first "<H3>" tree as BeautifulSoup's "html.parser" would,
+    with the ids of the HTMLBookmark class counter. The events expected of
+    HTMLEventScanner."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.events = []
+        self._folders = []
+        self._started = False
+        self._finished = False
+
+    def handle_starttag(self, tag, attrs):
+        if self._finished or tag not in ("a", "h3"):
+            return
+        if tag == "a" and not self._started:
+            return
+        attr_dict = {}
+        for key, value in attrs:
+            attr_dict[key] = "" if value is None else value
+        node = HTMLBookmark(name=tag, attrs=attr_dict)
+        if tag == "h3":
+            self._started = True
+            self._folders.append(node)
+            self.events.append((FOLDER, node))
+        else:
+            self.events.append((URL, node))
+
+    def handle_endtag(self, tag):
+        if tag == "h3" and self._folders:
+            self.events.append((END, self._folders.pop()))
+            if not self._folders:
+                self._finished = True
+
+    def close(self):
+        """Finish parsing, ending the folders still open."""
+        super().close()
+        while self._folders:
+            self.events.append((END, self._folders.pop()))
+        self._finished = True
+
+
+HTML_LINES = [
+    '<DT><A HREF="https://before.com/">Before</A>\n',
+    "<H1>Bookmarks Menu</H1>\n",
+    "<DL><p>\n",
+    '    <DT><H3 ADD_DATE="1" PERSONAL_TOOLBAR_FOLDER="true">Toolbar</H3>\n',
+    "    <DL><p>\n",
+    "        <DT><A HREF=\"https://a.com/?x=1&amp;y=2\" ICON='data:x' TAGS=a,b>"
+    "Café &amp; &lt;more&gt;</A>\n",
+    '        <DT><A HREF="https://b.com/" ADD_DATE="4" FLAG>B > C</A>\n',
+    "    </DL><p>\n",
+    '    <DT><H3 ADD_DATE="5">Empty</H3>\n',
+    "    <DL><p>\n",
+    "    </DL><p>\n",
+    "</DL><p>\n",
+    '<DT><A HREF="https://after.com/">After</A>\n',
+]
+
+
+def html_fields(events):
+    return [
+        (event, node.id, node.title, node.url, node.icon, node.tags, node._add_date)
+        + tuple(sorted(node.attrs))
+        for event, node in events
+    ]
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_html_event_scanner(newline, tmp_path):
+    source_file = tmp_path.joinpath("bookmarks.html")
+    source_file.write_bytes("".join(HTML_LINES).replace("\n", newline).encode())
+    HTMLBookmark.reset_id_counter()
+    parser = HTMLEventParser()
+    # the url before the first folder takes an id.
+    next(HTMLBookmark.id_counter)
+    for line in HTML_LINES:
+        parser.feed(BookmarksConverter._format_html_line(line))
+    parser.close()
+    expected = html_fields(parser.events)
+    HTMLBookmark.reset_id_counter()
+    events = list(HTMLEventScanner(source_file))
+    # the attributes are decoded once they are read.
+    assert isinstance(events[2][1].attrs["title"], bytes)
+    assert html_fields(events) == expected
+    assert events[2][1].title == "Café & <more>"
+    assert events[2][1].url == "https://a.com/?x=1&y=2"
+
+
+def test_html_event_scanner_file_object(tmp_path):
+    source_file = tmp_path.joinpath("bookmarks.html")
+    source_file.write_bytes("".join(HTML_LINES).encode())
+    expected = html_fields(HTMLEventScanner(source_file))
+    # chunks smaller than the lines are completed by the next ones.
+    for chunk_size in (7, 2**20):
+        with open(source_file, "rb") as file_:
+            events = HTMLEventScanner(file_, chunk_size)
+            assert html_fields(events) == expected
+
+
+def test_html_event_scanner_empty(tmp_path):
+    source_file = tmp_path.joinpath("bookmarks.html")
+    source_file.write_bytes(b"")
+    assert list(HTMLEventScanner(source_file)) == []
@@ -0,0 +1,129 @@
+import json
+
+import pytest
+from bookmarks_converter import BookmarksConverter
+from bookmarks_converter.columnar import ColumnarTree
+from bookmarks_converter.streaming import add_index, iter_tree_events
+from bookmarks_converter.transforms import (
+    ClampTitles,
+    DropEmptyFolders,
+    StripIcons,
+    StripTrackingParameters,
+    Transform,
+    TransformPipeline,
+)
+
+
+@pytest.fixture
+def create_tree(folder, url):
+    def _function():
+        return folder(
+            1,
+            "root",
+            folder(
+                2,
+                "Bookmarks bar",
+                url(3, "https://a.com/?utm_source=x&id=1#top", "a" * 20, icon="data"),
+                folder(4, "Empty", folder(5, "Also empty")),
+                url(6, "https://b.com/?fbclid=1", icon="data"),
+            ),
+            folder(7, "Private", url(8, "https://private.com/", icon="data")),
+        )
+
+    return _function
+
+
+class DropPrivate(Transform):
+    def folder(self, node):
+        return None if node.title == "Private" else node
+
+
+def fields(root):
+    return [
+        (event, node.id, node.title, getattr(node, "url", None), node.index)
+        for event, node in add_index(iter_tree_events(root))
+    ]
+
+
+STAGES = [
+    StripIcons(),
+    StripTrackingParameters(),
+    ClampTitles(15),
+    DropPrivate(),
+    DropEmptyFolders(),
+]
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_pipeline_apply(columnar, create_tree):
+    root = create_tree()
+    if columnar:
+        root = ColumnarTree.from_tree(root).root
+    TransformPipeline(STAGES).apply(root)
+    assert fields(root) == [
+        ("folder", 1, "root", None, None),
+        ("folder", 2, "Bookmarks bar", None, 0),
+        ("url", 3, "a" * 14 + "…", "https://a.com/?id=1#top", 0),
+        ("url", 6, "page", "https://b.com/", 1),
+        ("end", 2, "Bookmarks bar", None, 0),
+        ("end", 1, "root", None, None),
+    ]
+    bar = root.children[0]
+    assert [child.index for child in bar.children] == [0, 1]
+    assert bar.children[0].icon is None
+
+
+def test_pipeline_events(create_tree):
+    expected = create_tree()
+    TransformPipeline(STAGES).apply(expected)
+    events = list(TransformPipeline(STAGES).events(iter_tree_events(create_tree())))
+    assert [(event, node.id) for event, node in events] == [
+        (event, node.id) for event, node in iter_tree_events(expected)
+    ]
+    # the empty folders are kept without DropEmptyFolders.
+    events = TransformPipeline([StripIcons()]).events(iter_tree_events(create_tree()))
+    assert [node.id for event, node in events if event == "folder"] == [1, 2, 4, 5, 7]
+
+
+@pytest.mark.parametrize(
+    "url_, expected",
+    [
+        ("https://a.com/", "https://a.com/"),
+        ("https://a.com/?utm_source=x", "https://a.com/"),
+        ("https://a.com/?a=1&utm_medium=x&b=2", "https://a.com/?a=1&b=2"),
+        ("https://a.com/?gclid=1#part", "https://a.com/#part"),
+        ("https://a.com/?gclidx=1", "https://a.com/?gclidx=1"),
+    ],
+)
+def test_strip_tracking_parameters(url_, expected, url):
+    assert StripTrackingParameters().url(url(1, url_)).url == expected
+
+
+def test_clamp_titles_suffix():
+    with pytest.raises(ValueError):
+        ClampTitles(1)
+
+
+def test_converter_transforms(source_bookmark_files):
+    filepath = source_bookmark_files["bookmarks_chrome.json"]
+    stages = [StripIcons(), ClampTitles(20), DropEmptyFolders()]
+    for format_ in ("html", "json"):
+        bookmarks = BookmarksConverter(filepath, transforms=stages)
+        bookmarks.parse("json")
+        bookmarks.convert(format_)
+        streamed = BookmarksConverter(filepath, streaming=True, transforms=stages)
+        streamed.parse("json")
+        streamed.convert(format_)
+        output = "".join(streamed.bookmarks)
+        if format_ == "json":
+            output = json.loads(output)
+        assert output == bookmarks.bookmarks
+
+    titles = [node.title for _, node in iter_tree_events(bookmarks._tree)]
+    assert "Mobile bookmarks" not in titles
+    for _, node in iter_tree_events(bookmarks._tree):
+        assert len(node.title) <= 20
+        if node.type == "url":
+            assert node.icon is None
+        else:
+            assert node.children or node is bookmarks._tree